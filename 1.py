@@ -1,11 +1,38 @@
+import os
+import sys
 import requests
 import numpy as np
 import json
 import math
-from time import sleep
+from time import sleep, monotonic
 from tabulate import tabulate
 import datetime
 import random
+from scan_engine import ScanEngine, ScanJob
+from signal_channel import write_signals_atomic, SignalStream
+from scoring import score_signals
+from contract_cache import get_contract_cache
+from order_book import parse_depth, depth_features
+from market_feed import get_active_feed
+from kline_store import get_kline_store
+from correlation import CorrelationEngine, CORRELATION_WINDOW
+from request_scheduler import get_scheduler
+from source_stats import get_source_stats
+from scan_state import get_scan_state
+from prefilter import prefilter_symbols, fetch_ticker_snapshot, PREFILTER_TOP_K
+from indicators import latest_indicators, IndicatorCache
+from timeframes import get_timeframe_cache, BASE_GRANULARITY, MTF_HISTORY, MTF_TREND_COLUMNS
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import timed
+from kucoin_client import get_client
+
+KUCOIN_FUTURES_HOST = "api-futures.kucoin.com"
+KUCOIN_SPOT_HOST = "api.kucoin.com"
+TRADINGVIEW_HOST = "scanner.tradingview.com"
+
+SCAN_CONCURRENCY = 16  # Parallel fetches in flight during a scan
+SCAN_BATCH_SIZE = 100  # Symbols per TradingView request in the concurrent scan
+MAX_SIGNALS = 5  # Signals handed to the executor per scan
 
 def round_up(value):
     if value < 1:
@@ -13,82 +40,233 @@ def round_up(value):
     else:
         return round(value, 2)  # Round up to 2 decimal places for larger numbers
 
-def fetch_data(url, retries=3, backoff_factor=1):
-    for attempt in range(retries):
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as err:
-            print(f"Attempt {attempt+1}: Error occurred: {err}")
-            sleep(backoff_factor)
-            backoff_factor *= 2  # Exponential backoff
-    print("Max retries exceeded.")
-    return None
+@timed('scan.fetch_data')
+def fetch_data(url, retries=3):
+    # Pacing, jittered retries and the circuit breaker are handled by the request scheduler
+    try:
+        response = get_scheduler().request('GET', url, lambda: requests.get(url, timeout=10), attempts=retries)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as err:
+        print(f"Error fetching {url}: {err}")
+        return None
 
 def exponential_backoff(retries, backoff_factor=1):
     sleep(backoff_factor)
     return backoff_factor * 2  # Double the backoff interval
 
 def fetch_all_symbols():
-    url = "https://api-futures.kucoin.com/api/v1/contracts/active"
-    data = fetch_data(url)
-    if data and 'data' in data:
-        # Ensuring that the data field which contains contracts info is parsed correctly
-        return [item['symbol'] for item in data['data']]
-    return []
-
-
-def fetch_crypto_indicators(symbol, exchanges=['BYBIT', 'BINANCE']):
-    indicators = [
-        "open", "close", "volume", "VWAP|60", "RSI|60", "ADX|60", "ATR|60",
-        "MACD.macd", "MACD.signal", "Stoch.K", "Stoch.D", 
-        "EMA5", "EMA10", "EMA20", "EMA30", "EMA50", "EMA100", "EMA200",
-        "Pivot.M.Classic.Middle", "Pivot.M.Classic.R1", "Pivot.M.Classic.S1"
-    ]
-
-    # Clean up symbol name
-    clean_symbol = symbol.replace("USDTM", "USDT").replace("USDM", "USDT")
-    
-    symbol_formats = []
-    if 'BYBIT' in exchanges:
-        symbol_formats.append(f"BYBIT:{clean_symbol}")  # Remove .P suffix
-    if 'BINANCE' in exchanges:
-        symbol_formats.append(f"BINANCE:{clean_symbol}")
-
-    for ticker in symbol_formats:
-        try:
-            url = "https://scanner.tradingview.com/crypto/scan"
-            request_body = {
-                "symbols": {"tickers": [ticker]},
-                "columns": indicators
-            }
-            response = requests.post(url, json=request_body)
-            
-            if response.ok:
-                data = response.json().get('data', [])
-                if data and isinstance(data, list) and data[0].get('d'):
-                    indicators_data = data[0]['d']
-                    # Don't modify the data with random values
-                    indicators_data = [0.0 if x is None else x for x in indicators_data]
-                    result = dict(zip(indicators, indicators_data))
-                    if result.get('close') is not None:  # Only return if we have valid price data
-                        return result
-            else:
-                continue
-        except Exception as e:
+    # Served from the shared contract cache; only downloaded when missing or past its TTL
+    return get_contract_cache().symbols()
+
+
+TRADINGVIEW_SCAN_URL = f"https://{TRADINGVIEW_HOST}/crypto/scan"
+TRADINGVIEW_BATCH_SIZE = 500  # Tickers per scan request
+INDICATOR_HEDGE_DELAY = 0.3  # Seconds the preferred exchange gets before the next one is asked too
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='indicator-hedge')
+LOCAL_INDICATOR_HISTORY = 63 * 24  # Hourly candles behind local indicators: reaches back to the start of last month
+
+INDICATOR_COLUMNS = [
+    "open", "close", "volume", "VWAP|60", "RSI|60", "ADX|60", "ATR|60",
+    "MACD.macd", "MACD.signal", "Stoch.K", "Stoch.D", 
+    "EMA5", "EMA10", "EMA20", "EMA30", "EMA50", "EMA100", "EMA200",
+    "Pivot.M.Classic.Middle", "Pivot.M.Classic.R1", "Pivot.M.Classic.S1"
+]
+
+def to_tradingview_symbol(symbol):
+    """Map a KuCoin futures symbol (e.g. XBTUSDTM) onto its TradingView pair name."""
+    return symbol.replace("USDTM", "USDT").replace("USDM", "USDT")
+
+def scan_tradingview(tickers, columns=INDICATOR_COLUMNS):
+    """Run a single scanner request for a list of tickers and return the raw data rows (None if it failed)."""
+    request_body = {
+        "symbols": {"tickers": list(tickers)},
+        "columns": columns
+    }
+    try:
+        response = get_scheduler().request(
+            'POST', TRADINGVIEW_SCAN_URL, lambda: requests.post(TRADINGVIEW_SCAN_URL, json=request_body, timeout=10)
+        )
+        if not response.ok:
+            print(f"TradingView scan failed: {response.status_code}")
+            return None
+        data = response.json().get('data', [])
+        return data if isinstance(data, list) else []
+    except Exception as e:
+        print(f"TradingView scan error: {str(e)}")
+        return None
+
+def parse_indicator_row(values, columns=INDICATOR_COLUMNS):
+    # Don't modify the data with random values
+    values = [0.0 if x is None else x for x in values]
+    return dict(zip(columns, values))
+
+def parse_valid_row(row, columns=INDICATOR_COLUMNS):
+    """Parse a scanner row, or return None unless it carries a close price."""
+    values = row.get('d')
+    if not values or dict(zip(columns, values)).get('close') is None:
+        return None
+    return parse_indicator_row(values, columns)
+
+def scan_source(exchange, symbols):
+    """Ask one exchange prefix for a chunk of symbols and record its hit rate for each.
+
+    Returns {symbol: indicators}, or None if the request failed (which is not recorded,
+    so an outage does not teach the ranking anything).
+    """
+    # Several KuCoin contracts can map onto the same pair (e.g. XBTUSDTM and XBTUSDM)
+    ticker_symbols = {}
+    for symbol in symbols:
+        ticker_symbols.setdefault(f"{exchange}:{to_tradingview_symbol(symbol)}", []).append(symbol)
+    rows = scan_tradingview(list(ticker_symbols))
+    if rows is None:
+        return None
+    found = {}
+    for row in rows:
+        matched = ticker_symbols.get(row.get('s'))
+        result = parse_valid_row(row) if matched else None
+        if result is None:
             continue
-
-    return {}
-
+        for symbol in matched:
+            found[symbol] = dict(result)
+    stats = get_source_stats()
+    for symbol in symbols:
+        stats.record(symbol, exchange, symbol in found)
+    return found
+
+@timed('scan.indicators_batch')
+def fetch_crypto_indicators_batch(symbols, exchanges=['BYBIT', 'BINANCE'], batch_size=TRADINGVIEW_BATCH_SIZE,
+                                  hedge_delay=INDICATOR_HEDGE_DELAY):
+    """Fetch indicators for many symbols with a few large, hedged scanner requests.
+
+    Each symbol is first asked of the exchange that usually answers for it, in chunks of
+    ``batch_size`` tickers per exchange. Symbols that exchange does not list move on to
+    their next one, and so do symbols still unanswered after ``hedge_delay`` seconds,
+    while the first request stays in flight; the first valid row wins and a late one is
+    ignored. Symbols without hit-rate history are asked of every exchange at once.
+    Every answered request, late ones included, counts towards the hit rates.
+    ``hedge_delay=None`` only moves on after a miss. Returns {symbol: indicators}.
+    """
+    stats = get_source_stats()
+    results = {}
+    remaining = {symbol: stats.rank(symbol, exchanges) for symbol in dict.fromkeys(symbols)}
+    in_flight = dict.fromkeys(remaining, 0)
+    pending = {}  # {future: symbols it asked for}
+
+    def ask(to_ask):
+        by_exchange = {}
+        for symbol in to_ask:
+            by_exchange.setdefault(remaining[symbol].pop(0), []).append(symbol)
+            in_flight[symbol] += 1
+        for exchange, group in by_exchange.items():
+            for start in range(0, len(group), batch_size):
+                chunk = group[start:start + batch_size]
+                pending[_hedge_pool.submit(scan_source, exchange, chunk)] = chunk
+        return monotonic() + hedge_delay if hedge_delay is not None else None
+
+    def unresolved():
+        return [symbol for symbol in remaining if symbol not in results and remaining[symbol]]
+
+    ask(list(remaining))
+    hedge_at = ask([symbol for symbol in unresolved() if not stats.known(symbol)])
+    while pending and any(symbol not in results and in_flight[symbol] for symbol in in_flight):
+        timeout = max(0.0, hedge_at - monotonic()) if hedge_at is not None and unresolved() else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            hedge_at = ask(unresolved())
+            continue
+        missed = []
+        for future in done:
+            found = future.result() or {}
+            for symbol in pending.pop(future):
+                in_flight[symbol] -= 1
+                if symbol in found:
+                    results.setdefault(symbol, found[symbol])
+                elif symbol not in results and not in_flight[symbol] and remaining[symbol]:
+                    missed.append(symbol)
+        if missed:
+            hedge_at = ask(missed)
+
+    # Requests still in flight finish in the pool and only record their hit rates
+    return results
+
+_indicator_caches = {}  # {granularity: IndicatorCache} kept between scans
+
+def fetch_last_prices(symbols):
+    """Live last price per symbol: the market feed's forming candle or ticker mid when it
+    streams the symbol, else the mid from one allTickers call. Symbols without one are left out."""
+    prices = {}
+    feed = get_active_feed()
+    if feed is not None:
+        for symbol in symbols:
+            candle, ticker = feed.candle(symbol), feed.ticker(symbol)
+            if candle:
+                prices[symbol] = candle['close']
+            elif ticker:
+                prices[symbol] = (ticker['bestBidPrice'] + ticker['bestAskPrice']) / 2
+    missing = set(symbols) - set(prices)
+    if missing:
+        for symbol, (bid, ask) in fetch_ticker_snapshot().items():
+            if symbol in missing and bid and ask:
+                prices[symbol] = (float(bid) + float(ask)) / 2
+    return prices
+
+@timed('scan.local_indicators')
+def fetch_local_indicators_batch(symbols, granularity=60, history=LOCAL_INDICATOR_HISTORY):
+    """Compute the scanner columns from KuCoin klines on this machine instead of asking TradingView.
+
+    Only candles closed since the last sync are downloaded, and only those advance the
+    recursive indicators kept from the previous scan (see indicators.IndicatorCache).
+    "close" is the live last price, so entries and targets are not up to a candle stale.
+    Returns {symbol: indicators}.
+    """
+    store = get_kline_store()
+    store.sync_many(symbols, granularity, history=history)
+    timestamps, columns = store.aligned(symbols, granularity, history)
+    cache = _indicator_caches.setdefault(granularity, IndicatorCache(granularity * 60 * 1000))
+    results = latest_indicators(symbols, columns, timestamps, cache=cache)
+    for symbol, price in fetch_last_prices(list(results)).items():
+        results[symbol]['close'] = price
+    return results
+
+@timed('scan.timeframes')
+def fetch_timeframe_features(symbol, base=BASE_GRANULARITY, history=MTF_HISTORY):
+    """Higher-timeframe trend and RSI for one symbol from its single base-resolution kline stream.
+
+    One incremental kline sync per symbol; the 15m/1h/4h bars are resampled locally
+    (see timeframes.TimeframeCache), so extra timeframes cost no extra requests.
+    """
+    store = get_kline_store()
+    store.sync(symbol, base, history=history)
+    columns = store.load(symbol, base, last=history)
+    cache = get_timeframe_cache(symbol)
+    cache.update(columns['timestamp'], columns)
+    return cache.features()
+
+def fetch_klines(symbol, granularity=60, last=500):
+    """Bring the local kline store up to date and return the newest candles as column arrays.
+
+    Only candles closed since the previous cycle are downloaded; the rest is memory-mapped
+    from disk (see kline_store.KlineStore).
+    """
+    store = get_kline_store()
+    store.sync(symbol, granularity)
+    return store.load(symbol, granularity, last=last)
+
+@timed('scan.depth')
 def analyze_order_book(symbol):
-    url = f"https://api.kucoin.com/api/v1/level2/depth500?symbol={symbol}"
+    """Fetch the L2 book as a compact order_book.OrderBook (None if unavailable)."""
+    # A running market feed already holds a live book, so no request is needed
+    feed = get_active_feed()
+    if feed is not None:
+        book = feed.book(symbol)
+        if book is not None:
+            return book
+    url = f"https://{KUCOIN_SPOT_HOST}/api/v1/level2/depth500?symbol={symbol}"
     order_book = fetch_data(url)
-    if order_book and 'data' in order_book:
-        bids = [(float(bid[0]), float(bid[1])) for bid in order_book['data']['bids']]
-        asks = [(float(ask[0]), float(ask[1])) for ask in order_book['data']['asks']]
-        return bids, asks
-    return [], []
+    if order_book and order_book.get('data'):
+        return parse_depth(order_book['data'])
+    return None
 
 def predict_price_movement_advanced(bids, asks, indicators, klines):
     if not klines or not isinstance(klines, list):
@@ -176,13 +354,16 @@ def advanced_trading_strategy(indicators, last_price):
     # Dynamic position sizing based on trend strength
     position_size_factor = trend_score / 100
 
+    higher_bull, higher_bear = higher_timeframe_bias(indicators)
+
     # Enhanced entry conditions
     strong_buy = (
         trend_score > 75 and
         not stoch_overbought and
         macd_trend and
         vwap_trend and
-        pivot_support
+        pivot_support and
+        higher_bull
     )
     
     strong_sell = (
@@ -190,7 +371,8 @@ def advanced_trading_strategy(indicators, last_price):
         not stoch_oversold and
         not macd_trend and
         not vwap_trend and
-        pivot_resistance
+        pivot_resistance and
+        higher_bear
     )
 
     # Dynamic ATR multiplier based on trend strength
@@ -220,6 +402,11 @@ def advanced_trading_strategy(indicators, last_price):
 
     return entry_price, take_profit, stop_loss, leverage
 
+def higher_timeframe_bias(indicators):
+    """(longs allowed, shorts allowed) by the higher-timeframe trends; missing ones never veto."""
+    higher_trends = [safe_float(indicators.get(column), 0) for column in MTF_TREND_COLUMNS]
+    return not any(trend < 0 for trend in higher_trends), not any(trend > 0 for trend in higher_trends)
+
 def calculate_enhanced_success_chance(trend_score, macd_strength, position_size_factor,
                                    stoch_k, stoch_d, vwap_trend, volume_trend):
     base_chance = trend_score * 0.6  # Increased from 0.5 for better base chance
@@ -288,32 +475,80 @@ def calculate_trend_score(data):
     
     return trend_score
 
-def check_market_correlation(symbol, results, max_correlation=0.7):
-    """Check if the symbol is highly correlated with existing positions."""
+_correlation_engines = {}  # {(granularity, window): (CorrelationEngine, open time of its newest bar)}
+
+def build_correlation_engine(symbols, granularity=60, window=CORRELATION_WINDOW):
+    """Rolling return correlations for ``symbols`` from the local kline store (syncing it first).
+
+    One engine per timeframe and window is kept between calls and advanced with
+    CorrelationEngine.update() by the bars closed since the last call. It is rebuilt from
+    the store when new symbols join (it keeps the earlier ones too) or a window was missed.
+    """
+    store = get_kline_store()
+    key = (granularity, window)
+    engine, last_ms = _correlation_engines.get(key, (None, None))
+    known = engine.symbols if engine is not None else []
+    symbols = list(dict.fromkeys(known + list(symbols)))
+    store.sync_many(symbols, granularity, history=window + 1)
+    end_ms = max((store.last_timestamp(symbol, granularity) or 0) for symbol in symbols) if symbols else 0
+    missed = (end_ms - last_ms) // (granularity * 60 * 1000) if engine is not None else 0
+    if engine is None or len(symbols) > len(known) or missed > window:
+        engine = CorrelationEngine.from_closes(symbols, store.closes(symbols, granularity, window + 1, end_ms), window)
+    elif missed > 0:
+        for closes in store.closes(symbols, granularity, missed, end_ms).T:
+            engine.update(closes)
+    else:
+        end_ms = last_ms
+    _correlation_engines[key] = (engine, end_ms)
+    return engine
+
+def check_market_correlation(symbol, selected_symbols, engine, max_correlation=0.7):
+    """Check if the symbol is highly correlated with symbols already held or selected."""
     try:
-        if not results or len(results) < 2:
-            return True
-        
-        symbol_prices = [float(results[symbol].get('close', 0)) for _ in range(10)]
-        if all(price == 0 for price in symbol_prices):
-            return True
-            
-        for other_symbol in results:
-            if other_symbol != symbol:
-                other_prices = [float(results[other_symbol].get('close', 0)) for _ in range(10)]
-                if all(price == 0 for price in other_prices):
-                    continue
-                try:
-                    correlation = np.corrcoef(symbol_prices, other_prices)[0, 1]
-                    if not np.isnan(correlation) and abs(correlation) > max_correlation:
-                        return False
-                except:
-                    continue
-        return True
+        return not engine.is_correlated(symbol, selected_symbols, max_correlation)
     except Exception as e:
         print(f"Correlation check error for {symbol}: {str(e)}")
         return True
 
+def fetch_position_symbols():
+    """Symbols with an open futures position, or [] when they cannot be read (e.g. no API keys)."""
+    try:
+        response = get_client().get("/api/v1/positions")
+    except (ValueError, requests.RequestException) as e:
+        print(f"Could not read open positions: {str(e)}")
+        return []
+    if response.status_code != 200:
+        print(f"Could not read open positions: {response.status_code}, {response.text}")
+        return []
+    return [position['symbol'] for position in response.json().get('data') or []
+            if float(position.get('currentQty') or 0) != 0]
+
+@timed('scan.correlation')
+def filter_correlated_signals(signals, limit=5, max_correlation=0.7, held=(), positions=()):
+    """Walk signals in order and keep up to ``limit`` that do not move with one already kept.
+
+    ``held`` are signals already handed to the executor and ``positions`` the symbols with an
+    open position (see fetch_position_symbols); new signals must not move with either, and a
+    symbol already held is skipped.
+    """
+    held_symbols = list(dict.fromkeys(list(positions) + [signal['Symbol'] for signal in held]))
+    signals = [signal for signal in signals if signal['Symbol'] not in positions]
+    if len(signals) + len(held_symbols) < 2:
+        return signals[:limit]
+    # History is only synced for the candidates that can realistically make the cut
+    candidates = signals[:limit * 4]
+    engine = build_correlation_engine(list(dict.fromkeys(held_symbols + [signal['Symbol'] for signal in candidates])))
+    selected = []
+    for signal in candidates:
+        if len(selected) >= limit:
+            break
+        if check_market_correlation(signal['Symbol'], held_symbols + [s['Symbol'] for s in selected], engine,
+                                    max_correlation):
+            selected.append(signal)
+        else:
+            print(f"Skipping {signal['Symbol']}: correlated with an open position or an already selected signal")
+    return selected
+
 def provide_trading_recommendation(results, min_success_chance):
     if not results:
         print("No valid results to analyze.")
@@ -323,6 +558,7 @@ def provide_trading_recommendation(results, min_success_chance):
     daily_trades = 0
     max_daily_trades = 3
     max_portfolio_risk = 0.02
+    engine = build_correlation_engine(list(results))
     
     for symbol, data in results.items():
         try:
@@ -337,7 +573,7 @@ def provide_trading_recommendation(results, min_success_chance):
             if last_price <= 0:
                 continue
                 
-            if not check_market_correlation(symbol, results):
+            if not check_market_correlation(symbol, [t['Symbol'] for t in table], engine):
                 continue
                 
             entry_price, take_profit, stop_loss, leverage = advanced_trading_strategy(data, last_price)
@@ -378,8 +614,7 @@ def provide_trading_recommendation(results, min_success_chance):
     table.sort(key=lambda x: (x['Chances of Success'], -float(x['Position Risk'].rstrip('%'))), reverse=True)
 
     if len(table) > 0:
-        with open('signals.json', 'w') as file:
-            json.dump(table[:3], file, indent=4)
+        write_signals_atomic(table[:3])
         print(f"\nSaved top {min(3, len(table))} trading signals to 'signals.json'")
         print("\nTop opportunities:")
         for t in table[:3]:
@@ -389,90 +624,227 @@ def provide_trading_recommendation(results, min_success_chance):
     
     return table
 
-import random
+def score_symbol(symbol, indicators):
+    """Score one symbol's indicators and return a signal dict if it qualifies, else None.
 
-def shuffle_and_prioritize_symbols(symbols, previous_symbols, max_symbols=500):
-    random.shuffle(symbols)  # Shuffle the list of symbols to randomize order
-    # Prioritize symbols not in the last traded set
-    new_symbols = [symbol for symbol in symbols if symbol not in previous_symbols]
-    remaining_symbols = [symbol for symbol in symbols if symbol in previous_symbols]
-    prioritized_list = new_symbols + remaining_symbols
-    return prioritized_list[:max_symbols]  # Return a limited number of symbols to analyze
+    Scalar reference for scoring.score_signals, which the scan uses on whole batches.
+    """
+    if not indicators or 'close' not in indicators:
+        return None
+        
+    last_price = indicators['close']
+    if safe_float(last_price) <= 0:
+        return None
+    entry_price, take_profit, stop_loss, leverage = advanced_trading_strategy(indicators, last_price)
+    
+    # Calculate success chance
+    trend_score = calculate_trend_score(indicators)
+    macd_strength = abs(indicators.get('MACD.macd', 0) - indicators.get('MACD.signal', 0)) / last_price
+    position_size_factor = trend_score / 100
+    stoch_k = indicators.get('Stoch.K', 50)
+    stoch_d = indicators.get('Stoch.D', 50)
+    vwap_trend = last_price > indicators.get('VWAP|60', last_price)
+    volume_trend = indicators.get('volume', 0) > 0
+    
+    success_chance = calculate_enhanced_success_chance(
+        trend_score, macd_strength, position_size_factor,
+        stoch_k, stoch_d, vwap_trend, volume_trend
+    )
+    
+    # Calculate position risk
+    risk_percentage = (abs(entry_price - stop_loss) / entry_price) * 100
+    
+    # Higher timeframes (timeframes.py) veto a trade against their trend, including the default long
+    higher_bull, higher_bear = higher_timeframe_bias(indicators)
+    higher_aligned = higher_bear if take_profit < entry_price else higher_bull
+
+    # Filter for good opportunities (now accepting more signals)
+    if success_chance > 70 and risk_percentage < 2 and higher_aligned:  # Relaxed criteria
+        return {
+            "Symbol": symbol,
+            "Entry Price": entry_price,
+            "Take Profit": take_profit,
+            "Stop Loss": stop_loss,
+            "Position Risk": f"{risk_percentage:.2f}%",
+            "Leverage": min(round(leverage), 5),  # Cap at 5x
+            "Trailing Stop": 2,  # Default trailing stop
+            "Chances of Success": success_chance
+        }
+    return None
 
-def main():
+@timed('scan.fetch_and_score')
+def scan_symbols(symbols, concurrency=SCAN_CONCURRENCY, batch_size=SCAN_BATCH_SIZE,
+                 with_depth=False, with_klines=False, on_signal=None, state=None,
+                 fetch_indicators=None, with_timeframes=False):
+    """Fetch market data for all symbols concurrently and score each one as its data lands.
+
+    Indicator batches run in parallel and are scored with the vectorized engine as they
+    land; order books, klines and higher-timeframe features (when enabled) are scheduled
+    per symbol as soon as its indicators arrive. ``fetch_indicators`` replaces the
+    TradingView batch fetch (e.g. with fetch_local_indicators_batch). With a ScanState
+    (incremental mode) quiet symbols are only fetched once their refresh interval has
+    passed, and symbols whose indicators have not moved beyond the tolerance reuse their
+    previous result instead of being re-scored.
+    Returns the list of qualifying signals.
+    """
+    engine = ScanEngine(concurrency=concurrency)
+    market_data = {}
+    trading_signals = []
+    skipped = []
+    reused = []
+
+    def emit(signal):
+        trading_signals.append(signal)
+        if on_signal:
+            on_signal(signal)
+
+    def score(ready):
+        if state is not None:
+            for symbol in [symbol for symbol, indicators in ready.items() if state.unchanged(symbol, indicators)]:
+                indicators = ready.pop(symbol)
+                state.touch(symbol, indicators)
+                reused.append(symbol)
+                if state.signal(symbol):
+                    emit(dict(state.signal(symbol)))
+        # Each landed batch is scored in one vectorized pass
+        signals = score_signals(ready) if ready else []
+        for signal in signals:
+            emit(signal)
+        if state is not None:
+            by_symbol = {signal['Symbol']: signal for signal in signals}
+            for symbol, indicators in ready.items():
+                state.update(symbol, indicators, by_symbol.get(symbol))
+
+    def on_result(job, result):
+        kind, key = job.key
+        if kind == 'indicators':
+            follow_ups = []
+            ready = {}
+            for symbol, indicators in (result or {}).items():
+                progress = {'indicators': indicators, 'pending': set()}
+                market_data[symbol] = progress
+                if with_depth:
+                    progress['pending'].add('depth')
+                    follow_ups.append(ScanJob(('depth', symbol), KUCOIN_SPOT_HOST, analyze_order_book, (symbol,)))
+                if with_klines:
+                    progress['pending'].add('klines')
+                    follow_ups.append(ScanJob(('klines', symbol), KUCOIN_FUTURES_HOST, fetch_klines, (symbol,)))
+                if with_timeframes:
+                    progress['pending'].add('timeframes')
+                    follow_ups.append(ScanJob(('timeframes', symbol), KUCOIN_FUTURES_HOST, fetch_timeframe_features, (symbol,)))
+                if not progress['pending']:
+                    ready[symbol] = indicators
+            score(ready)
+            return follow_ups
+
+        progress = market_data[key]
+        progress[kind] = result
+        progress['pending'].discard(kind)
+        if kind == 'depth' and result is not None and len(result):
+            # Depth features travel with the indicators so the scoring engine can read them as columns
+            progress['indicators'].update(depth_features(result))
+        if kind == 'timeframes' and result:
+            progress['indicators'].update(result)
+        if not progress['pending']:
+            score({key: progress['indicators']})
+        return None
+
+    fetch_indicators = fetch_indicators or fetch_crypto_indicators_batch
+    indicator_host = KUCOIN_FUTURES_HOST if fetch_indicators is fetch_local_indicators_batch else TRADINGVIEW_HOST
+    to_fetch = symbols
+    if state is not None:
+        to_fetch, skipped = state.due(symbols)
+
+    jobs = [
+        ScanJob(('indicators', start), indicator_host, fetch_indicators, (to_fetch[start:start + batch_size],))
+        for start in range(0, len(to_fetch), batch_size)
+    ]
+    engine.run(jobs, on_result)
+    print(f"Received indicators for {len(market_data)} of {len(to_fetch)} symbols")
+    if state is not None:
+        print(f"Incremental scan: {len(skipped)} quiet symbols not fetched, {len(reused)} unchanged symbols not re-scored")
+        state.save()
+    if indicator_host == TRADINGVIEW_HOST:
+        source_stats = get_source_stats()
+        for source, (hits, misses) in sorted(source_stats.totals().items()):
+            print(f"{source}: {hits / max(hits + misses, 1):.0%} hit rate over {hits + misses:g} lookups")
+        source_stats.save()
+    return trading_signals
+
+def main(symbols=None, channel=None, incremental=None, top_k=None, stream=None):
     print("Using a minimum success chance of 70%.")
     print("\nFetching market data...")
     
     # Get all available symbols
-    symbols = fetch_all_symbols()
+    if symbols is None:
+        symbols = fetch_all_symbols()
     if not symbols:
         print("No symbols found.")
         return
 
-    for symbol in symbols:
-        print(f"Found data for {symbol}")
+    # Stage one: the cached bulk contracts data prunes the universe before any per-symbol request
+    if top_k is None:
+        top_k = int(os.getenv('PREFILTER_TOP_K', PREFILTER_TOP_K))
+    if top_k:
+        candidates = prefilter_symbols(symbols, top_k=top_k)
+        # The same list back means there was no bulk data; an empty one means no candidates this cycle
+        if candidates is not symbols:
+            print(f"Pre-filter kept {len(candidates)} of {len(symbols)} symbols by 24h turnover")
+            symbols = candidates
 
     print(f"\nAnalyzing {len(symbols)} symbols...")
     
-    trading_signals = []
-    for symbol in symbols:
-        indicators = fetch_crypto_indicators(symbol)
-        if not indicators or 'close' not in indicators:
-            continue
-            
-        last_price = indicators['close']
-        entry_price, take_profit, stop_loss, leverage = advanced_trading_strategy(indicators, last_price)
-        
-        # Calculate success chance
-        trend_score = calculate_trend_score(indicators)
-        macd_strength = abs(indicators.get('MACD.macd', 0) - indicators.get('MACD.signal', 0)) / last_price
-        position_size_factor = trend_score / 100
-        stoch_k = indicators.get('Stoch.K', 50)
-        stoch_d = indicators.get('Stoch.D', 50)
-        vwap_trend = last_price > indicators.get('VWAP|60', last_price)
-        volume_trend = indicators.get('volume', 0) > 0
-        
-        success_chance = calculate_enhanced_success_chance(
-            trend_score, macd_strength, position_size_factor,
-            stoch_k, stoch_d, vwap_trend, volume_trend
+    if incremental is None:
+        incremental = os.getenv('INCREMENTAL_SCAN', '').lower() in ('1', 'true', 'yes')
+    # INDICATOR_SOURCE=local computes the indicators from KuCoin klines instead of TradingView
+    local = os.getenv('INDICATOR_SOURCE', 'tradingview').lower() == 'local'
+    # Streaming hands high-conviction signals to the executor while the scan is still running
+    if stream is None:
+        stream = os.getenv('STREAM_SIGNALS', '').lower() in ('1', 'true', 'yes')
+    # New signals are also checked against the positions already open
+    positions = fetch_position_symbols()
+    signal_stream = None
+    if stream and channel is not None:
+        signal_stream = SignalStream(
+            channel.publish, limit=MAX_SIGNALS, capacity=MAX_SIGNALS * 4,
+            compatible=lambda signal, held: bool(filter_correlated_signals([signal], 1, held=held, positions=positions)),
         )
-        
-        # Calculate position risk
-        atr = indicators.get('ATR|60', last_price * 0.01)
-        risk_percentage = (abs(entry_price - stop_loss) / entry_price) * 100
-        
-        # Filter for good opportunities (now accepting more signals)
-        if success_chance > 70 and risk_percentage < 2:  # Relaxed criteria
-            signal = {
-                "Symbol": symbol,
-                "Entry Price": entry_price,
-                "Take Profit": take_profit,
-                "Stop Loss": stop_loss,
-                "Position Risk": f"{risk_percentage:.2f}%",
-                "Leverage": min(round(leverage), 5),  # Cap at 5x
-                "Trailing Stop": 2  # Default trailing stop
-            }
-            trading_signals.append(signal)
-    
-    # Sort by success chance but keep multiple signals
-    trading_signals.sort(key=lambda x: float(x["Position Risk"].rstrip('%')))
+    trading_signals = scan_symbols(
+        symbols, state=get_scan_state() if incremental else None,
+        fetch_indicators=fetch_local_indicators_batch if local else fetch_crypto_indicators_batch,
+        with_timeframes=os.getenv('MULTI_TIMEFRAME', '').lower() in ('1', 'true', 'yes'),
+        on_signal=signal_stream.offer if signal_stream else None,
+    )
     
-    # Save all qualifying signals (up to 5)
-    max_signals = min(5, len(trading_signals))
+    if signal_stream is not None:
+        # Released signals are already with the executor; the rest of the slots are filled now
+        if signal_stream.first_release is not None:
+            print(f"\nFirst signal released {signal_stream.first_release - signal_stream.started:.2f}s after scan start")
+        selected_signals = signal_stream.finish(
+            select=lambda candidates, held, limit: filter_correlated_signals(candidates, limit, held=held,
+                                                                             positions=positions)
+        )
+        max_signals = len(selected_signals)
+    else:
+        # Sort by success chance but keep multiple signals
+        trading_signals.sort(key=lambda x: float(x["Position Risk"].rstrip('%')))
+        trading_signals = filter_correlated_signals(trading_signals, MAX_SIGNALS, positions=positions)
+
+        # Save all qualifying signals (up to 5)
+        max_signals = min(MAX_SIGNALS, len(trading_signals))
+        selected_signals = trading_signals[:max_signals]
     if max_signals > 0:
-        with open('signals.json', 'w') as f:
-            json.dump(trading_signals[:max_signals], f, indent=4)
-        print(f"\nSaved top {max_signals} trading signals to 'signals.json'")
+        print(f"\nSaving top {max_signals} trading signals to 'signals.json'")
         
         print("\nTop opportunities:")
-        for signal in trading_signals[:max_signals]:
-            print(f"{signal['Symbol']}: {success_chance}% success, {signal['Position Risk']} risk, {signal['Leverage']}x leverage")
+        for signal in selected_signals:
+            print(f"{signal['Symbol']}: {signal['Chances of Success']}% success, {signal['Position Risk']} risk, {signal['Leverage']}x leverage")
         
         print("\nFound trading opportunities!")
         print("----------------------------")
-        for signal in trading_signals[:max_signals]:
+        for signal in selected_signals:
             print(f"\nSymbol: {signal['Symbol']}")
-            print(f"Success Chance: {success_chance}%")
+            print(f"Success Chance: {signal['Chances of Success']}%")
             print(f"Entry: {signal['Entry Price']}")
             print(f"Take Profit: {signal['Take Profit']}")
             print(f"Stop Loss: {signal['Stop Loss']}")
@@ -480,12 +852,18 @@ def main():
             print(f"Leverage: {signal['Leverage']}x")
     else:
         print("\nNo trading opportunities found meeting the criteria.")
-        # Save empty array to signals.json
-        with open('signals.json', 'w') as f:
-            json.dump([], f)
+
+    # Commit atomically (an empty list included) so the executor never sees a partial file;
+    # a stream has already committed batch by batch
+    if signal_stream is None:
+        if channel is not None:
+            channel.publish(selected_signals)
+        else:
+            write_signals_atomic(selected_signals)
+    return selected_signals
 
 # Ensure the script is executed as a main program
 if __name__ == "__main__":
-    main()
+    main(incremental=True if '--incremental' in sys.argv else None)
 
 
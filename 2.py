@@ -4,61 +4,30 @@ import json
 import math
 from time import sleep
 import datetime
-import hmac
-import hashlib
 import time
 import uuid
-import os
-import base64
-from dotenv import load_dotenv  # Import this
-
-# Load environment variables from .env file
-load_dotenv()
-
-API_KEY = os.getenv('KUCOIN_KEY')
-API_SECRET = os.getenv('KUCOIN_SECRET')
-API_PASSPHRASE = os.getenv('KUCOIN_PASSPHRASE')
-
-# Access environment variables securely
-API_KEY = os.getenv('KUCOIN_KEY')
-API_SECRET = os.getenv('KUCOIN_SECRET')
-API_PASSPHRASE = os.getenv('KUCOIN_PASSPHRASE')
-
-if not all([API_KEY, API_SECRET, API_PASSPHRASE]):
-    raise ValueError("API keys and passphrase must be set")
-
-def get_kucoin_headers(endpoint, query_string='', method='GET'):
-    now = int(time.time() * 1000)  # Corrected call to time()
-    str_to_sign = f"{now}{method}{endpoint}{query_string}"
-    signature = hmac.new(API_SECRET.encode('utf-8'), str_to_sign.encode('utf-8'), hashlib.sha256).digest()
-    passphrase = hmac.new(API_SECRET.encode('utf-8'), API_PASSPHRASE.encode('utf-8'), hashlib.sha256).digest()
-    
-    headers = {
-        "KC-API-SIGN": base64.b64encode(signature).decode('utf-8'),
-        "KC-API-TIMESTAMP": str(now),
-        "KC-API-KEY": API_KEY,
-        "KC-API-PASSPHRASE": base64.b64encode(passphrase).decode('utf-8'),
-        "KC-API-KEY-VERSION": "2"
-    }
-    return headers
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from kucoin_client import get_client
+from contract_cache import get_contract_cache
+from signal_channel import file_version, wait_for_signals_file
+from metrics import timed
+
+# Loads the .env credentials and raises if the API keys or passphrase are missing
+client = get_client()
+
+MAX_POSITIONS = 3  # Positions opened per scan
+FILL_TIMEOUT = 5  # Seconds to wait for the exchange to report the entry filled
+FILL_POLL_INTERVAL = 0.05  # First delay between fill checks; doubles up to the maximum
+FILL_POLL_MAX_INTERVAL = 0.5
 
 def fetch_all_symbols():
-    url = "https://api-futures.kucoin.com/api/v1/contracts/active"
-    headers = get_kucoin_headers('/api/v1/contracts/active')
-    data = fetch_data(url, headers)
-    if data is None:
+    symbols_info = get_contract_cache().all()
+    if not symbols_info:
         print("Error fetching symbols. Skipping order placement.")
         return {}
-    symbols_info = {}
-    for item in data:
-        print(item)
-        symbols_info[item['symbol']] = item
     return symbols_info
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
 def adjust_price(price, tick_size):
     """Adjust price to be a multiple of the tick size and return as string for the API."""
     if tick_size == 0:  # Handle zero tick size
@@ -95,9 +64,9 @@ def load_trading_signals(filename='signals.json'):
         return []
 
 
-def fetch_data(url, headers):
+def fetch_data(endpoint, query_string=''):
     try:
-        response = requests.get(url, headers=headers)
+        response = client.get(endpoint, query_string)
         if response.status_code == 200:
             return response.json()['data']
         else:
@@ -107,19 +76,16 @@ def fetch_data(url, headers):
         print(f"HTTP Request failed: {e}")
         return None
 
+@timed('exec.balance')
 def get_futures_balance(currency='USDT'):
     endpoint = "/api/v1/account-overview"
     query_string = f"?currency={currency}"
-    headers = get_kucoin_headers(endpoint, query_string, 'GET')
-    url = "https://api-futures.kucoin.com" + endpoint + query_string
-    response = requests.get(url, headers=headers)
+    response = client.get(endpoint, query_string)
     if response.status_code == 200:
         return float(response.json()['data']['availableBalance'])
     print(f"Error fetching futures balance: {response.status_code}, {response.text}")
     return 0
 
-import time  # Ensure this is not overshadowed or misused in the code
-
 def calculate_quantity(price, capital, leverage):
   """Calculate the maximum quantity that can be bought with the given capital at the specified leverage."""
   max_quantity = (capital * leverage) / price
@@ -127,7 +93,6 @@ def calculate_quantity(price, capital, leverage):
 
 def place_stop_loss_and_take_profit(symbol, entry_price, stop_loss, take_profit, trailing_stop, quantity, side, symbols_info, futures_balance):
     tick_size = symbols_info[symbol]['tickSize']
-    orders = {}
     
     # Opposite side for closing orders
     stop_side = 'sell' if side == 'buy' else 'buy'
@@ -143,8 +108,6 @@ def place_stop_loss_and_take_profit(symbol, entry_price, stop_loss, take_profit,
         'price': adjust_price(stop_loss, tick_size)
     }
     
-    orders['stop_loss'] = place_order(**stop_loss_params)
-    
     # Place Take Profit as a limit order
     take_profit_params = {
         'symbol': symbol,
@@ -156,8 +119,6 @@ def place_stop_loss_and_take_profit(symbol, entry_price, stop_loss, take_profit,
         'price': adjust_price(take_profit, tick_size)
     }
     
-    orders['take_profit'] = place_order(**take_profit_params)
-    
     # Place backup stop as a market stop order
     backup_stop_price = adjust_price(
         stop_loss * 0.99 if side == 'buy' else stop_loss * 1.01,
@@ -174,9 +135,11 @@ def place_stop_loss_and_take_profit(symbol, entry_price, stop_loss, take_profit,
         'price': backup_stop_price
     }
     
-    orders['market_stop'] = place_order(**backup_stop_params)
-    
-    return orders
+    # The three orders are independent, so all of them go out at once
+    order_params = {'stop_loss': stop_loss_params, 'take_profit': take_profit_params, 'market_stop': backup_stop_params}
+    with ThreadPoolExecutor(max_workers=len(order_params)) as pool:
+        futures = {name: pool.submit(place_order, **params) for name, params in order_params.items()}
+    return {name: future.result() for name, future in futures.items()}
 
 def place_trailing_stop(symbol, quantity, activation_price, callback_rate, side):
     endpoint = "/api/v1/orders"
@@ -190,11 +153,8 @@ def place_trailing_stop(symbol, quantity, activation_price, callback_rate, side)
         'callbackRate': str(callback_rate)
     }
     
-    headers = get_kucoin_headers(endpoint, json.dumps(params), 'POST')
-    url = "https://api-futures.kucoin.com" + endpoint
-    
     try:
-        response = requests.post(url, headers=headers, json=params)
+        response = client.post(endpoint, params)
         if response.status_code == 200:
             return response.json()
         print(f"Error placing trailing stop: {response.status_code}, {response.text}")
@@ -206,6 +166,7 @@ def place_trailing_stop(symbol, quantity, activation_price, callback_rate, side)
 def calculate_order_side(entry_price, take_profit):
     return "sell" if take_profit < entry_price else "buy"
 
+@timed('exec.place_order')
 def place_order(symbol, quantity, leverage, futures_balance, order_type, side="buy", price=None):
     client_oid = str(uuid.uuid4())
     
@@ -232,11 +193,9 @@ def place_order(symbol, quantity, leverage, futures_balance, order_type, side="b
         params['type'] = 'market'
 
     endpoint = "/api/v1/orders"
-    headers = get_kucoin_headers(endpoint, json.dumps(params), 'POST')
-    url = "https://api-futures.kucoin.com" + endpoint
 
     try:
-        response = requests.post(url, headers=headers, json=params)
+        response = client.post(endpoint, params)
         result = response.json()
         if response.status_code != 200:
             print(f"Error placing {order_type} order: {result}")
@@ -250,99 +209,205 @@ def determine_order_side(entry_price, take_profit):
     """Determine the side of the order based on entry and take profit prices."""
     return "buy" if take_profit > entry_price else "sell"
 
-def main():
-    symbols_info = fetch_all_symbols()
+def fetch_order(order_id):
+    """Return the exchange's view of an order (None if it could not be read)."""
+    response = client.get(f"/api/v1/orders/{order_id}")
+    if response.status_code == 200:
+        return response.json().get('data')
+    print(f"Error fetching order {order_id}: {response.status_code}, {response.text}")
+    return None
+
+@timed('exec.wait_for_fill')
+def wait_for_fill(order_id, timeout=FILL_TIMEOUT):
+    """Poll an order until the exchange reports it done, backing off between polls.
+
+    Returns the final order, or None if it is still open (or unreadable) after ``timeout`` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    interval = FILL_POLL_INTERVAL
+    while True:
+        try:
+            order = fetch_order(order_id)
+        except requests.RequestException as e:
+            print(f"HTTP Request failed: {e}")
+            order = None
+        if order and order.get('status') == 'done':
+            return order
+        if time.monotonic() + interval > deadline:
+            return None
+        sleep(interval)
+        interval = min(interval * 2, FILL_POLL_MAX_INTERVAL)
+
+@timed('exec.signal')
+def execute_signal(signal, symbols_info, futures_balance, effective_capital_per_signal):
+    """Enter one signal at market, confirm the fill and protect the position.
+
+    Returns a trade record with the entry and protection results, whether a position was
+    opened and the time from sending the entry until every protective order was accepted.
+    """
+    symbol = signal["Symbol"]
+
+    # Use the exact values from the signal
+    leverage = min(signal["Leverage"], 5)  # Cap at 5x for safety
+    entry_price = signal["Entry Price"]  # We'll still use this for calculations
+    take_profit = signal["Take Profit"]
+    stop_loss = signal["Stop Loss"]
+    trailing_stop = signal["Trailing Stop"]
+    position_risk = float(signal["Position Risk"].rstrip('%')) / 100
+
+    # Calculate position size based on signal's risk
+    risk_amount = effective_capital_per_signal * position_risk
+    position_size = risk_amount / (abs(entry_price - stop_loss) / entry_price)
+
+    side = calculate_order_side(entry_price, take_profit)
+
+    # Adjust quantity based on lot size and max size
+    lot_size = symbols_info[symbol]['lotSize']
+    max_size = symbols_info[symbol]['maxOrderQty']
+    quantity = adjust_quantity(position_size, entry_price, leverage, lot_size, max_size)
+
+    # Output is collected and printed in one piece so parallel trades do not interleave
+    log = [
+        f"\nPlacing orders for {symbol}:",
+        f"Risk: {position_risk*100:.2f}%",
+        f"Size: {quantity}",
+        f"Leverage: {leverage}x",
+        f"Side: {side}",
+    ]
+    trade = {'symbol': symbol, 'entered': False, 'protected': False, 'time_to_fill': None, 'time_to_protected': None,
+             'sent_at': time.time()}
+
+    started = time.perf_counter()
+    # Place market order for immediate entry
+    entry_order = place_order(
+        symbol=symbol,
+        quantity=quantity,
+        leverage=leverage,
+        futures_balance=futures_balance,
+        order_type="market",  # Changed to market order
+        side=side
+    )
+    trade['entry'] = entry_order
+
+    if not (entry_order and entry_order.get('code') == '200000'):
+        log.append(f"Failed to place market order for {symbol}")
+        print("\n".join(log))
+        return trade
+
+    # Confirm the fill instead of waiting a fixed time
+    filled = wait_for_fill(entry_order['data']['orderId'])
+    trade['time_to_fill'] = time.perf_counter() - started
+    if filled is None:
+        # Protecting a position that may exist beats leaving one that does exist unprotected
+        log.append(f"Fill for {symbol} not confirmed within {FILL_TIMEOUT}s, protecting the requested size")
+    else:
+        filled_size = int(float(filled.get('filledSize') or filled.get('dealSize') or 0))
+        if filled_size == 0:
+            log.append(f"Market order for {symbol} was not filled")
+            print("\n".join(log))
+            return trade
+        quantity = filled_size
+    trade['entered'] = True
+    log.append(f"\nMarket order filled in {trade['time_to_fill']*1000:.0f} ms! Setting up protection orders...")
+
+    # Place protective orders
+    protection_orders = place_stop_loss_and_take_profit(
+        symbol, entry_price, stop_loss, take_profit, trailing_stop,
+        quantity, side, symbols_info, futures_balance
+    )
+    trade['protection'] = protection_orders
+    trade['protected'] = all(order and order.get('code') == '200000' for order in protection_orders.values())
+    if trade['protected']:
+        trade['time_to_protected'] = time.perf_counter() - started
+
+    log += [
+        f"\nOrders for {symbol}:",
+        f"Entry (Market): {entry_order}",
+        f"Stop Loss: {protection_orders.get('stop_loss')}",
+        f"Take Profit: {protection_orders.get('take_profit')}",
+        f"Backup Stop: {protection_orders.get('market_stop')}",
+    ]
+    if not trade['protected']:
+        log.append(f"WARNING: {symbol} is not fully protected")
+    print("\n".join(log))
+    return trade
+
+def main(symbols_info=None, trading_signals=None, slots=None):
+    if trading_signals is None:
+        trading_signals = load_trading_signals()
+    if not trading_signals:
+        print("No trading signals to process.")
+        return
+
+    if symbols_info is None:
+        symbols_info = fetch_all_symbols()
     futures_balance = get_futures_balance()
     
     if futures_balance <= 0:
         print("No available capital in futures wallet.")
         return
 
-    trading_signals = load_trading_signals()
-    if not trading_signals:
-        print("No trading signals to process.")
-        return
-
     # More conservative capital allocation
-    max_positions = 3
+    max_positions = MAX_POSITIONS
     risk_per_trade = 0.02  # 2% risk per trade
     effective_capital_per_signal = min(
         futures_balance * risk_per_trade,
         futures_balance / max_positions
     )
 
+    # A streamed scan arrives in several batches; ``slots`` is what earlier batches left over
+    slots = max_positions if slots is None else min(slots, max_positions)
     active_positions = 0
-    for signal in trading_signals:
-        if active_positions >= max_positions:
-            break
-            
-        symbol = signal["Symbol"]
-        if symbol not in symbols_info:
-            print(f"Symbol {symbol} not found in available futures. Skipping...")
-            continue
-
-        # Use the exact values from the signal
-        leverage = min(signal["Leverage"], 5)  # Cap at 5x for safety
-        entry_price = signal["Entry Price"]  # We'll still use this for calculations
-        take_profit = signal["Take Profit"]
-        stop_loss = signal["Stop Loss"]
-        trailing_stop = signal["Trailing Stop"]
-        position_risk = float(signal["Position Risk"].rstrip('%')) / 100
-        
-        # Verify the trade still meets our risk criteria
-        if position_risk > risk_per_trade:
-            print(f"Skipping {symbol}: Position risk {position_risk*100}% exceeds maximum {risk_per_trade*100}%")
-            continue
-        
-        # Calculate position size based on signal's risk
-        risk_amount = effective_capital_per_signal * position_risk
-        position_size = risk_amount / (abs(entry_price - stop_loss) / entry_price)
-        
-        side = calculate_order_side(entry_price, take_profit)
-        
-        # Adjust quantity based on lot size and max size
-        lot_size = symbols_info[symbol]['lotSize']
-        max_size = symbols_info[symbol]['maxOrderQty']
-        quantity = adjust_quantity(position_size, entry_price, leverage, lot_size, max_size)
-
-        print(f"\nPlacing orders for {symbol}:")
-        print(f"Risk: {position_risk*100:.2f}%")
-        print(f"Size: {quantity}")
-        print(f"Leverage: {leverage}x")
-        print(f"Side: {side}")
-
-        # Place market order for immediate entry
-        entry_order = place_order(
-            symbol=symbol,
-            quantity=quantity,
-            leverage=leverage,
-            futures_balance=futures_balance,
-            order_type="market",  # Changed to market order
-            side=side
-        )
-
-        if entry_order and entry_order.get('code') == '200000':
-            print("\nMarket order placed! Setting up protection orders...")
-            
-            # Wait briefly for the order to be processed
-            time.sleep(1)
-            
-            # Place protective orders
-            protection_orders = place_stop_loss_and_take_profit(
-                symbol, entry_price, stop_loss, take_profit, trailing_stop,
-                quantity, side, symbols_info, futures_balance
-            )
-            
-            print(f"\nOrders for {symbol}:")
-            print(f"Entry (Market): {entry_order}")
-            print(f"Stop Loss: {protection_orders.get('stop_loss')}")
-            print(f"Take Profit: {protection_orders.get('take_profit')}")
-            print(f"Backup Stop: {protection_orders.get('market_stop')}")
-            
-            active_positions += 1
-            print(f"Active positions: {active_positions}/{max_positions}")
-        else:
-            print(f"Failed to place market order for {symbol}")
+    trades = []
+    remaining = list(trading_signals)
+    with ThreadPoolExecutor(max_workers=max_positions) as pool:
+        # Signals are independent, so each wave executes as many as there are free slots at
+        # once; a failed entry frees its slot for the next signal in the following wave
+        while remaining and active_positions < slots:
+            wave = []
+            while remaining and len(wave) < slots - active_positions:
+                signal = remaining.pop(0)
+                symbol = signal["Symbol"]
+                if symbol not in symbols_info:
+                    print(f"Symbol {symbol} not found in available futures. Skipping...")
+                    continue
+
+                # Verify the trade still meets our risk criteria
+                position_risk = float(signal["Position Risk"].rstrip('%')) / 100
+                if position_risk > risk_per_trade:
+                    print(f"Skipping {symbol}: Position risk {position_risk*100}% exceeds maximum {risk_per_trade*100}%")
+                    continue
+                wave.append(signal)
+
+            futures = [
+                pool.submit(execute_signal, signal, symbols_info, futures_balance, effective_capital_per_signal)
+                for signal in wave
+            ]
+            for signal, future in zip(wave, futures):
+                try:
+                    trade = future.result()
+                except Exception as e:
+                    # One bad signal (missing contract spec, zero stop distance, ...) must not
+                    # drop the trades already entered in this wave
+                    print(f"Error executing {signal['Symbol']}: {str(e)}")
+                    trade = {'symbol': signal['Symbol'], 'entered': False, 'protected': False, 'time_to_fill': None,
+                             'time_to_protected': None, 'sent_at': None, 'error': str(e)}
+                trades.append(trade)
+                if trade['entered']:
+                    active_positions += 1
+                    print(f"Active positions: {active_positions}/{max_positions}")
+
+    for trade in trades:
+        if trade['time_to_protected'] is not None:
+            print(f"{trade['symbol']}: filled in {trade['time_to_fill']*1000:.0f} ms, "
+                  f"protected in {trade['time_to_protected']*1000:.0f} ms")
+        elif trade['entered']:
+            print(f"{trade['symbol']}: entered but NOT fully protected")
+    return trades
 
 if __name__ == "__main__":
+    if '--wait' in sys.argv:
+        # Separate-process mode: block until the scanner commits a fresh signals.json
+        print("Waiting for new signals...")
+        wait_for_signals_file(since=file_version())
     main()
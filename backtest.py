@@ -0,0 +1,271 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from tabulate import tabulate
+
+import scoring
+from indicators import kline_indicators
+
+TAKER_FEE = 0.0006  # Market entry, stops and time exits
+MAKER_FEE = 0.0002  # Take-profit limit orders
+SCAN_EVERY = 45  # Bars between scans; 45 on 1-minute data mirrors the live 45 minute cycle
+MAX_HOLD_BARS = 1440  # Open trades are closed at market after this many bars
+MAX_POSITIONS = 3  # Signals taken per scan, as in 2.py:main
+MAX_LEVERAGE = 5
+RISK_PER_TRADE = 0.02  # Fraction of capital committed per trade (2.py: effective_capital_per_signal)
+BACKUP_STOP_OFFSET = 0.01  # Backup stop sits 1% beyond the stop loss
+INITIAL_CAPITAL = 1000.0
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+EXIT_REASONS = ('take_profit', 'stop_loss', 'backup_stop', 'time')
+
+
+def column_filename(name):
+    # '|' is not allowed in Windows file names
+    return name.replace('|', '@') + '.npy'
+
+
+def save_dataset(path, symbols, timestamps, columns):
+    """Write a dataset directory: symbols.json, timestamp.npy (T) and one (T x N) .npy per column."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'symbols.json'), 'w') as file:
+        json.dump(list(symbols), file)
+    np.save(os.path.join(path, 'timestamp.npy'), np.asarray(timestamps, dtype=np.int64))
+    for name, values in columns.items():
+        np.save(os.path.join(path, column_filename(name)), np.asarray(values, dtype=np.float64))
+
+
+def load_dataset(path):
+    """Memory-map a dataset directory; returns (symbols, timestamps, {column: (T x N) array})."""
+    with open(os.path.join(path, 'symbols.json'), 'r') as file:
+        symbols = json.load(file)
+    timestamps = np.load(os.path.join(path, 'timestamp.npy'), mmap_mode='r')
+    columns = {}
+    for filename in os.listdir(path):
+        if filename.endswith('.npy') and filename != 'timestamp.npy':
+            columns[filename[:-4].replace('@', '|')] = np.load(os.path.join(path, filename), mmap_mode='r')
+    return symbols, timestamps, columns
+
+
+def dataset_indicators(columns):
+    """Indicator source reading precomputed (T x N) indicator columns from the dataset."""
+    def indicators_at(bars):
+        return {name: np.asarray(columns[name][bars]) for name in scoring.SCORING_COLUMNS if name in columns}
+    return indicators_at
+
+
+def generate_signals(columns, bars, indicators_at, max_positions=MAX_POSITIONS, params=None):
+    """Score every symbol at every scan bar in one vectorized pass and pick each scan's top signals.
+
+    Like the live bot, qualifying signals are ranked by position risk (lowest first) and
+    the first ``max_positions`` per scan are taken. ``params`` overrides scoring.DEFAULT_PARAMS.
+    Returns a dict of 1-D candidate arrays.
+    """
+    values = indicators_at(bars)
+    close = np.asarray(columns['close'][bars], dtype=np.float64)
+    count = close.size
+    data = {}
+    for name in scoring.SCORING_COLUMNS:
+        if name == 'close':
+            data[name] = close.ravel()
+        elif name == 'volume' and name not in values:
+            data[name] = np.asarray(columns['volume'][bars], dtype=np.float64).ravel()
+        else:
+            data[name] = values[name].ravel() if name in values else np.full(count, np.nan)
+
+    rows = np.flatnonzero(np.isfinite(data['close']) & (data['close'] > 0))
+    result = scoring.score_columns({name: column[rows] for name, column in data.items()}, params)
+    keep = np.flatnonzero(result['qualifies'])
+    rows = rows[keep]
+    symbols_per_bar = close.shape[1]
+    candidates = {
+        'bar': np.asarray(bars)[rows // symbols_per_bar],
+        'symbol': rows % symbols_per_bar,
+        'entry_price': result['entry_price'][keep],
+        'take_profit': result['take_profit'][keep],
+        'stop_loss': result['stop_loss'][keep],
+        'leverage': np.minimum(result['leverage'][keep], MAX_LEVERAGE),
+        'risk': result['risk_percentage'][keep],
+        'success_chance': result['signal_success_chance'][keep],
+    }
+
+    # Rank within each scan by risk, then keep the first max_positions of every scan
+    order = np.lexsort((candidates['risk'], candidates['bar']))
+    candidates = {name: values[order] for name, values in candidates.items()}
+    bar = candidates['bar']
+    group_start = np.flatnonzero(np.r_[True, bar[1:] != bar[:-1]])
+    rank = np.arange(len(bar)) - np.repeat(group_start, np.diff(np.r_[group_start, len(bar)]))
+    return {name: values[rank < max_positions] for name, values in candidates.items()}
+
+
+def _first_hit(hits):
+    """Index of the first True per row, or the row length where there is none."""
+    first = np.argmax(hits, axis=1)
+    first[~hits.any(axis=1)] = hits.shape[1]
+    return first
+
+
+def simulate_exits(columns, candidates, horizon=MAX_HOLD_BARS, primary_stop=True):
+    """Simulate the orders place_stop_loss_and_take_profit puts around a market entry.
+
+    Entry is a market order at the next bar's open. The stop loss and the backup stop
+    are reduce-only market stops and the take profit a limit order, all for the full
+    size, so the first one touched closes the trade. A stop and a take profit touched in
+    the same bar count as the stop. Gaps fill at the bar open. ``primary_stop=False``
+    simulates the primary stop being rejected, leaving only the backup stop.
+    """
+    count = len(candidates['bar'])
+    bars = columns['close'].shape[0]
+    entry_bar = candidates['bar'] + 1
+    exit_bar = np.zeros(count, dtype=np.int64)
+    exit_price = np.full(count, np.nan)
+    reason = np.zeros(count, dtype=np.int64)
+
+    side = np.where(candidates['take_profit'] < candidates['entry_price'], -1, 1)
+    stop = candidates['stop_loss']
+    if not primary_stop:
+        stop = np.where(side > 0, stop * (1 - BACKUP_STOP_OFFSET), stop * (1 + BACKUP_STOP_OFFSET))
+    take_profit = candidates['take_profit']
+    entry_price = np.full(count, np.nan)
+
+    tradable = entry_bar < bars
+    for symbol in np.unique(candidates['symbol'][tradable]):
+        idx = np.flatnonzero((candidates['symbol'] == symbol) & tradable)
+        padding = np.full(horizon, np.nan)
+        windows = {
+            name: sliding_window_view(np.concatenate([np.asarray(columns[name][:, symbol], dtype=np.float64), padding]), horizon)[entry_bar[idx]]
+            for name in ('open', 'high', 'low', 'close')
+        }
+        long = (side[idx] > 0)[:, None]
+        # NaN padding compares False, so nothing triggers past the end of the data
+        stop_hit = np.where(long, windows['low'] <= stop[idx, None], windows['high'] >= stop[idx, None])
+        tp_hit = np.where(long, windows['high'] >= take_profit[idx, None], windows['low'] <= take_profit[idx, None])
+        first_stop, first_tp = _first_hit(stop_hit), _first_hit(tp_hit)
+
+        available = np.minimum(horizon, bars - entry_bar[idx])
+        last = available - 1
+        hit_stop = (first_stop <= first_tp) & (first_stop < available)
+        hit_tp = ~hit_stop & (first_tp < available)
+        offset = np.where(hit_stop, first_stop, np.where(hit_tp, first_tp, last))
+
+        rows = np.arange(len(idx))
+        bar_open = windows['open'][rows, offset]
+        stop_fill = np.where(side[idx] > 0, np.minimum(bar_open, stop[idx]), np.maximum(bar_open, stop[idx]))
+        tp_fill = np.where(side[idx] > 0, np.maximum(bar_open, take_profit[idx]), np.minimum(bar_open, take_profit[idx]))
+        exit_price[idx] = np.where(hit_stop, stop_fill, np.where(hit_tp, tp_fill, windows['close'][rows, last]))
+        exit_bar[idx] = entry_bar[idx] + offset
+        reason[idx] = np.where(hit_stop, 1 if primary_stop else 2, np.where(hit_tp, 0, 3))
+        entry_price[idx] = windows['open'][:, 0]
+
+    trades = dict(candidates)
+    trades.update({
+        'side': side, 'entry_bar': entry_bar, 'fill_price': entry_price,
+        'exit_bar': exit_bar, 'exit_price': exit_price, 'reason': reason,
+    })
+    return {name: values[tradable] for name, values in trades.items()}
+
+
+def remove_overlapping(trades):
+    """Keep one open trade per symbol: a signal is skipped while that symbol's last trade is open."""
+    order = np.argsort(trades['entry_bar'], kind='stable')
+    busy_until = {}
+    keep = []
+    for i in order.tolist():
+        symbol = int(trades['symbol'][i])
+        if trades['entry_bar'][i] > busy_until.get(symbol, -1):
+            keep.append(i)
+            busy_until[symbol] = trades['exit_bar'][i]
+    keep = np.array(sorted(keep), dtype=np.int64)
+    return {name: values[keep] for name, values in trades.items()}
+
+
+def apply_costs(trades, capital=INITIAL_CAPITAL, taker_fee=TAKER_FEE, maker_fee=MAKER_FEE):
+    """Add return, fee and PnL columns. Each trade commits RISK_PER_TRADE of the starting capital
+    at its leverage (no compounding; liquidation is not modelled since stops sit well inside it)."""
+    gross = trades['side'] * (trades['exit_price'] - trades['fill_price']) / trades['fill_price']
+    exit_fee = np.where(trades['reason'] == 0, maker_fee, taker_fee)
+    fees = taker_fee + exit_fee * trades['exit_price'] / trades['fill_price']
+    notional = capital * RISK_PER_TRADE * trades['leverage']
+    trades['gross_return'] = gross
+    trades['fees'] = fees * notional
+    trades['pnl'] = (gross - fees) * notional
+    return trades
+
+
+def summarize(trades, capital=INITIAL_CAPITAL):
+    pnl = trades['pnl']
+    if not len(pnl):
+        return {'trades': 0}
+    equity = capital + np.cumsum(pnl[np.argsort(trades['exit_bar'], kind='stable')])
+    peak = np.maximum.accumulate(np.r_[capital, equity])
+    wins, losses = pnl[pnl > 0].sum(), -pnl[pnl < 0].sum()
+    summary = {
+        'trades': int(len(pnl)),
+        'win_rate': float((pnl > 0).mean()),
+        'total_pnl': float(pnl.sum()),
+        'return_pct': float(pnl.sum() / capital * 100),
+        'avg_trade_pnl': float(pnl.mean()),
+        'profit_factor': float(wins / losses) if losses else float('inf'),
+        'max_drawdown_pct': float(((peak - np.r_[capital, equity]) / peak).max() * 100),
+        'fees': float(trades['fees'].sum()),
+        'avg_bars_held': float((trades['exit_bar'] - trades['entry_bar'] + 1).mean()),
+        'sharpe_per_trade': float(pnl.mean() / pnl.std()) if pnl.std() else 0.0,
+    }
+    for code, name in enumerate(EXIT_REASONS):
+        summary[f'exits_{name}'] = int((trades['reason'] == code).sum())
+    return summary
+
+
+def run_backtest(columns, indicators_at=None, scan_every=SCAN_EVERY, horizon=MAX_HOLD_BARS,
+                 capital=INITIAL_CAPITAL, primary_stop=True, max_positions=MAX_POSITIONS, params=None):
+    """Replay a (T x N) OHLCV dataset through the live scoring and order logic.
+
+    ``indicators_at(bars)`` returns {indicator: (len(bars) x N) array}; by default the
+    indicator columns stored in the dataset are used. Returns (trades, summary).
+    """
+    indicators_at = indicators_at or dataset_indicators(columns)
+    bars = np.arange(scan_every - 1, columns['close'].shape[0], scan_every)
+    candidates = generate_signals(columns, bars, indicators_at, max_positions, params)
+    trades = simulate_exits(columns, candidates, horizon, primary_stop)
+    trades = apply_costs(remove_overlapping(trades), capital)
+    return trades, summarize(trades, capital)
+
+
+def main(argv):
+    """python backtest.py DATASET_DIR [--every BARS] [--horizon BARS] [--trades FILE.csv] [--backup-only] [--local-indicators]"""
+    if not argv:
+        print(main.__doc__)
+        return
+    options = {argv[i][2:]: argv[i + 1] for i in range(1, len(argv) - 1) if argv[i].startswith('--')}
+    started = time.perf_counter()
+    symbols, timestamps, columns = load_dataset(argv[0])
+    trades, summary = run_backtest(
+        columns,
+        # Indicators computed from the dataset's OHLCV instead of stored indicator columns
+        indicators_at=kline_indicators(columns, timestamps) if '--local-indicators' in argv else None,
+        scan_every=int(options.get('every', SCAN_EVERY)),
+        horizon=int(options.get('horizon', MAX_HOLD_BARS)),
+        primary_stop='--backup-only' not in argv,
+    )
+    print(f"Backtested {len(symbols)} symbols x {columns['close'].shape[0]} bars in {time.perf_counter() - started:.1f}s")
+    print(tabulate(summary.items(), headers=['Metric', 'Value']))
+
+    if options.get('trades'):
+        with open(options['trades'], 'w') as file:
+            file.write('symbol,side,signal_time,entry_time,exit_time,entry,exit,reason,leverage,gross_return,pnl\n')
+            for i in range(len(trades['pnl'])):
+                file.write(','.join(str(value) for value in (
+                    symbols[trades['symbol'][i]], 'buy' if trades['side'][i] > 0 else 'sell',
+                    int(timestamps[trades['bar'][i]]), int(timestamps[trades['entry_bar'][i]]),
+                    int(timestamps[trades['exit_bar'][i]]), trades['fill_price'][i], trades['exit_price'][i],
+                    EXIT_REASONS[trades['reason'][i]], trades['leverage'][i], trades['gross_return'][i], trades['pnl'][i],
+                )) + '\n')
+        print(f"Wrote {len(trades['pnl'])} trades to {options['trades']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
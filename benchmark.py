@@ -0,0 +1,471 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import zlib
+from collections import defaultdict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from tabulate import tabulate
+
+BENCHMARK_DIR = 'benchmarks'
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, 'fixtures')
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, 'results.jsonl')
+DEFAULT_ITERATIONS = 5
+SYNTHETIC_SYMBOLS = 300
+REGRESSION_THRESHOLD = 0.10  # Flag stages whose p50 got more than 10% slower than the last run
+
+FIXTURES = ('contracts_active', 'tradingview_scan', 'depth500', 'klines', 'account_overview', 'order', 'signals')
+
+
+def fixture_path(path, name):
+    return os.path.join(path, name + '.json')
+
+
+def load_fixtures(path=FIXTURE_DIR):
+    fixtures = {}
+    for name in FIXTURES:
+        with open(fixture_path(path, name), 'r') as file:
+            fixtures[name] = json.load(file)
+    return fixtures
+
+
+def save_fixtures(fixtures, path=FIXTURE_DIR):
+    os.makedirs(path, exist_ok=True)
+    for name, body in fixtures.items():
+        with open(fixture_path(path, name), 'w') as file:
+            json.dump(body, file)
+
+
+class FixtureTransport:
+    """Answers every HTTP request from recorded response bodies instead of the network.
+
+    Installed in place of HTTPAdapter.send, so plain requests.get/post calls and the
+    pooled KuCoin client session are both served. Requests without a fixture fail with
+    a ConnectionError; nothing ever leaves the process.
+    """
+
+    def __init__(self, fixtures, latency=0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.requests = defaultdict(int)
+        self.placed = {}
+        self.scan_rows = {row['s']: row for row in fixtures['tradingview_scan']['data']}
+
+    def body_for(self, request):
+        url = urlsplit(request.url)
+        path = url.path
+        if path.endswith('/contracts/active'):
+            return 'contracts', self.fixtures['contracts_active']
+        if path.endswith('/scan'):
+            tickers = json.loads(request.body)['symbols']['tickers']
+            rows = [self.scan_rows[ticker] for ticker in tickers if ticker in self.scan_rows]
+            return 'tradingview_scan', {'totalCount': len(rows), 'data': rows}
+        if path.endswith('/depth500'):
+            return 'depth500', self.fixtures['depth500']
+        if path.endswith('/kline/query'):
+            return 'klines', self.kline_page(parse_qs(url.query))
+        if path.endswith('/positions'):
+            return 'positions', self.fixtures.get('positions', {'code': '200000', 'data': []})
+        if path.endswith('/account-overview'):
+            return 'account_overview', self.fixtures['account_overview']
+        if path.endswith('/orders') and request.method == 'POST':
+            body = json.loads(json.dumps(self.fixtures['order']))
+            body['data']['orderId'] = uuid.uuid4().hex
+            self.placed[body['data']['orderId']] = json.loads(request.body)
+            return 'orders', body
+        if '/orders/' in path and request.method == 'GET':
+            # Orders placed through the transport are reported filled in full
+            order_id = path.rsplit('/', 1)[1]
+            params = self.placed.get(order_id, {})
+            return 'order_status', {'code': '200000', 'data': {
+                'id': order_id, 'symbol': params.get('symbol'), 'status': 'done', 'isActive': False,
+                'filledSize': int(float(params.get('size') or 0)), 'cancelExist': False}}
+        raise requests.ConnectionError(f"No fixture for {request.method} {request.url}")
+
+    def kline_page(self, query):
+        """Re-time the recorded candles onto the requested range, rotated per symbol so that
+        different symbols do not move in lockstep."""
+        rows = self.fixtures['klines']['data']
+        granularity_ms = int(query['granularity'][0]) * 60 * 1000
+        start, end = int(query['from'][0]), int(query['to'][0])
+        offset = zlib.crc32(query['symbol'][0].encode('utf-8'))
+        page = []
+        for i, timestamp in enumerate(range(start, end + 1, granularity_ms)):
+            page.append([timestamp] + rows[(offset + i) % len(rows)][1:])
+        return {'code': '200000', 'data': page}
+
+    def send(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        endpoint, body = self.body_for(request)
+        self.requests[endpoint] += 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    @contextlib.contextmanager
+    def installed(self):
+        original = HTTPAdapter.send
+        HTTPAdapter.send = lambda adapter, request, **kwargs: self.send(request)
+        try:
+            yield self
+        finally:
+            HTTPAdapter.send = original
+
+
+class StageTimer:
+    """Collects wall-clock durations per stage; wrap() times every call of a module function."""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self._patches = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name].append(time.perf_counter() - started)
+
+    def wrap(self, owner, attribute, name, **defaults):
+        original = getattr(owner, attribute)
+
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return original(*args, **{**defaults, **kwargs})
+
+        setattr(owner, attribute, timed)
+        self._patches.append((owner, attribute, original))
+
+    def restore(self):
+        for owner, attribute, original in reversed(self._patches):
+            setattr(owner, attribute, original)
+        self._patches = []
+
+    def reset(self):
+        self.durations = defaultdict(list)
+
+    def summary(self):
+        return {
+            name: {
+                'calls': len(values),
+                'p50_ms': float(np.percentile(values, 50) * 1000),
+                'p99_ms': float(np.percentile(values, 99) * 1000),
+                'total_ms': float(np.sum(values) * 1000),
+            }
+            for name, values in sorted(self.durations.items())
+        }
+
+
+def synthesize_fixtures(count=SYNTHETIC_SYMBOLS, seed=0):
+    """Deterministic fixtures with the shape of the real responses, for machines without recordings.
+
+    About a fifth of the symbols get an aligned uptrend so the scan produces signals.
+    """
+    from bot_daemon import load_script
+    scanner = sys.modules.get('scanner') or load_script('1.py', 'scanner')
+
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYN{i:03d}USDTM" for i in range(count)]
+    contracts = [
+        {'symbol': symbol, 'rootSymbol': 'USDT', 'type': 'FFWCSX', 'baseCurrency': symbol[:-5], 'quoteCurrency': 'USDT',
+         'status': 'Open', 'tickSize': 0.001, 'lotSize': 1, 'maxOrderQty': 1000000, 'multiplier': 0.01,
+         'makerFeeRate': 0.0002, 'takerFeeRate': 0.0006, 'maxLeverage': 75, 'isInverse': False}
+        for symbol in symbols
+    ]
+
+    rows = []
+    for i, symbol in enumerate(symbols):
+        price = float(np.exp(rng.uniform(np.log(0.01), np.log(50000))))
+        trending = rng.random() < 0.2
+        spacing = 0.002 if trending else 0.0
+        values = {column: price * (1 + rng.normal(0, 0.01)) for column in scanner.INDICATOR_COLUMNS}
+        emas = ['EMA5', 'EMA10', 'EMA20', 'EMA30', 'EMA50', 'EMA100', 'EMA200']
+        for rank, column in enumerate(emas):
+            values[column] = price * (1 - spacing * (rank + 1)) if trending else values[column]
+        values.update({
+            'close': price,
+            'volume': float(rng.uniform(1e3, 1e7)),
+            'VWAP|60': price * (0.995 if trending else 1 + rng.normal(0, 0.005)),
+            'RSI|60': float(rng.uniform(35, 65) if trending else rng.uniform(0, 100)),
+            'ADX|60': float(rng.uniform(10, 40)),
+            'ATR|60': price * float(rng.uniform(0.002, 0.006) if trending else rng.uniform(0.002, 0.03)),
+            'MACD.macd': price * (0.002 if trending else float(rng.normal(0, 0.002))),
+            'MACD.signal': price * (0.0005 if trending else float(rng.normal(0, 0.002))),
+            'Stoch.K': float(rng.uniform(40, 60) if trending else rng.uniform(0, 100)),
+            'Stoch.D': float(rng.uniform(40, 60) if trending else rng.uniform(0, 100)),
+            'Pivot.M.Classic.R1': price * 1.05,
+            'Pivot.M.Classic.S1': price * 0.95,
+        })
+        # Most pairs are listed on the first exchange, the rest only on the fallback
+        exchange = 'BYBIT' if i % 10 else 'BINANCE'
+        rows.append({'s': f"{exchange}:{scanner.to_tradingview_symbol(symbol)}",
+                     'd': [values[column] for column in scanner.INDICATOR_COLUMNS]})
+
+    levels = np.arange(1, 501)
+    depth = {
+        'sequence': '1', 'time': 0,
+        'bids': [[f"{100 - 0.01 * level:.2f}", f"{size:.4f}"] for level, size in zip(levels, rng.uniform(0.1, 50, 500))],
+        'asks': [[f"{100 + 0.01 * level:.2f}", f"{size:.4f}"] for level, size in zip(levels, rng.uniform(0.1, 50, 500))],
+    }
+
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))
+    opens = np.r_[100, closes[:-1]]
+    klines = [
+        [0, float(o), float(max(o, c) * 1.002), float(min(o, c) * 0.998), float(c), float(v)]
+        for o, c, v in zip(opens, closes, rng.uniform(1e3, 1e5, 500))
+    ]
+
+    signals = []
+    for symbol, row in zip(symbols[:3], rows[:3]):
+        close = row['d'][scanner.INDICATOR_COLUMNS.index('close')]
+        signals.append({
+            'Symbol': symbol, 'Entry Price': close, 'Take Profit': close * 1.02, 'Stop Loss': close * 0.99,
+            'Position Risk': '1.00%', 'Leverage': 3, 'Trailing Stop': 2, 'Chances of Success': 80.0,
+        })
+
+    return {
+        'contracts_active': {'code': '200000', 'data': contracts},
+        'tradingview_scan': {'totalCount': len(rows), 'data': rows},
+        'depth500': {'code': '200000', 'data': depth},
+        'klines': {'code': '200000', 'data': klines},
+        'account_overview': {'code': '200000', 'data': {
+            'accountEquity': 1000.0, 'availableBalance': 1000.0, 'marginBalance': 1000.0, 'currency': 'USDT'}},
+        'order': {'code': '200000', 'data': {'orderId': ''}},
+        'signals': signals,
+    }
+
+
+def record_fixtures(path=FIXTURE_DIR):
+    """Record the public endpoints live. Order placement is never exercised for real, and the
+    account overview is only recorded when API credentials are configured."""
+    from bot_daemon import load_script
+    import contract_cache
+    import kline_store
+    import scoring
+    scanner = load_script('1.py', 'scanner')
+
+    fixtures = synthesize_fixtures()
+    contracts = requests.get(contract_cache.CONTRACTS_URL, timeout=10).json()
+    fixtures['contracts_active'] = contracts
+    symbols = [item['symbol'] for item in contracts['data']]
+
+    rows = []
+    for exchange in ('BYBIT', 'BINANCE'):
+        tickers = [f"{exchange}:{scanner.to_tradingview_symbol(symbol)}" for symbol in symbols]
+        for start in range(0, len(tickers), scanner.TRADINGVIEW_BATCH_SIZE):
+            rows.extend(scanner.scan_tradingview(tickers[start:start + scanner.TRADINGVIEW_BATCH_SIZE]) or [])
+    fixtures['tradingview_scan'] = {'totalCount': len(rows), 'data': rows}
+
+    depth = scanner.fetch_data(f"https://{scanner.KUCOIN_SPOT_HOST}/api/v1/level2/depth500?symbol={symbols[0]}")
+    if depth and depth.get('data'):
+        fixtures['depth500'] = depth
+    now_ms = int(time.time() * 1000)
+    klines = kline_store.fetch_kline_page(symbols[0], 60, now_ms - 500 * 3600 * 1000, now_ms)
+    if klines:
+        fixtures['klines'] = {'code': '200000', 'data': klines}
+
+    try:
+        from kucoin_client import get_client
+        response = get_client().get('/api/v1/account-overview', '?currency=USDT')
+        if response.status_code == 200:
+            fixtures['account_overview'] = response.json()
+    except ValueError:
+        print("No API credentials configured; keeping the synthetic account overview")
+
+    indicators = scanner.fetch_crypto_indicators_batch(symbols)
+    signals = sorted(scoring.score_signals(indicators), key=lambda s: float(s['Position Risk'].rstrip('%')))
+    if signals:
+        fixtures['signals'] = signals[:3]
+    save_fixtures(fixtures, path)
+    print(f"Recorded fixtures for {len(symbols)} symbols to {path}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(fixtures, iterations=DEFAULT_ITERATIONS, latency=0.0, rate_limits=False, warmup=1):
+    """Time the scan (contracts, indicators, depth, scoring, correlation) and the signal-to-orders path.
+
+    Runs in a temporary working directory with its own kline store and contract cache file.
+    Returns the result record.
+    """
+    # 2.py refuses to import without credentials; no request leaves the process anyway
+    for name in ('KUCOIN_KEY', 'KUCOIN_SECRET', 'KUCOIN_PASSPHRASE'):
+        os.environ.setdefault(name, 'benchmark')
+
+    from bot_daemon import load_script
+    import contract_cache
+    import kline_store
+    import request_scheduler
+
+    workdir = tempfile.mkdtemp(prefix='kutrade-benchmark-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    # Without rate limits the bot is measured, not the per-host throttle
+    saved_scheduler = request_scheduler.set_scheduler(
+        request_scheduler.RequestScheduler(limits=None if rate_limits else {})
+    )
+
+    transport = FixtureTransport(fixtures, latency)
+    timer = StageTimer()
+    try:
+        with transport.installed():
+            scanner = sys.modules.get('scanner') or load_script('1.py', 'scanner')
+            executor = sys.modules.get('executor') or load_script('2.py', 'executor')
+            contract_cache._cache = contract_cache.ContractCache(ttl=float('inf'), path='contracts_cache.json')
+            kline_store._store = kline_store.KlineStore(os.path.join(workdir, 'klines'))
+
+            timer.wrap(scanner, 'fetch_crypto_indicators_batch', 'scan.indicators_batch')
+            timer.wrap(scanner, 'analyze_order_book', 'scan.depth')
+            timer.wrap(scanner, 'score_signals', 'scan.scoring')
+            timer.wrap(scanner, 'filter_correlated_signals', 'scan.correlation')
+            timer.wrap(scanner, 'scan_symbols', 'scan.fetch_and_score', with_depth=True)
+            timer.wrap(executor, 'get_futures_balance', 'exec.balance')
+            timer.wrap(executor, 'place_order', 'exec.place_order')
+
+            def cycle():
+                with timer.stage('contracts.refresh'):
+                    contract_cache.get_contract_cache().refresh()
+                symbols = scanner.fetch_all_symbols()
+                with timer.stage('scan.total'):
+                    # The whole universe is scanned (no turnover pre-filter) so symbols/s stays comparable across runs
+                    scanner.main(symbols, top_k=0)
+                with timer.stage('exec.signal_to_orders'):
+                    executor.main(contract_cache.get_contract_cache().all(), fixtures['signals'])
+                return len(symbols)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(warmup):
+                    cycle()
+                timer.reset()
+                symbol_counts = [cycle() for _ in range(iterations)]
+
+                # One extra cycle under tracemalloc, kept out of the timings it would distort
+                durations = timer.durations
+                timer.reset()
+                tracemalloc.start()
+                with timer.stage('memory'):
+                    contract_cache.get_contract_cache().refresh()
+                    scanner.main(scanner.fetch_all_symbols(), top_k=0)
+                    _, scan_peak = tracemalloc.get_traced_memory()
+                    tracemalloc.reset_peak()
+                    executor.main(contract_cache.get_contract_cache().all(), fixtures['signals'])
+                    _, exec_peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                timer.durations = durations
+    finally:
+        timer.restore()
+        request_scheduler.set_scheduler(saved_scheduler)
+        os.chdir(cwd)
+
+    stages = timer.summary()
+    scan_times = np.array(timer.durations['scan.total']) + np.array(timer.durations['contracts.refresh'])
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'iterations': iterations,
+        'symbols': int(np.median(symbol_counts)),
+        'latency_ms': latency * 1000,
+        'rate_limits': rate_limits,
+        'throughput_symbols_per_s': float(np.median(np.array(symbol_counts) / scan_times)),
+        'peak_memory_mb': {'scan': scan_peak / 2 ** 20, 'execution': exec_peak / 2 ** 20},
+        'requests_per_cycle': {name: count // (iterations + warmup + 1) for name, count in transport.requests.items()},
+        'stages': stages,
+    }
+
+
+def load_results(path=RESULTS_FILE):
+    try:
+        with open(path, 'r') as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def append_result(result, path=RESULTS_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as file:
+        file.write(json.dumps(result) + '\n')
+
+
+def comparable(previous, result):
+    keys = ('symbols', 'latency_ms', 'rate_limits')
+    return all(previous.get(key) == result.get(key) for key in keys)
+
+
+def report(result, previous=None):
+    print(f"\nBenchmark at {result['commit'] or 'working tree'}: {result['symbols']} symbols, "
+          f"{result['iterations']} iterations")
+    print(f"Throughput: {result['throughput_symbols_per_s']:.1f} symbols/s")
+    print(f"Peak memory: scan {result['peak_memory_mb']['scan']:.1f} MB, "
+          f"execution {result['peak_memory_mb']['execution']:.1f} MB")
+
+    table = []
+    regressions = []
+    for name, stage in result['stages'].items():
+        row = [name, stage['calls'], f"{stage['p50_ms']:.2f}", f"{stage['p99_ms']:.2f}"]
+        if previous and name in previous['stages'] and previous['stages'][name]['p50_ms']:
+            change = stage['p50_ms'] / previous['stages'][name]['p50_ms'] - 1
+            row.append(f"{change * 100:+.1f}%")
+            if change > REGRESSION_THRESHOLD:
+                regressions.append(name)
+        table.append(row)
+    headers = ['Stage', 'Calls', 'p50 ms', 'p99 ms'] + (['p50 vs last'] if previous else [])
+    print(tabulate(table, headers=headers))
+
+    if previous:
+        change = result['throughput_symbols_per_s'] / previous['throughput_symbols_per_s'] - 1
+        print(f"\nThroughput vs {previous.get('commit') or 'previous run'}: {change * 100:+.1f}%")
+    if regressions:
+        print(f"Possible regressions (p50 more than {REGRESSION_THRESHOLD:.0%} slower): {', '.join(regressions)}")
+
+
+def main(argv):
+    """python benchmark.py [--iterations N] [--latency MS] [--rate-limits] [--fixtures DIR] [--record] [--synthesize N] [--no-save]"""
+    options = {argv[i][2:]: argv[i + 1] for i in range(len(argv) - 1) if argv[i].startswith('--')}
+    path = options.get('fixtures', FIXTURE_DIR)
+    if '--record' in argv:
+        record_fixtures(path)
+        return
+    if '--synthesize' in argv or not os.path.exists(fixture_path(path, FIXTURES[0])):
+        count = int(options['synthesize']) if options.get('synthesize', '').isdigit() else SYNTHETIC_SYMBOLS
+        print(f"Writing synthetic fixtures for {count} symbols to {path}")
+        save_fixtures(synthesize_fixtures(count), path)
+
+    result = run_benchmark(
+        load_fixtures(path),
+        iterations=int(options.get('iterations', DEFAULT_ITERATIONS)),
+        latency=float(options.get('latency', 0)) / 1000,
+        rate_limits='--rate-limits' in argv,
+    )
+    previous = [entry for entry in load_results() if comparable(entry, result)]
+    report(result, previous[-1] if previous else None)
+    if '--no-save' not in argv:
+        append_result(result)
+        print(f"Saved to {RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
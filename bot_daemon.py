@@ -0,0 +1,199 @@
+import importlib.util
+import os
+import signal
+import sys
+import threading
+import time
+
+from signal_channel import SignalChannel
+from contract_cache import get_contract_cache
+from market_feed import MarketFeed, set_active_feed
+from metrics import get_metrics, MetricsServer
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CYCLE_INTERVAL = 2700  # 45 minutes between the start of one scan and the next
+ERROR_COOLDOWN = 300  # 5 minute cooldown on error
+
+
+def load_script(filename, module_name):
+    """Import one of the numbered bot scripts (1.py, 2.py, ...) as a regular module."""
+    path = os.path.join(SCRIPT_DIR, filename)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class BotDaemon:
+    """Runs scan -> execute cycles inside one process, keeping modules and state warm."""
+
+    def __init__(self, cycle_interval=CYCLE_INTERVAL, error_cooldown=ERROR_COOLDOWN, feed_symbols=None,
+                 metrics_port=None):
+        self.cycle_interval = cycle_interval
+        self.error_cooldown = error_cooldown
+        self.feed_symbols = feed_symbols
+        self.feed = None
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.stop_event = threading.Event()
+
+        # Imported once: numpy, sessions and connection pools live for the whole run
+        self.scanner = load_script('1.py', 'scanner')
+        self.executor = load_script('2.py', 'executor')
+
+        # Contract specs are shared with both modules and refreshed off the critical path
+        self.contracts = get_contract_cache()
+        self.cycles = 0
+
+        # The executor thread wakes as soon as the scanner commits signals to the channel
+        self.channel = SignalChannel()
+        self.executor_thread = None
+
+        # Per cycle: when the scan started, positions entered so far and when the first order went out
+        self.scan_started = None
+        self.cycle_entered = 0
+        self.first_order_at = None
+
+    def start_executor(self):
+        if self.executor_thread is None or not self.executor_thread.is_alive():
+            self.executor_thread = threading.Thread(target=self._execute_loop, name='executor', daemon=True)
+            self.executor_thread.start()
+
+    def _execute_loop(self):
+        while True:
+            signals = self.channel.wait(timeout=0.5)
+            if signals is None:
+                # Batches committed before a shutdown are still executed so run_cycle can finish
+                if self.stop_event.is_set():
+                    break
+                continue
+            try:
+                slots = self.executor.MAX_POSITIONS - self.cycle_entered
+                if signals and slots <= 0:
+                    print(f"\nAll {self.executor.MAX_POSITIONS} position slots used this cycle, skipping {len(signals)} signals")
+                    continue
+                print("\nSignals committed, running executor to place trades...")
+                trades = self.executor.main(self.contracts.all() or None, signals, slots=slots) or []
+                self.cycle_entered += sum(1 for trade in trades if trade['entered'])
+                sent = [trade['sent_at'] for trade in trades if trade.get('sent_at')]
+                if sent and self.first_order_at is None:
+                    self.first_order_at = min(sent)
+            except Exception as e:
+                print(f"Error in executor: {str(e)}")
+            finally:
+                self.channel.task_done()
+
+    def run_cycle(self):
+        self.start_executor()
+        symbols = self.contracts.symbols() or None
+
+        print("\nRunning scanner to generate signals...")
+        self.scan_started = time.time()
+        self.cycle_entered = 0
+        self.first_order_at = None
+        metrics = get_metrics()
+        with metrics.stage('cycle.scan'):
+            self.scanner.main(symbols, channel=self.channel)
+
+        # Orders for this cycle must be in before the cycle counts as done
+        with metrics.stage('cycle.execute_wait'):
+            self.channel.join()
+        if self.first_order_at is not None:
+            metrics.observe('cycle.time_to_first_order', self.first_order_at - self.scan_started)
+            print(f"Time to first order: {self.first_order_at - self.scan_started:.2f}s after scan start")
+        self.cycles += 1
+        print("\n" + metrics.summary())
+
+    def stop(self, *_):
+        if not self.stop_event.is_set():
+            print("\nShutdown requested, finishing the current step...")
+        self.stop_event.set()
+
+    def start_feed(self):
+        """Stream books/tickers for ``feed_symbols`` so scanner and executor can read them locally."""
+        if self.feed_symbols and self.feed is None:
+            self.feed = MarketFeed(self.feed_symbols)
+            self.feed.start()
+            set_active_feed(self.feed)
+
+    def start_metrics(self):
+        """Serve the stage timings and request counts on http://127.0.0.1:<metrics_port>/metrics."""
+        if self.metrics_port and self.metrics_server is None:
+            self.metrics_server = MetricsServer(port=self.metrics_port).start()
+            print(f"Metrics at {self.metrics_server.url}")
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.contracts.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            self.metrics_server = None
+        if self.feed is not None:
+            set_active_feed(None)
+            self.feed.stop()
+            self.feed = None
+        if self.executor_thread is not None:
+            self.executor_thread.join()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+    def start(self):
+        """Start the background services: contract refresh, market feed and metrics endpoint."""
+        self.contracts.start_background_refresh()
+        self.start_feed()
+        self.start_metrics()
+
+    def run(self, hours=None):
+        """Run cycles until ``hours`` have elapsed (forever if None) or a shutdown is requested."""
+        deadline = time.monotonic() + hours * 3600 if hours else None
+        self.start()
+
+        while not self.stop_event.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                print("\nRun duration reached.")
+                break
+
+            started = time.monotonic()
+            wait = self.cycle_interval
+            try:
+                self.run_cycle()
+                wait = max(0.0, self.cycle_interval - (time.monotonic() - started))
+                print(f"\nCycle {self.cycles} finished in {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                print(f"Error in main loop: {str(e)}")
+                wait = self.error_cooldown
+
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - time.monotonic()))
+            if wait > 0:
+                print(f"\nWaiting {wait / 60:.1f} minutes before next scan...")
+                self.stop_event.wait(wait)
+
+        self.shutdown()
+        print(f"\nTrading bot stopped after {self.cycles} cycles.")
+
+
+def create_daemon(**options):
+    """Build the daemon every launcher (GO.PY, main.py, this module) runs, configured from the environment.
+
+    MARKET_FEED_SYMBOLS (comma-separated) starts the WebSocket market feed for those symbols
+    and METRICS_PORT serves the Prometheus endpoint; ``options`` override both.
+    """
+    feed_symbols = [s for s in os.getenv('MARKET_FEED_SYMBOLS', '').split(',') if s]
+    options.setdefault('feed_symbols', feed_symbols or None)
+    options.setdefault('metrics_port', int(os.getenv('METRICS_PORT', 0)) or None)
+    return BotDaemon(**options)
+
+
+def main(hours=None):
+    daemon = create_daemon()
+    daemon.install_signal_handlers()
+    daemon.run(hours)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -1,36 +1,19 @@
 import requests
-import hmac
-import hashlib
-import time
-import os
-import base64
 import json
+import sys
+import time
 import uuid  # Ensure UUID is imported
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from concurrent.futures import ThreadPoolExecutor
+from kucoin_client import get_client, POOL_SIZE
+from request_scheduler import CircuitOpenError
+from metrics import timed
 
-API_KEY = os.getenv('KUCOIN_KEY')
-API_SECRET = os.getenv('KUCOIN_SECRET')
-API_PASSPHRASE = os.getenv('KUCOIN_PASSPHRASE')
+client = get_client()
 
-def get_kucoin_headers(endpoint, query_string='', method='GET'):
-    now = int(time.time() * 1000)
-    str_to_sign = f"{now}{method}{endpoint}{query_string}"
-    signature = hmac.new(API_SECRET.encode('utf-8'), str_to_sign.encode('utf-8'), hashlib.sha256).digest()
-    passphrase = hmac.new(API_SECRET.encode('utf-8'), API_PASSPHRASE.encode('utf-8'), hashlib.sha256).digest()
-    
-    headers = {
-        "KC-API-SIGN": base64.b64encode(signature).decode('utf-8'),
-        "KC-API-TIMESTAMP": str(now),
-        "KC-API-KEY": API_KEY,
-        "KC-API-PASSPHRASE": base64.b64encode(passphrase).decode('utf-8'),
-        "KC-API-KEY-VERSION": "2"
-    }
-    return headers
+FLATTEN_ROUNDS = 3  # Close/verify passes before flatten gives up
 
-def close_position(symbol, size, leverage):
+@timed('close.position')
+def close_position(symbol, size, leverage, reduce_only=False, emergency=False):
     endpoint = "/api/v1/orders"
     side = 'buy' if float(size) < 0 else 'sell'  # Determine the correct side to close the position
     order_type = 'market'
@@ -43,21 +26,26 @@ def close_position(symbol, size, leverage):
         'size': abs(int(size)),  # Market order requires size as an integer
         'leverage': leverage,  # Add leverage to the order parameters
     }
-    query_string = json.dumps(params)
-    headers = get_kucoin_headers(endpoint, query_string, 'POST')
-    url = f"https://api-futures.kucoin.com{endpoint}"
-    
-    response = requests.post(url, headers=headers, json=params)
+    if reduce_only:
+        # Can only shrink the position, so a close racing another fill never opens the other side
+        params['reduceOnly'] = True
+    # An emergency flatten goes out even while the order circuit is open
+    response = client.post(endpoint, params, breaker=not emergency)
     if response.status_code == 200:
         print(f"Closed position for {symbol}: {response.json()}")
+        return True
     else:
         print(f"Failed to close position for {symbol}: {response.status_code} {response.text}")
+        return False
 
-def fetch_open_positions():
+def fetch_open_positions(on_error=None, emergency=False):
+    """Open positions, or ``on_error`` if they could not be read."""
     endpoint = "/api/v1/positions"
-    headers = get_kucoin_headers(endpoint, '', 'GET')
-    url = f"https://api-futures.kucoin.com{endpoint}"
-    response = requests.get(url, headers=headers)
+    try:
+        response = client.get(endpoint, breaker=not emergency)
+    except requests.RequestException as e:
+        print(f"Failed to fetch open positions: {e}")
+        return on_error
     if response.status_code == 200:
         data = response.json()['data']
         positions = [position for position in data if float(position['currentQty']) != 0]
@@ -67,12 +55,71 @@ def fetch_open_positions():
         return positions
     else:
         print(f"Failed to fetch open positions: {response.text}")
-        return []
+        return on_error
+
+def cancel_all_orders(endpoint, emergency=False):
+    """Cancel every resting order behind ``endpoint`` (/api/v1/orders or /api/v1/stopOrders) in one request."""
+    response = client.delete(endpoint, breaker=not emergency)
+    if response.status_code == 200:
+        cancelled = (response.json().get('data') or {}).get('cancelledOrderIds') or []
+        print(f"Cancelled {len(cancelled)} orders via {endpoint}")
+        return True
+    print(f"Failed to cancel orders via {endpoint}: {response.status_code} {response.text}")
+    return False
+
+@timed('close.flatten')
+def flatten(rounds=FLATTEN_ROUNDS):
+    """Emergency flatten: close every position and cancel every resting order as fast as possible.
+
+    Reduce-only market closes for all positions and the two bulk cancels (limit and stop
+    orders) go out concurrently over the client's pooled connections; then the positions
+    are read back, and anything still open gets another pass. None of it waits for an
+    open circuit breaker. Returns (flat, seconds).
+    """
+    started = time.perf_counter()
+    # None means the positions could not be read; that never counts as flat
+    positions = fetch_open_positions(emergency=True)
+    flat = False
+    with ThreadPoolExecutor(max_workers=POOL_SIZE) as pool:
+        for attempt in range(rounds):
+            tasks = [pool.submit(close_position, p['symbol'], p['currentQty'], p['leverage'], True, True)
+                     for p in positions or []]
+            if attempt == 0:
+                tasks += [pool.submit(cancel_all_orders, endpoint, True) for endpoint in ("/api/v1/orders", "/api/v1/stopOrders")]
+            for task in tasks:
+                try:
+                    task.result()
+                except requests.RequestException as e:
+                    print(f"HTTP Request failed: {e}")
+
+            positions = fetch_open_positions(emergency=True)
+            if positions == []:
+                flat = True
+                break
+            if positions is None:
+                print(f"Could not verify positions after pass {attempt + 1}")
+            else:
+                print(f"Still open after pass {attempt + 1}: {', '.join(p['symbol'] for p in positions)}")
+
+    elapsed = time.perf_counter() - started
+    if flat:
+        print(f"Account flat in {elapsed*1000:.0f} ms")
+    else:
+        print(f"WARNING: account NOT flat after {rounds} passes ({elapsed*1000:.0f} ms)")
+    return flat, elapsed
 
 def main():
-    open_positions = fetch_open_positions()
+    open_positions = fetch_open_positions(on_error=[])
     for position in open_positions:
-        close_position(position['symbol'], position['currentQty'], position['leverage'])
+        try:
+            close_position(position['symbol'], position['currentQty'], position['leverage'])
+        except CircuitOpenError as e:
+            print(f"Not closing {position['symbol']}: {e}; run with --flatten to bypass")
+        except requests.RequestException as e:
+            print(f"HTTP Request failed: {e}")
 
 if __name__ == "__main__":
-    main()
+    if '--flatten' in sys.argv:
+        flatten()
+    else:
+        main()
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from kucoin_client import FUTURES_BASE_URL
+from request_scheduler import get_scheduler
+from signal_channel import write_json_atomic
+
+CONTRACTS_URL = f"{FUTURES_BASE_URL}/api/v1/contracts/active"
+CONTRACT_CACHE_FILE = 'contracts_cache.json'
+CONTRACT_CACHE_TTL = 3600  # Seconds before specs are considered stale
+
+# Only the fields order sizing, price rounding and the scan pre-filter (prefilter.py) need;
+# the full payload is ~100 fields per contract
+CONTRACT_FIELDS = ('symbol', 'status', 'tickSize', 'lotSize', 'maxOrderQty', 'multiplier',
+                   'turnoverOf24h', 'volumeOf24h', 'priceChgPct', 'lastTradePrice')
+
+
+def fetch_active_contracts(url=CONTRACTS_URL, timeout=10):
+    """Download the active contract list, returning the raw item dicts or None on failure."""
+    try:
+        response = get_scheduler().request('GET', url, lambda: requests.get(url, timeout=timeout))
+        if response.status_code == 200:
+            return response.json().get('data')
+        print(f"Error fetching contracts: {response.status_code}, {response.text}")
+    except requests.RequestException as e:
+        print(f"HTTP Request failed: {e}")
+    return None
+
+
+class ContractCache:
+    """Contract specifications held in memory, persisted to disk and refreshed after a TTL.
+
+    Stale data keeps being served while a background refresh runs, so callers on the
+    order path never wait on the contracts download once the cache has been filled.
+    """
+
+    def __init__(self, ttl=CONTRACT_CACHE_TTL, path=CONTRACT_CACHE_FILE, fetch=fetch_active_contracts,
+                 fields=CONTRACT_FIELDS):
+        self.ttl = ttl
+        self.path = path
+        self.fetch = fetch
+        self.fields = fields
+        self.fetched_at = 0.0
+        self._contracts = {}
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.load()
+
+    def load(self):
+        """Fill the cache from disk; returns True if a usable file was found."""
+        try:
+            with open(self.path, 'r') as file:
+                state = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        # A file written with other fields would serve specs missing some of them
+        if state.get('fields', list(self.fields)) != list(self.fields):
+            return False
+        with self._lock:
+            self._contracts = state.get('contracts', {})
+            self.fetched_at = state.get('fetched_at', 0.0)
+        return bool(self._contracts)
+
+    def save(self):
+        with self._lock:
+            state = {'fetched_at': self.fetched_at, 'fields': list(self.fields), 'contracts': self._contracts}
+        write_json_atomic(state, self.path, indent=None)
+
+    def is_stale(self):
+        return not self._contracts or time.time() - self.fetched_at > self.ttl
+
+    def refresh(self):
+        """Re-download the contract list now. Returns True on success."""
+        # Skip if another thread is already refreshing
+        if not self._refreshing.acquire(blocking=False):
+            return False
+        try:
+            items = self.fetch()
+            if not items:
+                return False
+            contracts = {
+                item['symbol']: {field: item.get(field) for field in self.fields}
+                for item in items if 'symbol' in item
+            }
+            with self._lock:
+                self._contracts = contracts
+                self.fetched_at = time.time()
+            self.save()
+            return True
+        finally:
+            self._refreshing.release()
+
+    def ensure_fresh(self):
+        """Refresh synchronously when empty, in the background when merely stale."""
+        if not self._contracts:
+            self.refresh()
+        elif self.is_stale():
+            threading.Thread(target=self.refresh, name='contract-refresh', daemon=True).start()
+
+    def get(self, symbol):
+        self.ensure_fresh()
+        return self._contracts.get(symbol)
+
+    def all(self):
+        """Return the {symbol: spec} mapping (a snapshot safe to iterate)."""
+        self.ensure_fresh()
+        return self._contracts
+
+    def symbols(self):
+        return list(self.all())
+
+    def start_background_refresh(self, interval=None):
+        """Refresh every ``interval`` seconds (default: the TTL) on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        interval = interval or self.ttl
+        self._stop_event.clear()
+
+        def loop():
+            while not self._stop_event.wait(interval):
+                self.refresh()
+
+        self._thread = threading.Thread(target=loop, name='contract-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_cache = None
+
+def get_contract_cache():
+    """Return the process-wide cache shared by the scanner and the executor."""
+    global _cache
+    if _cache is None:
+        _cache = ContractCache(ttl=float(os.getenv('CONTRACT_CACHE_TTL', CONTRACT_CACHE_TTL)))
+    return _cache
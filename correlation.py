@@ -0,0 +1,113 @@
+import numpy as np
+
+CORRELATION_WINDOW = 100  # Bars of log returns per symbol
+MAX_CORRELATION = 0.7
+RECOMPUTE_EVERY = CORRELATION_WINDOW  # Full recompute cadence to wash out rounding drift
+
+
+class CorrelationEngine:
+    """Rolling-window return correlations for a fixed symbol set.
+
+    Returns live in one (symbols x window) ring buffer. The running sums and the
+    cross-product matrix R @ R.T are kept up to date with a rank-one add/remove per bar,
+    so the full matrix is always one vectorized step away and a single pair is O(1).
+    Missing returns count as 0; symbols with less than half a window of real data are
+    treated as uncorrelated with everything.
+    """
+
+    def __init__(self, symbols, window=CORRELATION_WINDOW):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = window
+        count = len(self.symbols)
+        self.returns = np.zeros((count, window))
+        self.valid = np.zeros((count, window), dtype=bool)
+        self.position = 0  # Column the next bar overwrites
+        self.last_close = np.full(count, np.nan)
+        self.sums = np.zeros(count)
+        self.cross = np.zeros((count, count))
+        self.updates = 0
+
+    @classmethod
+    def from_closes(cls, symbols, closes, window=CORRELATION_WINDOW):
+        """Build from a (symbols x bars) close matrix, e.g. kline_store.KlineStore.closes()."""
+        engine = cls(symbols, window)
+        closes = np.asarray(closes, dtype=np.float64)[:, -(window + 1):]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.log(closes[:, 1:] / closes[:, :-1])
+        valid = np.isfinite(returns)
+        bars = returns.shape[1]
+        engine.returns[:, window - bars:] = np.where(valid, returns, 0.0)
+        engine.valid[:, window - bars:] = valid
+        engine.last_close = closes[:, -1].copy() if closes.shape[1] else engine.last_close
+        engine.recompute()
+        return engine
+
+    def recompute(self):
+        self.sums = self.returns.sum(axis=1)
+        # One BLAS call for all pairwise cross products
+        self.cross = self.returns @ self.returns.T
+
+    def update(self, closes):
+        """Add one bar given the latest close of every symbol (NaN where a symbol has none)."""
+        closes = np.asarray(closes, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            new = np.log(closes / self.last_close)
+        valid = np.isfinite(new)
+        new = np.where(valid, new, 0.0)
+        self.last_close = np.where(np.isfinite(closes) & (closes > 0), closes, self.last_close)
+
+        old = self.returns[:, self.position]
+        self.sums += new - old
+        self.cross += np.outer(new, new) - np.outer(old, old)
+        self.returns[:, self.position] = new
+        self.valid[:, self.position] = valid
+        self.position = (self.position + 1) % self.window
+
+        self.updates += 1
+        if self.updates % RECOMPUTE_EVERY == 0:
+            self.recompute()
+
+    def _has_history(self, rows):
+        return self.valid[rows].sum(axis=-1) >= self.window // 2
+
+    def matrix(self):
+        """Full (symbols x symbols) correlation matrix; NaN where a symbol lacks history or variance."""
+        mean = self.sums / self.window
+        covariance = self.cross / self.window - np.outer(mean, mean)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+            correlation = covariance / np.outer(std, std)
+        unknown = ~self._has_history(slice(None))
+        correlation[unknown, :] = np.nan
+        correlation[:, unknown] = np.nan
+        return correlation
+
+    def correlations(self, symbol, others):
+        """Correlation of ``symbol`` with each of ``others`` in O(len(others)); NaN if unknown."""
+        if symbol not in self.index:
+            return np.full(len(others), np.nan)
+        i = self.index[symbol]
+        rows = np.array([self.index.get(other, -1) for other in others], dtype=np.int64)
+        known = rows >= 0
+        result = np.full(len(others), np.nan)
+        if not known.any() or not self._has_history(i):
+            return result
+        rows = rows[known]
+        mean_i, means = self.sums[i] / self.window, self.sums[rows] / self.window
+        covariance = self.cross[i, rows] / self.window - mean_i * means
+        variance_i = self.cross[i, i] / self.window - mean_i ** 2
+        variances = self.cross[rows, rows] / self.window - means ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = covariance / np.sqrt(np.clip(variance_i, 0, None) * np.clip(variances, 0, None))
+        values[~self._has_history(rows)] = np.nan
+        result[known] = values
+        return result
+
+    def is_correlated(self, symbol, others, max_correlation=MAX_CORRELATION):
+        """True if ``symbol`` has |correlation| above ``max_correlation`` with any of ``others``."""
+        others = [other for other in others if other != symbol]
+        if not others:
+            return False
+        values = np.abs(self.correlations(symbol, others))
+        return bool(np.any(values[~np.isnan(values)] > max_correlation))
@@ -0,0 +1,383 @@
+import copy
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+EMA_LENGTHS = (5, 10, 20, 30, 50, 100, 200)
+RSI_LENGTH = 14
+ATR_LENGTH = 14
+ADX_LENGTH = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+STOCH_LENGTH, STOCH_SMOOTH_K, STOCH_SMOOTH_D = 14, 3, 3
+
+# The TradingView scanner columns this module reproduces. The "|60" names are kept so the
+# scorer reads them unchanged; every column is computed on the candles it is given.
+RECURSIVE_COLUMNS = (
+    [f"EMA{length}" for length in EMA_LENGTHS]
+    + ["RSI|60", "ATR|60", "ADX|60", "MACD.macd", "MACD.signal"]
+)
+WINDOW_COLUMNS = ("Stoch.K", "Stoch.D", "VWAP|60",
+                  "Pivot.M.Classic.Middle", "Pivot.M.Classic.R1", "Pivot.M.Classic.S1")
+
+
+class EMA:
+    """Exponential moving average over a vector of symbols, seeded with the first value (as TradingView's ta.ema)."""
+
+    def __init__(self, count, length):
+        self.alpha = 2.0 / (length + 1)
+        self.value = np.full(count, np.nan)
+
+    def update(self, x, valid):
+        start = valid & np.isnan(self.value)
+        running = valid & ~start
+        self.value = np.where(start, x, np.where(running, self.value + self.alpha * (x - self.value), self.value))
+        return self.value
+
+
+class RMA:
+    """Wilder's moving average, seeded with the simple average of the first ``length`` values (as ta.rma)."""
+
+    def __init__(self, count, length):
+        self.length = length
+        self.total = np.zeros(count)
+        self.seen = np.zeros(count, dtype=np.int64)
+        self.value = np.full(count, np.nan)
+
+    def update(self, x, valid):
+        seeding = valid & (self.seen < self.length)
+        running = valid & ~seeding
+        self.total = np.where(seeding, self.total + x, self.total)
+        self.seen = self.seen + seeding
+        value = np.where(seeding & (self.seen == self.length), self.total / self.length, self.value)
+        self.value = np.where(running, value + (x - value) / self.length, value)
+        return self.value
+
+
+class IncrementalIndicators:
+    """EMA, RSI, ATR, ADX and MACD for many symbols, advanced one candle at a time in O(1).
+
+    ``update`` takes one candle per symbol (arrays of length ``len(symbols)``; NaN where a
+    symbol has no candle) and returns the current values. Symbols start independently at
+    their first valid candle, so histories of different lengths can share one state.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        count = len(self.symbols)
+        self.emas = {length: EMA(count, length) for length in EMA_LENGTHS}
+        self.macd_fast = EMA(count, MACD_FAST)
+        self.macd_slow = EMA(count, MACD_SLOW)
+        self.macd_signal = EMA(count, MACD_SIGNAL)
+        self.gain = RMA(count, RSI_LENGTH)
+        self.loss = RMA(count, RSI_LENGTH)
+        self.true_range = RMA(count, ATR_LENGTH)
+        self.adx_range = RMA(count, ADX_LENGTH)
+        self.plus_dm = RMA(count, ADX_LENGTH)
+        self.minus_dm = RMA(count, ADX_LENGTH)
+        self.adx = RMA(count, ADX_LENGTH)
+        self.prev_high = np.full(count, np.nan)
+        self.prev_low = np.full(count, np.nan)
+        self.prev_close = np.full(count, np.nan)
+        self.bars = 0
+
+    def copy(self):
+        """An independent copy, e.g. to evaluate a forming candle without committing it."""
+        # update() replaces arrays instead of writing into them, so shallow copies are enough
+        clone = copy.copy(self)
+        for name, value in vars(self).items():
+            if isinstance(value, (EMA, RMA)):
+                setattr(clone, name, copy.copy(value))
+        clone.emas = {length: copy.copy(ema) for length, ema in self.emas.items()}
+        return clone
+
+    def take(self, index):
+        """The state of the symbols at ``index`` only, e.g. one symbol's to keep between scans."""
+        clone = _map_arrays([self], lambda arrays: arrays[0][index])
+        clone.symbols = [self.symbols[i] for i in np.atleast_1d(np.arange(len(self.symbols))[index])]
+        return clone
+
+    @classmethod
+    def stack(cls, states):
+        """One state over the symbols of all ``states``, in order, advanced by a single update."""
+        clone = _map_arrays(states, np.concatenate)
+        clone.symbols = [symbol for state in states for symbol in state.symbols]
+        return clone
+
+    def update(self, high, low, close):
+        high, low, close = (np.asarray(values, dtype=np.float64) for values in (high, low, close))
+        valid = np.isfinite(high) & np.isfinite(low) & np.isfinite(close)
+        has_prev = valid & np.isfinite(self.prev_close)
+        values = {}
+
+        for length, ema in self.emas.items():
+            values[f"EMA{length}"] = ema.update(close, valid)
+
+        macd = self.macd_fast.update(close, valid) - self.macd_slow.update(close, valid)
+        values["MACD.macd"] = macd
+        values["MACD.signal"] = self.macd_signal.update(macd, valid)
+
+        change = close - self.prev_close
+        gain = self.gain.update(np.maximum(change, 0), has_prev)
+        loss = self.loss.update(np.maximum(-change, 0), has_prev)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values["RSI|60"] = np.where(loss == 0, 100.0, np.where(gain == 0, 0.0, 100 - 100 / (1 + gain / loss)))
+        values["RSI|60"][np.isnan(gain) | np.isnan(loss)] = np.nan
+
+        # The first candle has no previous close, so its true range is just high - low
+        true_range = np.where(has_prev, np.fmax(high - low, np.fmax(abs(high - self.prev_close),
+                                                                     abs(low - self.prev_close))), high - low)
+        values["ATR|60"] = self.true_range.update(true_range, valid)
+
+        up = high - self.prev_high
+        down = self.prev_low - low
+        plus_dm = self.plus_dm.update(np.where((up > down) & (up > 0), up, 0.0), has_prev)
+        minus_dm = self.minus_dm.update(np.where((down > up) & (down > 0), down, 0.0), has_prev)
+        adx_range = self.adx_range.update(true_range, has_prev)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plus_di = 100 * plus_dm / adx_range
+            minus_di = 100 * minus_dm / adx_range
+            dx = np.nan_to_num(100 * abs(plus_di - minus_di) / (plus_di + minus_di), nan=0.0)
+        values["ADX|60"] = self.adx.update(dx, has_prev & np.isfinite(plus_di))
+
+        self.prev_high = np.where(valid, high, self.prev_high)
+        self.prev_low = np.where(valid, low, self.prev_low)
+        self.prev_close = np.where(valid, close, self.prev_close)
+        self.bars += 1
+        return values
+
+
+def _map_arrays(states, combine):
+    """A copy of states[0] whose per-symbol arrays (also inside its EMA/RMA members) are
+    ``combine`` of the matching arrays of every state."""
+    clone = copy.copy(states[0])
+    for name, value in vars(states[0]).items():
+        members = [vars(state)[name] for state in states]
+        if isinstance(value, np.ndarray):
+            setattr(clone, name, combine(members))
+        elif isinstance(value, (EMA, RMA)):
+            setattr(clone, name, _map_arrays(members, combine))
+        elif isinstance(value, dict):
+            setattr(clone, name, {key: _map_arrays([member[key] for member in members], combine) for key in value})
+    return clone
+
+
+class IndicatorCache:
+    """Per-symbol IncrementalIndicators kept between scans of one timeframe.
+
+    ``update`` is given the recent aligned candles every scan and only feeds each symbol the
+    candles after the last one it has seen, so a candle goes through the recursive
+    indicators once. Symbols that are new, or were away longer than the given window,
+    start over from the window; symbols that start at the same candle advance together.
+    """
+
+    def __init__(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.states = {}  # {symbol: (IncrementalIndicators, open time of the last candle fed, values)}
+        self._lock = threading.Lock()  # Scan batches may update concurrently
+
+    def update(self, symbols, columns, timestamps):
+        """The RECURSIVE_COLUMNS at each symbol's newest candle as {column: (N,) array}.
+
+        ``columns`` are (T x N) arrays aligned on ``timestamps``; a symbol is advanced up to
+        its newest candle, so a candle that arrives late is not skipped.
+        """
+        with self._lock:
+            return self._update(symbols, columns, timestamps)
+
+    def _update(self, symbols, columns, timestamps):
+        high, low, close = (_as_matrix(columns[name]) for name in ('high', 'low', 'close'))
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        valid = np.isfinite(close)
+        # Row after each symbol's newest candle (0 if it has none)
+        ends = np.where(valid.any(axis=0), len(close) - valid[::-1].argmax(axis=0), 0)
+
+        groups = {}
+        for index, symbol in enumerate(symbols):
+            cached = self.states.get(symbol)
+            if cached is not None and cached[1] >= timestamps[0] - self.interval_ms:
+                start = int(np.searchsorted(timestamps, cached[1], side='right'))
+            else:
+                cached, start = None, 0
+            if start < ends[index]:
+                groups.setdefault((start, cached is None), []).append(index)
+
+        for (start, fresh), indices in groups.items():
+            if fresh:
+                state = IncrementalIndicators([symbols[i] for i in indices])
+            else:
+                state = IncrementalIndicators.stack([self.states[symbols[i]][0] for i in indices])
+            end = int(ends[indices].max())
+            for t in range(start, end):
+                # Rows past a symbol's newest candle are NaN and leave its state alone
+                values = state.update(high[t, indices], low[t, indices], close[t, indices])
+            for position, i in enumerate(indices):
+                self.states[symbols[i]] = (state.take([position]), int(timestamps[ends[i] - 1]),
+                                           {name: values[name][position] for name in RECURSIVE_COLUMNS})
+
+        result = {name: np.full(len(symbols), np.nan) for name in RECURSIVE_COLUMNS}
+        for index, symbol in enumerate(symbols):
+            cached = self.states.get(symbol)
+            if cached is not None and ends[index] and cached[1] == timestamps[ends[index] - 1]:
+                for name in RECURSIVE_COLUMNS:
+                    result[name][index] = cached[2][name]
+        return result
+
+
+def _as_matrix(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def _sma(values, length):
+    """Trailing simple average along axis 0; the first length - 1 rows are NaN."""
+    result = np.full(values.shape, np.nan)
+    if len(values) >= length:
+        result[length - 1:] = sliding_window_view(values, length, axis=0).mean(axis=-1)
+    return result
+
+
+def _segments(timestamps, period):
+    """Index of the first row of each period ('day' or 'month', UTC) and each row's period number."""
+    times = np.asarray(timestamps, dtype='datetime64[ms]')
+    key = times.astype('datetime64[D]' if period == 'day' else 'datetime64[M]').astype(np.int64)
+    first = np.r_[True, key[1:] != key[:-1]]
+    return np.flatnonzero(first), np.cumsum(first) - 1
+
+
+def stochastic(high, low, close):
+    """Stoch.K / Stoch.D (14, 3, 3) as (T x N) arrays."""
+    raw = np.full(close.shape, np.nan)
+    if len(close) >= STOCH_LENGTH:
+        highest = sliding_window_view(high, STOCH_LENGTH, axis=0).max(axis=-1)
+        lowest = sliding_window_view(low, STOCH_LENGTH, axis=0).min(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raw[STOCH_LENGTH - 1:] = 100 * (close[STOCH_LENGTH - 1:] - lowest) / (highest - lowest)
+    k = _sma(raw, STOCH_SMOOTH_K)
+    return k, _sma(k, STOCH_SMOOTH_D)
+
+
+def session_vwap(high, low, close, volume, timestamps):
+    """VWAP anchored at each UTC day, as TradingView's session VWAP."""
+    starts, segment = _segments(timestamps, 'day')
+    typical = (high + low + close) / 3
+    volume = np.where(np.isfinite(typical), np.nan_to_num(volume), 0.0)
+    weighted = np.cumsum(np.nan_to_num(typical * volume), axis=0)
+    volume = np.cumsum(volume, axis=0)
+    # Running totals restart at the first candle of every day
+    base_weighted = np.vstack([np.zeros((1, close.shape[1])), weighted])[starts][segment]
+    base_volume = np.vstack([np.zeros((1, close.shape[1])), volume])[starts][segment]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = (weighted - base_weighted) / (volume - base_volume)
+    vwap[~np.isfinite(vwap)] = np.nan
+    return vwap
+
+
+def monthly_pivots(high, low, close, timestamps):
+    """Classic pivot, R1 and S1 from the previous calendar month's high, low and last close.
+
+    Rows in the first month of the data have no previous month and are NaN, and so are rows
+    whose previous month is only partly covered: a symbol whose first candle opens after the
+    start of its month would otherwise get pivots from a few days of that month.
+    """
+    starts, segment = _segments(timestamps, 'month')
+    month_high = np.fmax.reduceat(high, starts, axis=0)
+    month_low = np.fmin.reduceat(low, starts, axis=0)
+    month_close = close[np.r_[starts[1:], len(close)] - 1]
+    times = np.asarray(timestamps, dtype='datetime64[ms]')
+    month_start = times.astype('datetime64[M]').astype('datetime64[ms]')
+    valid = np.isfinite(close)
+    first = valid.argmax(axis=0)
+    partial = np.flatnonzero(valid.any(axis=0) & (times[first] != month_start[first]))
+    month_high[segment[first[partial]], partial] = np.nan
+    pivot = (month_high + month_low + month_close) / 3
+    r1 = 2 * pivot - month_low
+    s1 = 2 * pivot - month_high
+    previous = segment - 1
+    result = []
+    for level in (pivot, r1, s1):
+        values = np.full(close.shape, np.nan)
+        values[previous >= 0] = level[previous[previous >= 0]]
+        result.append(values)
+    return result
+
+
+def compute_indicators(columns, timestamps=None, rows=None):
+    """Every scanner column from (T x N) OHLCV arrays (1-D arrays are one symbol).
+
+    ``columns`` holds 'open', 'high', 'low', 'close' and 'volume'; ``timestamps`` (open times
+    in ms, length T) anchor the VWAP sessions and the monthly pivots, which are NaN without
+    them. ``rows`` picks which candles to return (default: all), keeping the result small
+    when only a few of many candles are needed. Returns {column: (len(rows) x N) array}.
+    """
+    open_, high, low, close, volume = (_as_matrix(columns[name]) for name in ('open', 'high', 'low', 'close', 'volume'))
+    length = close.shape[0]
+    rows = np.arange(length) if rows is None else np.asarray(rows)
+    wanted = np.zeros(length, dtype=bool)
+    wanted[rows] = True
+    position = np.cumsum(wanted) - 1
+
+    result = {name: np.full((len(np.unique(rows)), close.shape[1]), np.nan) for name in RECURSIVE_COLUMNS}
+    state = IncrementalIndicators(range(close.shape[1]))
+    last = rows.max() if len(rows) else -1
+    for t in range(last + 1):
+        values = state.update(high[t], low[t], close[t])
+        if wanted[t]:
+            for name in RECURSIVE_COLUMNS:
+                result[name][position[t]] = values[name]
+    # Duplicate or unsorted rows map back onto the computed ones
+    order = position[rows]
+    result = {name: values[order] for name, values in result.items()}
+
+    result.update(_window_indicators(open_, high, low, close, volume, timestamps, rows))
+    return result
+
+
+def _window_indicators(open_, high, low, close, volume, timestamps, rows):
+    """The WINDOW_COLUMNS and the candle's own open, close and volume at ``rows``."""
+    result = {}
+    result["Stoch.K"], result["Stoch.D"] = (values[rows] for values in stochastic(high, low, close))
+    if timestamps is not None and len(close):
+        result["VWAP|60"] = session_vwap(high, low, close, volume, timestamps)[rows]
+        pivots = monthly_pivots(high, low, close, timestamps)
+        for name, values in zip(("Pivot.M.Classic.Middle", "Pivot.M.Classic.R1", "Pivot.M.Classic.S1"), pivots):
+            result[name] = values[rows]
+    else:
+        for name in ("VWAP|60", "Pivot.M.Classic.Middle", "Pivot.M.Classic.R1", "Pivot.M.Classic.S1"):
+            result[name] = np.full((len(rows), close.shape[1]), np.nan)
+    result["open"] = open_[rows]
+    result["close"] = close[rows]
+    result["volume"] = volume[rows]
+    return result
+
+
+def kline_indicators(columns, timestamps=None):
+    """``indicators_at(bars)`` for backtest.run_backtest, computed from the dataset's own OHLCV."""
+    def indicators_at(bars):
+        return compute_indicators(columns, timestamps, rows=bars)
+    return indicators_at
+
+
+def latest_indicators(symbols, columns, timestamps=None, cache=None):
+    """{symbol: {column: value}} for the newest candle, in the shape the scanner returns.
+
+    Symbols whose newest close is missing are left out, like tickers the scanner does not list.
+    With an IndicatorCache the recursive columns are advanced from the previous call instead
+    of being recomputed over the whole window.
+    """
+    close = _as_matrix(columns['close'])
+    if not len(close):
+        return {}
+    if cache is None:
+        values = compute_indicators(columns, timestamps, rows=[len(close) - 1])
+    else:
+        open_, high, low, volume = (_as_matrix(columns[name]) for name in ('open', 'high', 'low', 'volume'))
+        values = _window_indicators(open_, high, low, close, volume, timestamps, [len(close) - 1])
+        values.update({name: column[None] for name, column in cache.update(symbols, columns, timestamps).items()})
+    results = {}
+    for i, symbol in enumerate(symbols):
+        if not np.isfinite(values['close'][0, i]):
+            continue
+        results[symbol] = {name: (None if np.isnan(column[0, i]) else float(column[0, i]))
+                           for name, column in values.items()}
+    return results
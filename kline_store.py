@@ -0,0 +1,249 @@
+import functools
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from request_scheduler import get_scheduler
+
+KLINE_URL = "https://api-futures.kucoin.com/api/v1/kline/query"
+KLINE_DIR = 'klines'
+KLINE_PAGE_SIZE = 500  # Maximum candles KuCoin returns per request
+INITIAL_HISTORY = 1000  # Candles fetched the first time a symbol/timeframe is synced
+SYNC_CONCURRENCY = 8
+
+# timestamp is written last on every append, so its length is the number of committed rows
+COLUMNS = (
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('timestamp', np.int64),
+)
+
+
+def fetch_kline_page(symbol, granularity, start_ms, end_ms):
+    """One /kline/query page: rows of [time(ms), open, high, low, close, volume], oldest first."""
+    params = {'symbol': symbol, 'granularity': granularity, 'from': start_ms, 'to': end_ms}
+    response = get_scheduler().request('GET', KLINE_URL, lambda: requests.get(KLINE_URL, params=params, timeout=10))
+    response.raise_for_status()
+    return response.json().get('data') or []
+
+
+def _locked(method):
+    """Run a KlineStore method under the lock of its (symbol, granularity)."""
+    @functools.wraps(method)
+    def wrapper(self, symbol, granularity, *args, **kwargs):
+        with self._lock(symbol, granularity):
+            return method(self, symbol, granularity, *args, **kwargs)
+    return wrapper
+
+
+class KlineStore:
+    """Append-only columnar OHLCV files per symbol and timeframe, read back via memory maps.
+
+    Syncs, appends, prepends and loads of one symbol/timeframe hold its lock, so e.g. a
+    correlation sync and an indicator sync of the same symbol never interleave their writes.
+    """
+
+    def __init__(self, root=KLINE_DIR, fetch=fetch_kline_page):
+        self.root = root
+        self.fetch = fetch
+        self._exhausted = set()  # (symbol, granularity, first timestamp) with no older candles
+        self._locks = {}  # {(symbol, granularity): RLock}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, symbol, granularity):
+        with self._locks_lock:
+            return self._locks.setdefault((symbol, granularity), threading.RLock())
+
+    def directory(self, symbol, granularity):
+        return os.path.join(self.root, symbol, str(granularity))
+
+    def _file(self, symbol, granularity, column):
+        return os.path.join(self.directory(symbol, granularity), column + '.bin')
+
+    def count(self, symbol, granularity):
+        try:
+            return os.path.getsize(self._file(symbol, granularity, 'timestamp')) // 8
+        except FileNotFoundError:
+            return 0
+
+    def last_timestamp(self, symbol, granularity):
+        """Open time (ms) of the newest stored candle, or None if nothing is stored."""
+        count = self.count(symbol, granularity)
+        if not count:
+            return None
+        with open(self._file(symbol, granularity, 'timestamp'), 'rb') as file:
+            file.seek((count - 1) * 8)
+            return int(np.frombuffer(file.read(8), dtype=np.int64)[0])
+
+    def first_timestamp(self, symbol, granularity):
+        """Open time (ms) of the oldest stored candle, or None if nothing is stored."""
+        if not self.count(symbol, granularity):
+            return None
+        with open(self._file(symbol, granularity, 'timestamp'), 'rb') as file:
+            return int(np.frombuffer(file.read(8), dtype=np.int64)[0])
+
+    @_locked
+    def load(self, symbol, granularity, last=None):
+        """Return {column: read-only array} without copying; ``last`` limits to the newest N rows."""
+        count = self.count(symbol, granularity)
+        start = max(0, count - last) if last else 0
+        columns = {}
+        for column, dtype in COLUMNS:
+            if count == 0:
+                columns[column] = np.empty(0, dtype=dtype)
+                continue
+            # Only the committed rows are mapped, which also hides a half-finished append
+            columns[column] = np.memmap(self._file(symbol, granularity, column), dtype=dtype, mode='r',
+                                        offset=start * np.dtype(dtype).itemsize, shape=(count - start,))
+        return columns
+
+    @_locked
+    def append(self, symbol, granularity, rows):
+        """Append closed candles newer than the last stored one. Returns the number appended."""
+        last = self.last_timestamp(symbol, granularity)
+        rows = sorted((row for row in rows if last is None or int(row[0]) > last), key=lambda row: int(row[0]))
+        # Drop duplicate open times within the batch
+        rows = [row for i, row in enumerate(rows) if i == 0 or int(row[0]) != int(rows[i - 1][0])]
+        if not rows:
+            return 0
+
+        directory = self.directory(symbol, granularity)
+        os.makedirs(directory, exist_ok=True)
+        committed = self.count(symbol, granularity)
+        table = np.array([[float(value) for value in row[:6]] for row in rows], dtype=np.float64)
+        values = {
+            'timestamp': table[:, 0].astype(np.int64),
+            'open': table[:, 1], 'high': table[:, 2], 'low': table[:, 3], 'close': table[:, 4], 'volume': table[:, 5],
+        }
+        for column, dtype in COLUMNS:
+            path = self._file(symbol, granularity, column)
+            with open(path, 'ab') as file:
+                # Cut off rows left behind by an append that died before committing its timestamps
+                file.truncate(committed * np.dtype(dtype).itemsize)
+                file.write(values[column].astype(dtype).tobytes())
+        return len(rows)
+
+    @_locked
+    def prepend(self, symbol, granularity, rows):
+        """Insert candles older than the first stored one. Returns the number inserted.
+
+        The files are rewritten in a sibling directory that is swapped in whole, so a crash
+        leaves either the old or the new set; open memory maps keep the old files alive.
+        """
+        first = self.first_timestamp(symbol, granularity)
+        if first is None:
+            return self.append(symbol, granularity, rows)
+        rows = sorted((row for row in rows if int(row[0]) < first), key=lambda row: int(row[0]))
+        rows = [row for i, row in enumerate(rows) if i == 0 or int(row[0]) != int(rows[i - 1][0])]
+        if not rows:
+            return 0
+
+        directory = self.directory(symbol, granularity)
+        staging, retired = directory + '.new', directory + '.old'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        stored = self.load(symbol, granularity)
+        table = np.array([[float(value) for value in row[:6]] for row in rows], dtype=np.float64)
+        values = {
+            'timestamp': table[:, 0].astype(np.int64),
+            'open': table[:, 1], 'high': table[:, 2], 'low': table[:, 3], 'close': table[:, 4], 'volume': table[:, 5],
+        }
+        for column, dtype in COLUMNS:
+            with open(os.path.join(staging, column + '.bin'), 'wb') as file:
+                file.write(values[column].astype(dtype).tobytes())
+                file.write(np.asarray(stored[column]).tobytes())
+        shutil.rmtree(retired, ignore_errors=True)
+        os.replace(directory, retired)
+        os.replace(staging, directory)
+        shutil.rmtree(retired, ignore_errors=True)
+        return len(rows)
+
+    def _fetch_range(self, symbol, granularity, start, end):
+        """Every candle with an open time in [start, end], one page at a time."""
+        interval_ms = granularity * 60 * 1000
+        while start <= end:
+            page_end = min(start + (KLINE_PAGE_SIZE - 1) * interval_ms, end)
+            yield [row for row in self.fetch(symbol, granularity, start, page_end) if int(row[0]) <= end]
+            start = page_end + interval_ms
+
+    @_locked
+    def sync(self, symbol, granularity, history=INITIAL_HISTORY, now_ms=None):
+        """Fetch the closed candles missing since the last sync, and older ones until
+        ``history`` candles are covered. Returns the number stored."""
+        interval_ms = granularity * 60 * 1000
+        now_ms = now_ms or int(time.time() * 1000)
+        # The candle that is still forming must not be appended
+        closed_until = now_ms - now_ms % interval_ms - interval_ms
+        history_start = closed_until - (history - 1) * interval_ms
+
+        last = self.last_timestamp(symbol, granularity)
+        stored = 0
+        for rows in self._fetch_range(symbol, granularity, last + interval_ms if last is not None else history_start,
+                                      closed_until):
+            stored += self.append(symbol, granularity, rows)
+
+        # A store first synced with a shorter history (e.g. the correlation window) is backfilled
+        first = self.first_timestamp(symbol, granularity)
+        key = (symbol, granularity, first)
+        if first is not None and first > history_start and key not in self._exhausted:
+            older = [row for rows in self._fetch_range(symbol, granularity, history_start, first - interval_ms)
+                     for row in rows]
+            inserted = self.prepend(symbol, granularity, older)
+            if not inserted:
+                # Nothing older exists (e.g. a new listing), so do not ask again for this start
+                self._exhausted.add(key)
+            stored += inserted
+        return stored
+
+    def sync_many(self, symbols, granularity, history=INITIAL_HISTORY, concurrency=SYNC_CONCURRENCY):
+        """Sync many symbols in parallel; returns {symbol: stored} (-1 where the sync failed)."""
+        def sync_one(symbol):
+            try:
+                return symbol, self.sync(symbol, granularity, history)
+            except Exception as e:
+                print(f"Kline sync failed for {symbol}: {str(e)}")
+                return symbol, -1
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return dict(executor.map(sync_one, symbols))
+
+    def aligned(self, symbols, granularity, length, end_ms=None):
+        """The ``length`` candles ending at ``end_ms`` as (timestamps, {column: (length x symbols) array}).
+
+        Rows are aligned on open time (default end: the newest candle of any symbol);
+        candles a symbol does not have are left as NaN.
+        """
+        interval_ms = granularity * 60 * 1000
+        if end_ms is None:
+            end_ms = max((self.last_timestamp(symbol, granularity) or 0) for symbol in symbols) if symbols else 0
+        first_ms = end_ms - (length - 1) * interval_ms
+        names = [column for column, _ in COLUMNS if column != 'timestamp']
+        matrices = {column: np.full((length, len(symbols)), np.nan) for column in names}
+        for index, symbol in enumerate(symbols):
+            columns = self.load(symbol, granularity, last=length)
+            slots = (columns['timestamp'] - first_ms) // interval_ms
+            keep = (slots >= 0) & (slots < length)
+            for column in names:
+                matrices[column][slots[keep], index] = columns[column][keep]
+        return first_ms + np.arange(length, dtype=np.int64) * interval_ms, matrices
+
+    def closes(self, symbols, granularity, length, end_ms=None):
+        """Closes of the ``length`` candles ending at ``end_ms`` as a (symbols x length) array."""
+        return self.aligned(symbols, granularity, length, end_ms)[1]['close'].T
+
+
+_store = None
+
+def get_kline_store():
+    global _store
+    if _store is None:
+        _store = KlineStore(os.getenv('KLINE_DIR', KLINE_DIR))
+    return _store
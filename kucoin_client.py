@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from request_scheduler import get_scheduler
+
+# Load environment variables from .env file
+load_dotenv()
+
+FUTURES_BASE_URL = os.getenv('KUCOIN_FUTURES_URL', 'https://api-futures.kucoin.com')
+POOL_SIZE = 20  # Keep-alive connections kept open per host
+REQUEST_TIMEOUT = 10  # Seconds
+
+
+class KucoinFuturesClient:
+    """Signed KuCoin Futures REST client on top of a pooled keep-alive session."""
+
+    def __init__(self, api_key=None, api_secret=None, api_passphrase=None,
+                 base_url=FUTURES_BASE_URL, pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        self.api_key = api_key or os.getenv('KUCOIN_KEY')
+        api_secret = api_secret or os.getenv('KUCOIN_SECRET')
+        api_passphrase = api_passphrase or os.getenv('KUCOIN_PASSPHRASE')
+        if not all([self.api_key, api_secret, api_passphrase]):
+            raise ValueError("API keys and passphrase must be set")
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+        # The key and the signed passphrase never change, so derive them once instead of per call
+        self._signer = hmac.new(api_secret.encode('utf-8'), digestmod=hashlib.sha256)
+        passphrase = hmac.new(api_secret.encode('utf-8'), api_passphrase.encode('utf-8'), hashlib.sha256).digest()
+        self._passphrase = base64.b64encode(passphrase).decode('utf-8')
+
+        self.session = requests.Session()
+        # Retries live in the request scheduler, which knows which requests are safe to repeat
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+    def sign(self, endpoint, query_string='', method='GET'):
+        """Return the KC-API-* headers for a request; query_string is the query or the JSON body."""
+        now = int(time.time() * 1000)
+        mac = self._signer.copy()
+        mac.update(f"{now}{method}{endpoint}{query_string}".encode('utf-8'))
+        return {
+            "KC-API-SIGN": base64.b64encode(mac.digest()).decode('utf-8'),
+            "KC-API-TIMESTAMP": str(now),
+            "KC-API-KEY": self.api_key,
+            "KC-API-PASSPHRASE": self._passphrase,
+            "KC-API-KEY-VERSION": "2"
+        }
+
+    def request(self, method, endpoint, params=None, query_string='', breaker=True):
+        """Send a signed request and return the raw ``requests.Response``.
+
+        ``params`` is serialized once; the exact same bytes are signed and sent. The request
+        goes out through the shared request_scheduler, which paces and retries it;
+        ``breaker=False`` sends it even while that endpoint's circuit is open.
+        """
+        body = json.dumps(params, separators=(',', ':')) if params is not None else ''
+        url = self.base_url + endpoint + query_string
+
+        def send():
+            # Signed per attempt so a retry carries a fresh timestamp
+            headers = self.sign(endpoint, query_string or body, method)
+            return self.session.request(method, url, headers=headers, data=body.encode('utf-8') if body else None,
+                                        timeout=self.timeout)
+
+        return get_scheduler().request(method, url, send, breaker=breaker)
+
+    def get(self, endpoint, query_string='', breaker=True):
+        return self.request('GET', endpoint, query_string=query_string, breaker=breaker)
+
+    def post(self, endpoint, params, breaker=True):
+        return self.request('POST', endpoint, params=params, breaker=breaker)
+
+    def delete(self, endpoint, query_string='', breaker=True):
+        return self.request('DELETE', endpoint, query_string=query_string, breaker=breaker)
+
+
+_client = None
+
+def get_client():
+    """Return the process-wide client so every caller shares one connection pool."""
+    global _client
+    if _client is None:
+        _client = KucoinFuturesClient()
+    return _client
+
+def get_kucoin_headers(endpoint, query_string='', method='GET'):
+    return get_client().sign(endpoint, query_string, method)
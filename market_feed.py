@@ -0,0 +1,439 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+import requests
+
+from kucoin_client import FUTURES_BASE_URL
+from order_book import OrderBook
+from request_scheduler import get_scheduler
+
+FUTURES_REST_URL = FUTURES_BASE_URL  # Follows KUCOIN_FUTURES_URL, like the REST client
+BULLET_PUBLIC_ENDPOINT = "/api/v1/bullet-public"
+SNAPSHOT_ENDPOINT = "/api/v1/level2/snapshot"
+
+TOPICS_PER_SUBSCRIBE = 100  # KuCoin accepts up to 100 symbols in one comma-separated topic
+DEFAULT_PING_INTERVAL = 18  # Seconds, used when the server does not announce its own
+RECONNECT_DELAY = 5
+RESYNC_RETRY_DELAY = 1
+
+
+def fetch_ws_endpoint(base_url=FUTURES_REST_URL):
+    """Request a public WebSocket token; returns (url, ping interval in seconds)."""
+    response = requests.post(base_url + BULLET_PUBLIC_ENDPOINT, timeout=10)
+    response.raise_for_status()
+    data = response.json()['data']
+    server = data['instanceServers'][0]
+    url = f"{server['endpoint']}?token={data['token']}&connectId={uuid.uuid4()}"
+    return url, server.get('pingInterval', DEFAULT_PING_INTERVAL * 1000) / 1000
+
+
+def fetch_l2_snapshot(symbol, base_url=FUTURES_REST_URL):
+    """Full L2 book with its sequence number, used to (re)seed a local book."""
+    url = f"{base_url}{SNAPSHOT_ENDPOINT}?symbol={symbol}"
+    # Resyncs after sequence gaps can come in bursts, so they go through the shared limits
+    response = get_scheduler().request('GET', url, lambda: requests.get(url, timeout=10))
+    response.raise_for_status()
+    return response.json()['data']
+
+
+def recorded_snapshots(path):
+    """Snapshot source backed by a recording: every {"type": "snapshot"} line, latest per symbol."""
+    snapshots = {}
+    with open(path, 'r') as file:
+        for line in file:
+            record = json.loads(line)
+            if record.get('type') == 'snapshot':
+                snapshots[record['symbol']] = record['data']
+    return lambda symbol: snapshots[symbol]
+
+
+class LocalBook:
+    """L2 book maintained from sequence-numbered deltas on top of a REST snapshot."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = {}
+        self.asks = {}
+        self.sequence = None
+        # Deltas seen while no valid snapshot is loaded; replayed once one arrives
+        self.pending = []
+        self.updated_at = 0.0
+
+    @property
+    def synced(self):
+        return self.sequence is not None
+
+    def load_snapshot(self, snapshot):
+        """Seed from a snapshot and replay buffered deltas. Returns False if there is still a gap."""
+        self.bids = {float(price): float(size) for price, size in snapshot.get('bids', [])}
+        self.asks = {float(price): float(size) for price, size in snapshot.get('asks', [])}
+        self.sequence = int(snapshot['sequence'])
+        self.updated_at = time.time()
+        pending, self.pending = self.pending, []
+        for sequence, change in sorted(pending):
+            if not self.apply(sequence, change):
+                return False
+        return True
+
+    def apply(self, sequence, change):
+        """Apply one "price,side,size" delta. Returns False when a sequence gap is detected."""
+        if self.sequence is None:
+            self.pending.append((sequence, change))
+            return True
+        if sequence <= self.sequence:
+            return True  # Already contained in the snapshot
+        if sequence != self.sequence + 1:
+            self.sequence = None
+            self.pending = [(sequence, change)]
+            return False
+
+        price, side, size = change.split(',')
+        levels = self.bids if side == 'buy' else self.asks
+        price, size = float(price), float(size)
+        if size == 0:
+            levels.pop(price, None)
+        else:
+            levels[price] = size
+        self.sequence = sequence
+        self.updated_at = time.time()
+        return True
+
+    def to_order_book(self, depth=None):
+        bid_prices = np.array(sorted(self.bids, reverse=True)[:depth], dtype=np.float64)
+        ask_prices = np.array(sorted(self.asks)[:depth], dtype=np.float64)
+        bid_sizes = np.array([self.bids[price] for price in bid_prices.tolist()], dtype=np.float64)
+        ask_sizes = np.array([self.asks[price] for price in ask_prices.tolist()], dtype=np.float64)
+        return OrderBook(bid_prices, bid_sizes, ask_prices, ask_sizes, self.sequence)
+
+
+class MarketFeed:
+    """Streams KuCoin Futures public channels into in-memory books, tickers and candles.
+
+    Runs its own event loop on a background thread; the read methods only take a lock
+    and never touch the network.
+    """
+
+    def __init__(self, symbols, channels=('level2', 'ticker', 'kline'), kline_interval='1hour',
+                 endpoint=None, snapshot=fetch_l2_snapshot, record_path=None):
+        self.symbols = list(symbols)
+        self.channels = channels
+        self.kline_interval = kline_interval
+        # A fixed ws:// endpoint (e.g. a local replay server) skips the token request
+        self.endpoint = endpoint
+        self.snapshot = snapshot
+        self.record_path = record_path
+
+        self.books = {symbol: LocalBook(symbol) for symbol in self.symbols}
+        self.tickers = {}
+        self.candles = {}
+        self.messages = 0
+        self.resyncs = 0
+
+        self._lock = threading.Lock()
+        self._resyncing = set()
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._record_file = None
+
+    # --- Readers -------------------------------------------------------------------------
+
+    def book(self, symbol, depth=None):
+        """Latest synced book as an order_book.OrderBook, or None if not in sync."""
+        with self._lock:
+            book = self.books.get(symbol)
+            if book is None or not book.synced:
+                return None
+            return book.to_order_book(depth)
+
+    def ticker(self, symbol):
+        with self._lock:
+            ticker = self.tickers.get(symbol)
+            return dict(ticker) if ticker else None
+
+    def candle(self, symbol):
+        with self._lock:
+            candle = self.candles.get(symbol)
+            return dict(candle) if candle else None
+
+    # --- Message handling ----------------------------------------------------------------
+
+    def subscriptions(self):
+        topics = []
+        for start in range(0, len(self.symbols), TOPICS_PER_SUBSCRIBE):
+            chunk = self.symbols[start:start + TOPICS_PER_SUBSCRIBE]
+            if 'level2' in self.channels:
+                topics.append('/contractMarket/level2:' + ','.join(chunk))
+            if 'ticker' in self.channels:
+                topics.append('/contractMarket/tickerV2:' + ','.join(chunk))
+            if 'kline' in self.channels:
+                topics.append('/contractMarket/limitCandle:' + ','.join(f"{s}_{self.kline_interval}" for s in chunk))
+        return [
+            {'id': str(uuid.uuid4()), 'type': 'subscribe', 'topic': topic, 'privateChannel': False, 'response': True}
+            for topic in topics
+        ]
+
+    def handle_message(self, message):
+        """Apply one decoded message. Returns the symbols whose books need a snapshot resync."""
+        if message.get('type') != 'message':
+            return []
+        topic = message.get('topic', '')
+        data = message.get('data') or {}
+        self.messages += 1
+
+        with self._lock:
+            if topic.startswith('/contractMarket/level2:'):
+                symbol = topic.split(':', 1)[1]
+                book = self.books.get(symbol)
+                if book is None:
+                    return []
+                if not book.apply(int(data['sequence']), data['change']) or not book.synced:
+                    return [symbol]
+            elif topic.startswith('/contractMarket/tickerV2:'):
+                symbol = data.get('symbol') or topic.split(':', 1)[1]
+                previous = self.tickers.get(symbol)
+                if previous is None or int(data.get('sequence', 0)) >= previous.get('sequence', 0):
+                    self.tickers[symbol] = {
+                        'sequence': int(data.get('sequence', 0)),
+                        'bestBidPrice': float(data['bestBidPrice']),
+                        'bestBidSize': float(data['bestBidSize']),
+                        'bestAskPrice': float(data['bestAskPrice']),
+                        'bestAskSize': float(data['bestAskSize']),
+                        'ts': data.get('ts'),
+                    }
+            elif topic.startswith('/contractMarket/limitCandle:'):
+                symbol = data.get('symbol') or topic.split(':', 1)[1].rsplit('_', 1)[0]
+                candle = data.get('candles') or []
+                if len(candle) >= 6:
+                    # KuCoin candle order: time, open, close, high, low, volume[, turnover]
+                    self.candles[symbol] = {
+                        'time': int(candle[0]), 'open': float(candle[1]), 'close': float(candle[2]),
+                        'high': float(candle[3]), 'low': float(candle[4]), 'volume': float(candle[5]),
+                    }
+        return []
+
+    async def _resync(self, symbol):
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._stop.is_set():
+                try:
+                    snapshot = await loop.run_in_executor(None, self.snapshot, symbol)
+                except Exception as e:
+                    print(f"Snapshot for {symbol} failed: {str(e)}")
+                    snapshot = None
+                if snapshot:
+                    self._record({'type': 'snapshot', 'symbol': symbol, 'data': snapshot})
+                    with self._lock:
+                        self.resyncs += 1
+                        if self.books[symbol].load_snapshot(snapshot):
+                            return
+                # Snapshot older than the buffered deltas: wait for the exchange to catch up
+                await asyncio.sleep(RESYNC_RETRY_DELAY)
+        finally:
+            self._resyncing.discard(symbol)
+
+    def _schedule_resyncs(self, symbols):
+        for symbol in symbols:
+            if symbol not in self._resyncing:
+                self._resyncing.add(symbol)
+                asyncio.ensure_future(self._resync(symbol))
+
+    def _record(self, record):
+        if self._record_file:
+            self._record_file.write(json.dumps(record) + '\n')
+
+    async def _ping(self, websocket, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await websocket.send(json.dumps({'id': str(uuid.uuid4()), 'type': 'ping'}))
+
+    async def _session(self):
+        import websockets
+
+        if self.endpoint:
+            url, ping_interval = self.endpoint, DEFAULT_PING_INTERVAL
+        else:
+            url, ping_interval = await asyncio.get_running_loop().run_in_executor(None, fetch_ws_endpoint)
+
+        async with websockets.connect(url, max_size=None) as websocket:
+            for subscription in self.subscriptions():
+                await websocket.send(json.dumps(subscription))
+            # Books start out unsynced: their first delta triggers the initial snapshot
+            with self._lock:
+                for book in self.books.values():
+                    book.sequence = None
+                    book.pending = []
+            ping = asyncio.ensure_future(self._ping(websocket, ping_interval))
+            try:
+                async for raw in websocket:
+                    message = json.loads(raw)
+                    self._record(message)
+                    self._schedule_resyncs(self.handle_message(message))
+                    if self._stop.is_set():
+                        break
+            finally:
+                ping.cancel()
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        while not self._stop.is_set():
+            try:
+                await self._session()
+            except Exception as e:
+                print(f"Market feed disconnected: {str(e)}")
+            if not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), RECONNECT_DELAY)
+                except asyncio.TimeoutError:
+                    pass
+
+    # --- Lifecycle -----------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.record_path:
+            self._record_file = open(self.record_path, 'a')
+        ready = threading.Event()
+
+        def target():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            task = self._loop.create_task(self.run())
+            self._loop.call_soon(ready.set)
+            self._loop.run_until_complete(task)
+            self._loop.close()
+
+        self._thread = threading.Thread(target=target, name='market-feed', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout=5):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._record_file:
+            self._record_file.close()
+            self._record_file = None
+
+    def wait_synced(self, timeout=10):
+        """Block until every level2 book has been seeded; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if all(book.synced for book in self.books.values()):
+                    return True
+            time.sleep(0.05)
+        return False
+
+
+_active_feed = None
+
+def set_active_feed(feed):
+    """Register the feed the scanner and executor should read from (None to disable)."""
+    global _active_feed
+    _active_feed = feed
+
+def get_active_feed():
+    return _active_feed
+
+
+class ReplayServer:
+    """Local stand-in for the KuCoin WebSocket: welcome, subscribe acks, pongs and a message replay.
+
+    ``messages`` are decoded JSON objects (e.g. the lines of a recording made with
+    MarketFeed(record_path=...)); anything that is not {"type": "message"} is skipped.
+    """
+
+    def __init__(self, messages, host='127.0.0.1', port=0, delay=0.0):
+        self.messages = [m for m in messages if m.get('type') == 'message']
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.server = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, 'r') as file:
+            return cls([json.loads(line) for line in file if line.strip()], **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, *_):
+        await websocket.send(json.dumps({'id': str(uuid.uuid4()), 'type': 'welcome'}))
+        replay = None
+        async for raw in websocket:
+            request = json.loads(raw)
+            if request.get('type') == 'ping':
+                await websocket.send(json.dumps({'id': request.get('id'), 'type': 'pong'}))
+            elif request.get('type') == 'subscribe':
+                if request.get('response'):
+                    await websocket.send(json.dumps({'id': request.get('id'), 'type': 'ack'}))
+                if replay is None:
+                    replay = asyncio.ensure_future(self._replay(websocket))
+
+    async def _replay(self, websocket):
+        # Let the remaining subscribe requests land before the stream starts
+        await asyncio.sleep(0.05)
+        for message in self.messages:
+            await websocket.send(json.dumps(message))
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    async def start(self):
+        import websockets
+
+        self.server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def main(argv):
+    """python market_feed.py SYMBOL... [--record FILE] [--endpoint ws://...] [--snapshots FILE]
+    python market_feed.py --serve FILE [--port N]"""
+    args, options = [], {}
+    iterator = iter(argv)
+    for arg in iterator:
+        if arg.startswith('--'):
+            options[arg[2:]] = next(iterator, None)
+        else:
+            args.append(arg)
+
+    if 'serve' in options:
+        async def serve():
+            server = await ReplayServer.from_file(options['serve'], port=int(options.get('port') or 8765)).start()
+            print(f"Replaying {len(server.messages)} messages on {server.url}")
+            await asyncio.Future()
+        asyncio.run(serve())
+        return
+
+    snapshot = recorded_snapshots(options['snapshots']) if options.get('snapshots') else fetch_l2_snapshot
+    feed = MarketFeed(args, endpoint=options.get('endpoint'), snapshot=snapshot, record_path=options.get('record'))
+    feed.start()
+    try:
+        while True:
+            time.sleep(5)
+            for symbol in args:
+                book = feed.book(symbol)
+                if book is not None and len(book):
+                    print(f"{symbol}: bid {book.best_bid} / ask {book.best_ask} (seq {book.sequence})")
+                else:
+                    print(f"{symbol}: syncing...")
+    except KeyboardInterrupt:
+        feed.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,202 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tabulate import tabulate
+
+from request_scheduler import get_scheduler
+
+# Histogram bucket upper bounds in seconds, roughly x2 apart from 0.1 ms to 2 minutes
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS_PORT = 9108
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: constant memory and one bisect per observation."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.max = 0.0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating linearly inside the one that holds q."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class Metrics:
+    """Per-stage timings for the scanner and executor, shared by every thread in the process."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=False):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds, error)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, error)
+
+    def summary_rows(self):
+        with self.lock:
+            items = sorted(self.histograms.items())
+            rows = []
+            for name, histogram in items:
+                p50, p95, p99 = (histogram.quantile(q) for q in QUANTILES)
+                rows.append([name, histogram.count, histogram.errors, p50 * 1000, p95 * 1000, p99 * 1000,
+                             histogram.total])
+        return rows
+
+    def summary(self):
+        """Text table of every stage: calls, errors, p50/p95/p99 in ms and total seconds."""
+        table = tabulate(self.summary_rows(), headers=['Stage', 'Calls', 'Errors', 'p50 ms', 'p95 ms', 'p99 ms', 'Total s'],
+                         floatfmt='.2f')
+        requests = [
+            [host, endpoint_class, int(stats.get('requests', 0)), int(stats.get('retries', 0)), int(stats.get('errors', 0)),
+             int(stats.get('rate_limited', 0)), stats.get('throttled_seconds', 0.0)]
+            for (host, endpoint_class), stats in sorted(_request_stats().items(), key=lambda item: str(item[0]))
+        ]
+        if requests:
+            table += '\n\n' + tabulate(requests, headers=['Host', 'Class', 'Requests', 'Retries', 'Errors', '429s',
+                                                          'Throttled s'], floatfmt='.2f')
+        return table
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = ['# TYPE kutrade_stage_seconds histogram']
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f'kutrade_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'kutrade_stage_seconds_sum{{stage="{name}"}} {histogram.total}')
+                lines.append(f'kutrade_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+            lines.append('# TYPE kutrade_stage_errors_total counter')
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f'kutrade_stage_errors_total{{stage="{name}"}} {histogram.errors}')
+
+        # Request counts come from the scheduler every HTTP call goes through
+        stats = sorted(_request_stats().items(), key=lambda item: str(item[0]))
+        for metric, key in (('requests_total', 'requests'), ('request_retries_total', 'retries'),
+                            ('request_errors_total', 'errors'), ('request_rate_limited_total', 'rate_limited'),
+                            ('request_throttled_seconds_total', 'throttled_seconds')):
+            lines.append(f'# TYPE kutrade_{metric} counter')
+            for (host, endpoint_class), values in stats:
+                lines.append(f'kutrade_{metric}{{host="{host}",class="{endpoint_class}"}} {values.get(key, 0)}')
+        lines.append('# TYPE kutrade_uptime_seconds gauge')
+        lines.append(f'kutrade_uptime_seconds {time.time() - self.started:.3f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _request_stats():
+    return get_scheduler().snapshot()
+
+
+_metrics = Metrics()
+
+def get_metrics():
+    """Return the process-wide registry."""
+    return _metrics
+
+
+def timed(stage):
+    """Decorator recording every call of the function under ``stage`` (exceptions count as errors)."""
+    def decorator(function):
+        # Inlined rather than using Metrics.stage: a generator context manager costs more than the timing
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            error = True
+            try:
+                result = function(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                _metrics.observe(stage, time.perf_counter() - started, error)
+        return wrapper
+    return decorator
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsServer:
+    """Serves GET /metrics for a Prometheus scraper on a background thread."""
+
+    def __init__(self, metrics=None, host='127.0.0.1', port=METRICS_PORT):
+        self.metrics = metrics or _metrics
+        self.host = host
+        self.port = port
+        self.server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.server.daemon_threads = True
+        self.server.metrics = self.metrics
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
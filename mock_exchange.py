@@ -0,0 +1,516 @@
+import base64
+import hashlib
+import hmac
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import requests
+
+MOCK_API_KEY = 'mock-key'
+MOCK_API_SECRET = 'mock-secret'
+MOCK_API_PASSPHRASE = 'mock-passphrase'
+TIMESTAMP_WINDOW = 5.0  # Seconds a signed timestamp may differ from the server clock
+TAKER_FEE = 0.0006
+MAKER_FEE = 0.0002
+
+DEFAULT_CONTRACTS = [
+    {'symbol': 'XBTUSDTM', 'tickSize': 0.1, 'lotSize': 1, 'maxOrderQty': 1000000, 'multiplier': 0.001, 'markPrice': 60000.0},
+    {'symbol': 'ETHUSDTM', 'tickSize': 0.01, 'lotSize': 1, 'maxOrderQty': 1000000, 'multiplier': 0.01, 'markPrice': 3000.0},
+    {'symbol': 'SOLUSDTM', 'tickSize': 0.001, 'lotSize': 1, 'maxOrderQty': 1000000, 'multiplier': 0.1, 'markPrice': 150.0},
+    {'symbol': 'DOGEUSDTM', 'tickSize': 0.00001, 'lotSize': 1, 'maxOrderQty': 1000000, 'multiplier': 100, 'markPrice': 0.15},
+]
+
+
+def _ok(data):
+    return 200, {'code': '200000', 'data': data}
+
+
+def _error(status, code, message):
+    return status, {'code': code, 'msg': message}
+
+
+def _page(items):
+    return _ok({'currentPage': 1, 'pageSize': max(50, len(items)), 'totalNum': len(items), 'totalPage': 1, 'items': items})
+
+
+class MockExchange:
+    """In-memory KuCoin Futures account: contracts, orders, stop orders and positions.
+
+    Requests are authenticated exactly like the exchange checks the KC-API-* headers
+    produced by kucoin_client (HMAC-SHA256 over timestamp + method + path + query/body,
+    passphrase version 2). Market orders fill at the mark price; limit and stop orders
+    rest until set_mark_price() crosses them.
+
+    Fault injection: every request waits ``latency`` (+ up to ``jitter``) seconds, a
+    ``rate_limit_rate`` share is answered with 429 and an ``error_rate`` share with a 5xx.
+    ``ambiguous_rate`` of the requests that change state are applied but answered with a
+    502, as when the response is lost on the way back. ``quota`` requests per
+    ``quota_window`` seconds are allowed before 429s, reported in gw-ratelimit-* headers.
+    fail_next() queues scripted failures.
+    """
+
+    def __init__(self, contracts=None, balance=10000.0, api_key=MOCK_API_KEY, api_secret=MOCK_API_SECRET,
+                 api_passphrase=MOCK_API_PASSPHRASE, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 ambiguous_rate=0.0, quota=None, quota_window=30.0, seed=None):
+        self.contracts = {contract['symbol']: dict(contract) for contract in (contracts or DEFAULT_CONTRACTS)}
+        self.mark_prices = {symbol: float(contract.get('markPrice') or 1.0) for symbol, contract in self.contracts.items()}
+        self.balance = float(balance)
+        self.api_key = api_key
+        self.api_secret = api_secret.encode('utf-8')
+        passphrase = hmac.new(self.api_secret, api_passphrase.encode('utf-8'), hashlib.sha256).digest()
+        self.signed_passphrase = base64.b64encode(passphrase).decode('utf-8')
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.ambiguous_rate = ambiguous_rate
+        self.quota = quota
+        self.quota_window = quota_window
+        self.random = random.Random(seed)
+
+        self.orders = {}
+        self.client_oids = {}
+        self.positions = {}
+        self.responses = Counter()
+        self._failures = deque()
+        self._window_start = time.time()
+        self._window_used = 0
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_contracts_file(cls, path, **kwargs):
+        """Use the contract list of a recorded contracts/active response (e.g. a benchmark fixture)."""
+        with open(path, 'r') as file:
+            body = json.load(file)
+        return cls(contracts=body.get('data', body), **kwargs)
+
+    def fail_next(self, status=503, count=1):
+        """Answer the next ``count`` requests with ``status`` before doing anything else."""
+        with self.lock:
+            self._failures.extend([status] * count)
+
+    # --- request pipeline -------------------------------------------------
+
+    def handle(self, method, path, query, headers, body):
+        """Process one HTTP request; returns (status, payload, extra headers)."""
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        with self.lock:
+            status, payload, extra = self._handle(method, path, query, headers, body)
+            self.responses[status] += 1
+        return status, payload, extra
+
+    def _handle(self, method, path, query, headers, body):
+        if self._failures:
+            return self._injected(self._failures.popleft())
+        if self.random.random() < self.rate_limit_rate:
+            return self._injected(429)
+        if self.random.random() < self.error_rate:
+            return self._injected(self.random.choice((500, 502, 503)))
+
+        if method == 'GET' and path == '/api/v1/contracts/active':
+            return (*_ok(self.contract_list()), {})
+        if method == 'GET' and path == '/api/v1/timestamp':
+            return (*_ok(int(time.time() * 1000)), {})
+
+        status, payload = self.authenticate(method, path, query, headers, body)
+        if status != 200:
+            return status, payload, {}
+        limited, quota_headers = self._consume_quota()
+        if limited:
+            return 429, {'code': '429000', 'msg': 'Too Many Requests'}, quota_headers
+
+        try:
+            status, payload = self.dispatch(method, path, parse_qs(query), json.loads(body) if body else {})
+        except (ValueError, TypeError, KeyError) as e:
+            status, payload = _error(400, '100001', f"Invalid parameter: {str(e)}")
+        if method != 'GET' and status == 200 and self.random.random() < self.ambiguous_rate:
+            return 502, {'code': '502', 'msg': 'Bad Gateway'}, quota_headers
+        return status, payload, quota_headers
+
+    def _injected(self, status):
+        if status == 429:
+            return 429, {'code': '429000', 'msg': 'Too Many Requests'}, {'gw-ratelimit-remaining': '0'}
+        return status, {'code': str(status), 'msg': 'Injected server error'}, {}
+
+    def _consume_quota(self):
+        if not self.quota:
+            return False, {}
+        now = time.time()
+        if now - self._window_start >= self.quota_window:
+            self._window_start, self._window_used = now, 0
+        self._window_used += 1
+        reset_ms = int((self._window_start + self.quota_window - now) * 1000)
+        headers = {
+            'gw-ratelimit-limit': str(self.quota),
+            'gw-ratelimit-remaining': str(max(0, self.quota - self._window_used)),
+            'gw-ratelimit-reset': str(reset_ms),
+        }
+        return self._window_used > self.quota, headers
+
+    def authenticate(self, method, path, query, headers, body):
+        """Check the KC-API-* headers the way the exchange does for key version 2."""
+        if headers.get('KC-API-KEY') != self.api_key:
+            return _error(401, '400003', 'KC-API-KEY not exists')
+        if headers.get('KC-API-KEY-VERSION') != '2' or headers.get('KC-API-PASSPHRASE') != self.signed_passphrase:
+            return _error(401, '400004', 'Invalid KC-API-PASSPHRASE')
+        try:
+            timestamp = int(headers.get('KC-API-TIMESTAMP'))
+        except (TypeError, ValueError):
+            return _error(401, '400002', 'KC-API-TIMESTAMP Invalid')
+        if abs(time.time() * 1000 - timestamp) > TIMESTAMP_WINDOW * 1000:
+            return _error(401, '400002', 'KC-API-TIMESTAMP Invalid')
+        prehash = f"{timestamp}{method}{path}{'?' + query if query else ''}{body}"
+        expected = base64.b64encode(hmac.new(self.api_secret, prehash.encode('utf-8'), hashlib.sha256).digest())
+        if not hmac.compare_digest(expected, (headers.get('KC-API-SIGN') or '').encode('utf-8')):
+            return _error(401, '400005', 'Invalid KC-API-SIGN')
+        return 200, None
+
+    def dispatch(self, method, path, query, params):
+        symbol = query.get('symbol', [None])[0]
+        if path == '/api/v1/account-overview' and method == 'GET':
+            return _ok(self.account_overview())
+        if path == '/api/v1/positions' and method == 'GET':
+            return _ok([self.position_view(s) for s, p in self.positions.items() if p['qty'] != 0])
+        if path == '/api/v1/position' and method == 'GET':
+            return _ok(self.position_view(symbol))
+        if path == '/api/v1/orders' and method == 'POST':
+            return self.place_order(params)
+        if path == '/api/v1/orders/multi' and method == 'POST':
+            return _ok([self.place_order_result(order) for order in params])
+        if path == '/api/v1/orders' and method == 'GET':
+            status = query.get('status', ['active'])[0]
+            return _page([self.order_view(o) for o in self.orders.values()
+                          if not o['stop_pending'] and (symbol is None or o['symbol'] == symbol)
+                          and (o['status'] == 'open') == (status == 'active')])
+        if path == '/api/v1/stopOrders' and method == 'GET':
+            return _page([self.order_view(o) for o in self.orders.values()
+                          if o['stop_pending'] and (symbol is None or o['symbol'] == symbol)])
+        if path == '/api/v1/orders' and method == 'DELETE':
+            return _ok({'cancelledOrderIds': self.cancel_where(lambda o: not o['stop_pending'], symbol)})
+        if path == '/api/v1/stopOrders' and method == 'DELETE':
+            return _ok({'cancelledOrderIds': self.cancel_where(lambda o: o['stop_pending'], symbol)})
+        if path == '/api/v1/orders/byClientOid' and method == 'GET':
+            order_id = self.client_oids.get(query.get('clientOid', [None])[0])
+            return _ok(self.order_view(self.orders[order_id]) if order_id else None)
+        if path.startswith('/api/v1/orders/'):
+            order = self.orders.get(path.rsplit('/', 1)[1])
+            if order is None:
+                return _error(404, '100004', 'Order does not exist')
+            if method == 'GET':
+                return _ok(self.order_view(order))
+            if method == 'DELETE':
+                return _ok({'cancelledOrderIds': self.cancel_where(lambda o: o is order, None)})
+        return _error(404, '404000', f"Unknown endpoint {method} {path}")
+
+    # --- orders and positions ---------------------------------------------
+
+    def contract_list(self):
+        return [dict(contract, markPrice=self.mark_prices[symbol]) for symbol, contract in self.contracts.items()]
+
+    def place_order_result(self, params):
+        status, payload = self.place_order(params)
+        result = {'clientOid': params.get('clientOid'), 'symbol': params.get('symbol'), 'code': payload['code']}
+        result.update({'orderId': payload['data']['orderId']} if payload['code'] == '200000' else {'msg': payload['msg']})
+        return result
+
+    def place_order(self, params):
+        symbol = params.get('symbol')
+        contract = self.contracts.get(symbol)
+        if contract is None:
+            return _error(200, '100001', f"Contract {symbol} does not exist")
+        client_oid = params.get('clientOid')
+        if not client_oid:
+            return _error(200, '100001', 'clientOid is required')
+        if client_oid in self.client_oids:
+            return _error(200, '100001', 'Duplicate clientOid')
+        side = params.get('side')
+        if side not in ('buy', 'sell'):
+            return _error(200, '100001', 'side must be buy or sell')
+        order_type = params.get('type', 'limit')
+        if order_type not in ('market', 'limit'):
+            return _error(200, '100001', f"Unsupported order type {order_type}")
+        close_order = str(params.get('closeOrder', '')).lower() == 'true'
+        size = int(float(params.get('size') or 0))
+        if not close_order and (size <= 0 or size % int(contract['lotSize'] or 1) or size > contract['maxOrderQty']):
+            return _error(200, '100001', f"Invalid size {params.get('size')}")
+        price = float(params['price']) if params.get('price') not in (None, '') else None
+        if order_type == 'limit' and not price:
+            return _error(200, '100001', 'Limit orders need a price')
+        stop = params.get('stop')
+        if stop and (stop not in ('up', 'down') or not params.get('stopPrice')):
+            return _error(200, '100001', 'Stop orders need stop up/down and a stopPrice')
+
+        order = {
+            'id': uuid.uuid4().hex, 'clientOid': client_oid, 'symbol': symbol, 'type': order_type, 'side': side,
+            'price': price, 'size': size, 'leverage': float(params.get('leverage') or 1),
+            'stop': stop, 'stopPrice': float(params['stopPrice']) if stop else None,
+            'stopPriceType': params.get('stopPriceType') if stop else None,
+            'reduceOnly': str(params.get('reduceOnly', '')).lower() == 'true', 'closeOrder': close_order,
+            'stop_pending': bool(stop), 'status': 'open', 'cancelled': False,
+            'filledSize': 0, 'filledValue': 0.0, 'createdAt': int(time.time() * 1000),
+        }
+        self.orders[order['id']] = order
+        self.client_oids[client_oid] = order['id']
+        self._activate(order)
+        return _ok({'orderId': order['id'], 'clientOid': client_oid})
+
+    def _activate(self, order):
+        """Trigger, fill or rest an order against the current mark price."""
+        mark = self.mark_prices[order['symbol']]
+        if order['stop_pending']:
+            if (order['stop'] == 'down' and mark > order['stopPrice']) or (order['stop'] == 'up' and mark < order['stopPrice']):
+                return
+            order['stop_pending'] = False
+        if order['type'] == 'market':
+            self._fill(order, mark, TAKER_FEE)
+        elif (order['side'] == 'buy' and order['price'] >= mark) or (order['side'] == 'sell' and order['price'] <= mark):
+            self._fill(order, order['price'], MAKER_FEE)
+
+    def _fill(self, order, price, fee_rate):
+        position = self.positions.setdefault(order['symbol'], {'qty': 0, 'entry': 0.0, 'realised': 0.0, 'leverage': 1.0})
+        signed = order['size'] if order['side'] == 'buy' else -order['size']
+        if order['closeOrder']:
+            signed = -position['qty']
+        if order['reduceOnly'] or order['closeOrder']:
+            # Reduce-only orders may shrink the position but never open or flip it
+            if position['qty'] == 0 or np.sign(signed) == np.sign(position['qty']):
+                self._finish(order, cancelled=True)
+                return
+            signed = int(np.sign(signed)) * min(abs(signed), abs(position['qty']))
+
+        multiplier = float(self.contracts[order['symbol']]['multiplier'])
+        qty = position['qty']
+        if qty == 0 or np.sign(signed) == np.sign(qty):
+            position['entry'] = (position['entry'] * abs(qty) + price * abs(signed)) / abs(qty + signed)
+            position['leverage'] = order['leverage'] or position['leverage']
+        else:
+            closed = min(abs(signed), abs(qty))
+            pnl = closed * multiplier * (price - position['entry']) * np.sign(qty)
+            self.balance += pnl
+            position['realised'] += pnl
+            if abs(signed) > abs(qty):
+                position['entry'] = price
+            elif qty + signed == 0:
+                position['entry'] = 0.0
+        position['qty'] = qty + signed
+        fee = abs(signed) * multiplier * price * fee_rate
+        self.balance -= fee
+        position['realised'] -= fee
+        order['filledSize'] = abs(signed)
+        order['filledValue'] = abs(signed) * multiplier * price
+        self._finish(order)
+
+    def _finish(self, order, cancelled=False):
+        order['status'] = 'done'
+        order['stop_pending'] = False
+        order['cancelled'] = cancelled
+
+    def cancel_where(self, predicate, symbol):
+        cancelled = []
+        for order in self.orders.values():
+            if order['status'] == 'open' and predicate(order) and (symbol is None or order['symbol'] == symbol):
+                self._finish(order, cancelled=True)
+                cancelled.append(order['id'])
+        return cancelled
+
+    def set_mark_price(self, symbol, price):
+        """Move the mark price and trigger or fill every order it crosses."""
+        with self.lock:
+            self.mark_prices[symbol] = float(price)
+            for order in list(self.orders.values()):
+                if order['symbol'] == symbol and order['status'] == 'open':
+                    self._activate(order)
+
+    def random_walk(self, volatility=0.001):
+        """Move every mark price by one random step (used by the serve mode's price thread)."""
+        for symbol, price in list(self.mark_prices.items()):
+            self.set_mark_price(symbol, price * float(np.exp(self.random.gauss(0, volatility))))
+
+    def unrealised(self, symbol):
+        position = self.positions.get(symbol)
+        if not position or position['qty'] == 0:
+            return 0.0
+        multiplier = float(self.contracts[symbol]['multiplier'])
+        return position['qty'] * multiplier * (self.mark_prices[symbol] - position['entry'])
+
+    def account_overview(self):
+        unrealised = sum(self.unrealised(symbol) for symbol in self.positions)
+        margin = sum(
+            abs(p['qty']) * float(self.contracts[s]['multiplier']) * p['entry'] / (p['leverage'] or 1)
+            for s, p in self.positions.items()
+        )
+        equity = self.balance + unrealised
+        return {
+            'accountEquity': equity, 'marginBalance': equity, 'unrealisedPNL': unrealised,
+            'positionMargin': margin, 'orderMargin': 0.0, 'frozenFunds': 0.0,
+            'availableBalance': max(0.0, equity - margin), 'currency': 'USDT',
+        }
+
+    def position_view(self, symbol):
+        position = self.positions.get(symbol, {'qty': 0, 'entry': 0.0, 'realised': 0.0, 'leverage': 1.0})
+        return {
+            'id': f"position-{symbol}", 'symbol': symbol, 'currentQty': position['qty'],
+            'avgEntryPrice': position['entry'], 'markPrice': self.mark_prices.get(symbol),
+            'unrealisedPnl': self.unrealised(symbol), 'realisedPnl': position['realised'],
+            'isOpen': position['qty'] != 0, 'realLeverage': position['leverage'], 'leverage': position['leverage'],
+            'settleCurrency': 'USDT',
+        }
+
+    def order_view(self, order):
+        return {
+            'id': order['id'], 'clientOid': order['clientOid'], 'symbol': order['symbol'], 'type': order['type'],
+            'side': order['side'], 'price': str(order['price'] or ''), 'size': order['size'],
+            'leverage': str(order['leverage']), 'stop': order['stop'] or '',
+            'stopPrice': str(order['stopPrice'] or ''), 'stopPriceType': order['stopPriceType'] or '',
+            'stopTriggered': bool(order['stop']) and not order['stop_pending'],
+            'reduceOnly': order['reduceOnly'], 'closeOrder': order['closeOrder'],
+            'isActive': order['status'] == 'open' and not order['stop_pending'],
+            'cancelExist': order['cancelled'], 'status': order['status'],
+            'filledSize': order['filledSize'], 'dealSize': order['filledSize'],
+            'filledValue': str(order['filledValue']), 'dealValue': str(order['filledValue']),
+            'createdAt': order['createdAt'],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so the client's pooled session reuses connections like it would in production
+    protocol_version = 'HTTP/1.1'
+
+    def _serve(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        status, payload, headers = self.server.exchange.handle(self.command, url.path, url.query, self.headers, body)
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_DELETE = _serve
+
+    def log_message(self, *args):
+        pass
+
+
+class MockExchangeServer:
+    """Serves a MockExchange over HTTP on a background thread."""
+
+    def __init__(self, exchange=None, host='127.0.0.1', port=0):
+        self.exchange = exchange or MockExchange()
+        self.host = host
+        self.port = port
+        self.server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.server.daemon_threads = True
+        self.server.exchange = self.exchange
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-exchange', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def load_test(url, symbols, orders=200, concurrency=16, api_key=MOCK_API_KEY, api_secret=MOCK_API_SECRET,
+              api_passphrase=MOCK_API_PASSPHRASE):
+    """Fire ``orders`` market orders at ``url`` from ``concurrency`` threads through the real client.
+
+    Returns {orders, orders_per_s, p50_ms, p99_ms, outcomes}; outcomes counts HTTP statuses
+    and 'connection_error'.
+    """
+    from kucoin_client import KucoinFuturesClient
+
+    client = KucoinFuturesClient(api_key, api_secret, api_passphrase, base_url=url, pool_size=concurrency)
+
+    def place(i):
+        params = {
+            'clientOid': str(uuid.uuid4()), 'symbol': symbols[i % len(symbols)], 'side': 'buy' if i % 2 == 0 else 'sell',
+            'type': 'market', 'size': '1', 'leverage': '3',
+        }
+        started = time.perf_counter()
+        try:
+            outcome = client.post('/api/v1/orders', params).status_code
+        except requests.RequestException:
+            outcome = 'connection_error'
+        return time.perf_counter() - started, outcome
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(place, range(orders)))
+    elapsed = time.perf_counter() - started
+    durations = np.array([duration for duration, _ in results]) * 1000
+    return {
+        'orders': orders,
+        'orders_per_s': orders / elapsed,
+        'p50_ms': float(np.percentile(durations, 50)),
+        'p99_ms': float(np.percentile(durations, 99)),
+        'outcomes': dict(Counter(outcome for _, outcome in results)),
+    }
+
+
+def main(argv):
+    """python mock_exchange.py [--port N] [--latency MS] [--jitter MS] [--error-rate P] [--rate-limit-rate P]
+    [--ambiguous-rate P] [--quota N] [--contracts FILE] [--walk SECONDS] [--load-test ORDERS] [--concurrency N]"""
+    options = {argv[i][2:]: argv[i + 1] for i in range(len(argv) - 1) if argv[i].startswith('--')}
+    settings = {
+        'latency': float(options.get('latency', 0)) / 1000,
+        'jitter': float(options.get('jitter', 0)) / 1000,
+        'error_rate': float(options.get('error-rate', 0)),
+        'rate_limit_rate': float(options.get('rate-limit-rate', 0)),
+        'ambiguous_rate': float(options.get('ambiguous-rate', 0)),
+        'quota': int(options['quota']) if 'quota' in options else None,
+    }
+    if 'contracts' in options:
+        exchange = MockExchange.from_contracts_file(options['contracts'], **settings)
+    else:
+        exchange = MockExchange(**settings)
+    server = MockExchangeServer(exchange, port=int(options.get('port', 0))).start()
+
+    if 'load-test' in options:
+        result = load_test(server.url, list(exchange.contracts), int(options['load-test']),
+                           int(options.get('concurrency', 16)))
+        print(f"{result['orders']} orders in {result['orders'] / result['orders_per_s']:.2f}s "
+              f"({result['orders_per_s']:.0f}/s), p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+        print(f"Outcomes: {result['outcomes']}")
+        server.close()
+        return
+
+    print(f"Mock KuCoin Futures listening on {server.url}. Point the bot at it with:")
+    print(f"  KUCOIN_FUTURES_URL={server.url} KUCOIN_KEY={MOCK_API_KEY} "
+          f"KUCOIN_SECRET={MOCK_API_SECRET} KUCOIN_PASSPHRASE={MOCK_API_PASSPHRASE}")
+    walk = float(options.get('walk', 0))
+    try:
+        while True:
+            time.sleep(walk or 3600)
+            if walk:
+                exchange.random_walk()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
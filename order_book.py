@@ -0,0 +1,125 @@
+import numpy as np
+
+DEFAULT_IMBALANCE_BPS = (10, 50)
+FEATURE_LEVELS = 50  # Levels per side behind the depth features
+
+DEPTH_FEATURE_COLUMNS = [
+    'Depth.Spread', 'Depth.SpreadBps', 'Depth.Microprice', 'Depth.BidSize', 'Depth.AskSize',
+] + [f'Depth.Imbalance|{bps}' for bps in DEFAULT_IMBALANCE_BPS]
+
+
+class OrderBook:
+    """L2 snapshot as four contiguous float64 arrays (bids best-first descending, asks ascending)."""
+
+    __slots__ = ('bid_prices', 'bid_sizes', 'ask_prices', 'ask_sizes', 'sequence')
+
+    def __init__(self, bid_prices, bid_sizes, ask_prices, ask_sizes, sequence=None):
+        self.bid_prices = bid_prices
+        self.bid_sizes = bid_sizes
+        self.ask_prices = ask_prices
+        self.ask_sizes = ask_sizes
+        self.sequence = sequence
+
+    def __len__(self):
+        return max(len(self.bid_prices), len(self.ask_prices))
+
+    @property
+    def best_bid(self):
+        return self.bid_prices[0] if len(self.bid_prices) else np.nan
+
+    @property
+    def best_ask(self):
+        return self.ask_prices[0] if len(self.ask_prices) else np.nan
+
+    @property
+    def mid(self):
+        return (self.best_bid + self.best_ask) / 2
+
+
+def _levels(levels):
+    if not levels:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty
+    # numpy parses the exchange's ["price", "size"] strings directly, without per-level tuples
+    array = np.array(levels, dtype=np.float64).reshape(-1, 2)
+    return np.ascontiguousarray(array[:, 0]), np.ascontiguousarray(array[:, 1])
+
+
+def parse_depth(data):
+    """Build an OrderBook from a KuCoin depth payload ({'bids': [[p, s], ...], 'asks': ...})."""
+    bid_prices, bid_sizes = _levels(data.get('bids'))
+    ask_prices, ask_sizes = _levels(data.get('asks'))
+    sequence = data.get('sequence')
+    return OrderBook(bid_prices, bid_sizes, ask_prices, ask_sizes, int(sequence) if sequence is not None else None)
+
+
+def spread(book):
+    return book.best_ask - book.best_bid
+
+
+def spread_bps(book):
+    return spread(book) / book.mid * 1e4
+
+
+def microprice(book):
+    """Mid weighted by the opposite side's top-of-book size."""
+    if not len(book.bid_prices) or not len(book.ask_prices):
+        return np.nan
+    bid_size, ask_size = book.bid_sizes[0], book.ask_sizes[0]
+    return (book.best_ask * bid_size + book.best_bid * ask_size) / (bid_size + ask_size)
+
+
+def cumulative_depth(book):
+    """Return (cumulative bid size, cumulative ask size) by level."""
+    return np.cumsum(book.bid_sizes), np.cumsum(book.ask_sizes)
+
+
+def imbalance(book, bps=10):
+    """(bid size - ask size) / total size for all levels within ``bps`` of the mid, in [-1, 1]."""
+    mid = book.mid
+    if np.isnan(mid):
+        return np.nan
+    # Bids are descending, so search on the negated prices to keep searchsorted's ascending contract
+    bid_count = np.searchsorted(-book.bid_prices, -mid * (1 - bps / 1e4), side='right')
+    ask_count = np.searchsorted(book.ask_prices, mid * (1 + bps / 1e4), side='right')
+    bid_size = book.bid_sizes[:bid_count].sum()
+    ask_size = book.ask_sizes[:ask_count].sum()
+    total = bid_size + ask_size
+    return (bid_size - ask_size) / total if total else 0.0
+
+
+def vwap_cost(book, size, side='buy'):
+    """Average fill price and slippage vs mid (in bps) for a market order of ``size``.
+
+    Returns (nan, nan) when the visible book cannot fill the whole size.
+    """
+    prices, sizes = (book.ask_prices, book.ask_sizes) if side == 'buy' else (book.bid_prices, book.bid_sizes)
+    cumulative = np.cumsum(sizes)
+    if not len(cumulative) or cumulative[-1] < size or size <= 0:
+        return np.nan, np.nan
+    last = int(np.searchsorted(cumulative, size))
+    filled = sizes[:last + 1].copy()
+    filled[-1] -= cumulative[last] - size
+    vwap = float(np.dot(prices[:last + 1], filled) / size)
+    cost_bps = float(abs(vwap - book.mid) / book.mid * 1e4)
+    return vwap, cost_bps
+
+
+def depth_features(book, imbalance_bps=DEFAULT_IMBALANCE_BPS, levels=FEATURE_LEVELS):
+    """Order-book features keyed like indicator columns so they can ride along in the indicators dict.
+
+    Only the top ``levels`` of each side count, so a 500-level snapshot and a streamed book
+    of a different depth give comparable sizes and imbalances.
+    """
+    book = OrderBook(book.bid_prices[:levels], book.bid_sizes[:levels], book.ask_prices[:levels],
+                     book.ask_sizes[:levels], book.sequence)
+    features = {
+        'Depth.Spread': float(spread(book)),
+        'Depth.SpreadBps': float(spread_bps(book)),
+        'Depth.Microprice': float(microprice(book)),
+        'Depth.BidSize': float(book.bid_sizes.sum()),
+        'Depth.AskSize': float(book.ask_sizes.sum()),
+    }
+    for bps in imbalance_bps:
+        features[f'Depth.Imbalance|{bps}'] = float(imbalance(book, bps))
+    return features
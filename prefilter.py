@@ -0,0 +1,95 @@
+import numpy as np
+import requests
+
+from contract_cache import get_contract_cache
+from kucoin_client import FUTURES_BASE_URL
+from request_scheduler import get_scheduler
+
+ALL_TICKERS_URL = f"{FUTURES_BASE_URL}/api/v1/allTickers"
+PREFILTER_TOP_K = 100  # Symbols passed on to the indicator, depth and correlation stages
+MIN_TURNOVER = 500000  # 24h turnover in USDT below which a contract is too thin to trade
+MAX_ABS_CHANGE = 0.3  # 24h moves beyond this leave stops wider than the 2% risk limit allows
+MAX_SPREAD = 0.002  # Relative bid/ask spread, only checked when tickers are fetched
+
+# Numeric fields of a contracts/active item used for ranking
+TICKER_FIELDS = {'turnover': 'turnoverOf24h', 'volume': 'volumeOf24h', 'change': 'priceChgPct',
+                 'price': 'lastTradePrice'}
+
+
+def fetch_ticker_snapshot(url=ALL_TICKERS_URL, timeout=10):
+    """One allTickers call, returning {symbol: (best bid, best ask)} or {} on failure."""
+    try:
+        response = get_scheduler().request('GET', url, lambda: requests.get(url, timeout=timeout))
+        if response.status_code == 200:
+            return {
+                item['symbol']: (item.get('bestBidPrice'), item.get('bestAskPrice'))
+                for item in response.json().get('data') or [] if 'symbol' in item
+            }
+        print(f"Error fetching tickers: {response.status_code}, {response.text}")
+    except requests.RequestException as e:
+        print(f"HTTP Request failed: {e}")
+    return {}
+
+
+def ticker_columns(items, quotes=None):
+    """Turn contract items into (symbols, {field: float array}); missing values become NaN."""
+    items = [item for item in items if item.get('symbol') and item.get('status', 'Open') == 'Open']
+    symbols = [item['symbol'] for item in items]
+
+    def column(values):
+        return np.array([np.nan if value in (None, '') else value for value in values], dtype=float)
+
+    columns = {name: column([item.get(field) for item in items]) for name, field in TICKER_FIELDS.items()}
+    if quotes:
+        bid = column([quotes.get(symbol, (None, None))[0] for symbol in symbols])
+        ask = column([quotes.get(symbol, (None, None))[1] for symbol in symbols])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns['spread'] = (ask - bid) / ((ask + bid) / 2)
+    return symbols, columns
+
+
+def rank_candidates(symbols, columns, top_k=PREFILTER_TOP_K, min_turnover=MIN_TURNOVER,
+                    max_abs_change=MAX_ABS_CHANGE, max_spread=MAX_SPREAD, keep=()):
+    """Prune with vectorized filters and return the top_k symbols by 24h turnover.
+
+    A filter whose field is missing for a symbol does not reject it, so an endpoint that
+    leaves a field out never empties the universe. Symbols in ``keep`` (e.g. open
+    positions) always pass.
+    """
+    turnover = columns['turnover']
+    passed = np.ones(len(symbols), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        passed &= ~(turnover < min_turnover)
+        passed &= ~(np.abs(columns['change']) > max_abs_change)
+        if 'spread' in columns:
+            passed &= ~(columns['spread'] > max_spread)
+    keep = set(keep)
+    passed |= np.array([symbol in keep for symbol in symbols], dtype=bool)
+
+    indices = np.flatnonzero(passed)
+    if top_k is not None and len(indices) > top_k:
+        order = np.nan_to_num(turnover[indices], nan=-1.0)
+        indices = indices[np.argpartition(-order, top_k - 1)[:top_k]]
+    # Highest turnover first; kept symbols ride along even past top_k
+    indices = indices[np.argsort(-np.nan_to_num(turnover[indices], nan=-1.0), kind='stable')]
+    selected = [symbols[i] for i in indices]
+    selected += [symbol for symbol in symbols if symbol in keep and symbol not in selected]
+    return selected
+
+
+def prefilter_symbols(symbols=None, top_k=PREFILTER_TOP_K, with_spread=False, keep=(), items=None):
+    """Stage one of the scan: the bulk contracts/active data ranks and prunes the universe.
+
+    The data comes from the shared contract cache, so it is only downloaded once per TTL
+    and the 24h figures may be up to that old. ``symbols`` restricts the result to that
+    list (None: every open contract). Returns ``symbols`` itself when there is no bulk
+    data, and [] when every symbol is filtered out.
+    """
+    items = list(get_contract_cache().all().values()) if items is None else items
+    if not items:
+        return symbols
+    if symbols is not None:
+        wanted = set(symbols)
+        items = [item for item in items if item.get('symbol') in wanted]
+    names, columns = ticker_columns(items, fetch_ticker_snapshot() if with_spread else None)
+    return rank_candidates(names, columns, top_k=top_k, keep=keep)
@@ -0,0 +1,281 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+
+# Endpoint classes, highest priority first
+ORDER = 'order'  # Placing and cancelling orders
+PRIVATE = 'private'  # Other signed requests: balances, positions, order status
+PUBLIC = 'public'  # Market data
+PRIORITY = {ORDER: 0, PRIVATE: 1, PUBLIC: 2}
+
+# (requests per second, burst) per host and endpoint class; class None is the host-wide budget
+DEFAULT_LIMITS = {
+    ('api-futures.kucoin.com', None): (40, 40),
+    ('api-futures.kucoin.com', ORDER): (20, 20),
+    ('api-futures.kucoin.com', PRIVATE): (20, 20),
+    ('api-futures.kucoin.com', PUBLIC): (20, 20),
+    ('api.kucoin.com', None): (20, 20),
+    ('scanner.tradingview.com', None): (5, 5),
+}
+HOST_RESERVE = 0.25  # Share of a host's burst that lower-priority traffic must leave for orders
+QUOTA_RESERVE = 10  # Requests of the exchange's remaining quota kept for orders
+MAX_ATTEMPTS = 3  # Tries per request, the first one included
+BACKOFF_BASE = 0.2  # Seconds; retry n sleeps a random time up to BACKOFF_BASE * 2**n
+BACKOFF_CAP = 5.0
+FAILURE_THRESHOLD = 5  # Consecutive failures that open a circuit
+CIRCUIT_COOLDOWN = 10.0  # Seconds an open circuit rejects requests before letting a probe through
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending while the circuit for a host/endpoint class is open."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self, reserve=0.0):
+        """Take a token if one is left after keeping ``reserve`` back; otherwise return the seconds to wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1 + reserve:
+                self.tokens -= 1
+                return 0.0
+            return (1 + reserve - self.tokens) / self.rate
+
+
+class QuotaTracker:
+    """The exchange's own view of the remaining quota, from KuCoin's gw-ratelimit-* response headers."""
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait_time(self, priority):
+        """Seconds to hold a request back; orders may use the last QUOTA_RESERVE requests, nothing else may."""
+        with self.lock:
+            now = time.monotonic()
+            if self.remaining is None or now >= self.reset_at:
+                return 0.0
+            floor = 0 if priority == PRIORITY[ORDER] else QUOTA_RESERVE
+            if self.remaining > floor:
+                self.remaining -= 1  # Until the next response tells us the real number
+                return 0.0
+            return self.reset_at - now
+
+    def observe(self, headers):
+        remaining = headers.get('gw-ratelimit-remaining')
+        if remaining is None:
+            return
+        with self.lock:
+            try:
+                self.remaining = int(remaining)
+                self.limit = int(headers.get('gw-ratelimit-limit') or self.limit or 0) or None
+                self.reset_at = time.monotonic() + int(headers.get('gw-ratelimit-reset') or 0) / 1000
+            except ValueError:
+                pass
+
+    def exhaust(self, seconds):
+        with self.lock:
+            self.remaining = 0
+            self.reset_at = max(self.reset_at, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; after ``cooldown`` one probe request decides."""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record(self, ok):
+        with self.lock:
+            if ok:
+                self.failures = 0
+                self.state = 'closed'
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+def classify(method, url):
+    """Return (host, endpoint class) for a request."""
+    parts = urlsplit(url)
+    path = parts.path
+    # Matched on the path alone, so KUCOIN_FUTURES_URL pointing at mock_exchange classifies the same
+    if path.startswith('/api/v1/'):
+        if method in ('POST', 'DELETE') and (path.startswith('/api/v1/orders') or path.startswith('/api/v1/stopOrders')):
+            return parts.hostname, ORDER
+        if path.startswith(('/api/v1/account-overview', '/api/v1/position', '/api/v1/orders', '/api/v1/stopOrders',
+                            '/api/v1/fills')):
+            return parts.hostname, PRIVATE
+    return parts.hostname, PUBLIC
+
+
+class RequestScheduler:
+    """One place that decides when a request to KuCoin or TradingView may go out.
+
+    Each request takes a token from its endpoint class bucket and from the host-wide
+    bucket, where market data has to leave HOST_RESERVE of the burst for orders. The
+    exchange's remaining-quota headers hold back everything but orders once the quota
+    runs low. Failures feed a circuit breaker per host and class, and 429s, 5xx responses
+    and connection errors are retried with full-jitter exponential backoff. Order
+    placement is only retried on 429, where the exchange has provably not acted.
+    """
+
+    def __init__(self, limits=None, attempts=MAX_ATTEMPTS, failure_threshold=FAILURE_THRESHOLD,
+                 cooldown=CIRCUIT_COOLDOWN):
+        limits = DEFAULT_LIMITS if limits is None else limits
+        self.buckets = {key: TokenBucket(rate, burst) for key, (rate, burst) in limits.items() if rate}
+        self.attempts = attempts
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.quotas = defaultdict(QuotaTracker)
+        self.breakers = {}
+        self.stats = defaultdict(lambda: defaultdict(float))
+        self.lock = threading.Lock()
+        self.random = random.Random()
+
+    def _breaker(self, key):
+        with self.lock:
+            if key not in self.breakers:
+                self.breakers[key] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self.breakers[key]
+
+    def _quota(self, host, endpoint_class):
+        # KuCoin meters signed and public requests in separate pools
+        with self.lock:
+            return self.quotas[(host, PUBLIC if endpoint_class == PUBLIC else PRIVATE)]
+
+    def _acquire(self, host, endpoint_class):
+        priority = PRIORITY[endpoint_class]
+        waited = 0.0
+        for key, reserve in (((host, endpoint_class), 0.0), ((host, None), None)):
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                continue
+            if reserve is None:
+                reserve = 0.0 if priority == PRIORITY[ORDER] else HOST_RESERVE * bucket.capacity
+            while True:
+                wait = bucket.try_acquire(reserve)
+                if not wait:
+                    break
+                time.sleep(wait)
+                waited += wait
+        while True:
+            wait = self._quota(host, endpoint_class).wait_time(priority)
+            if not wait:
+                break
+            time.sleep(min(wait, BACKOFF_CAP))
+            waited += min(wait, BACKOFF_CAP)
+        return waited
+
+    def _backoff(self, attempt, minimum=0.0):
+        delay = max(minimum, self.random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+        time.sleep(delay)
+
+    def request(self, method, url, send, attempts=None, breaker=True):
+        """Run ``send()`` (one HTTP attempt returning a requests.Response) under the limits for ``url``.
+
+        ``send`` is tried at most ``attempts`` times. Returns the final response, including a
+        last 429/5xx once the attempts are used up. A connection error on the last attempt is
+        re-raised; CircuitOpenError (a requests.ConnectionError) is raised without sending
+        while the circuit is open.
+        ``breaker=False`` (emergency flatten) sends even then; its outcomes still count.
+        """
+        host, endpoint_class = classify(method, url)
+        key = (host, endpoint_class)
+        stats = self.stats[key]
+        circuit = self._breaker(key)
+        attempts = self.attempts if attempts is None else attempts
+        attempt = 0
+        while True:
+            if breaker and not circuit.allow():
+                stats['circuit_rejected'] += 1
+                raise CircuitOpenError(f"Circuit open for {host} ({endpoint_class}) after repeated failures")
+            stats['throttled_seconds'] += self._acquire(host, endpoint_class)
+            stats['requests'] += 1
+            try:
+                response = send()
+            except requests.RequestException as e:
+                stats['errors'] += 1
+                circuit.record(False)
+                # Counted in stats rather than printed, which would flood the log during an outage
+                if attempt + 1 >= attempts or endpoint_class == ORDER:
+                    raise
+            else:
+                self._quota(host, endpoint_class).observe(response.headers)
+                if response.status_code == 429:
+                    stats['rate_limited'] += 1
+                    circuit.record(False)
+                    reset_ms = response.headers.get('gw-ratelimit-reset') or 0
+                    try:
+                        wait = int(reset_ms) / 1000 or float(response.headers.get('Retry-After') or 0)
+                    except ValueError:
+                        wait = 0.0
+                    self._quota(host, endpoint_class).exhaust(wait or BACKOFF_BASE * 2 ** attempt)
+                    if attempt + 1 >= attempts:
+                        return response
+                elif response.status_code >= 500:
+                    stats['errors'] += 1
+                    circuit.record(False)
+                    if attempt + 1 >= attempts or endpoint_class == ORDER:
+                        return response
+                else:
+                    circuit.record(True)
+                    return response
+            stats['retries'] += 1
+            self._backoff(attempt)
+            attempt += 1
+
+    def snapshot(self):
+        """{(host, class): {requests, retries, errors, rate_limited, throttled_seconds, ...}}"""
+        return {key: dict(values) for key, values in self.stats.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Return the process-wide scheduler shared by the scanner, executor and caches."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
+
+def set_scheduler(scheduler):
+    """Swap the process-wide scheduler (e.g. an unlimited one for offline benchmarks); returns the old one."""
+    global _scheduler
+    with _scheduler_lock:
+        previous, _scheduler = _scheduler, scheduler
+        return previous
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = 16
+
+# Extra requests-per-second spacing per host (None or 0 disables it). Empty by default:
+# the per-host and per-endpoint limits are enforced centrally by request_scheduler.
+DEFAULT_RATE_LIMITS = {}
+DEFAULT_HOST_RATE = None
+
+# key identifies the job for the result callback, host selects the rate limit bucket,
+# fn(*args) is the blocking fetch that runs on the worker pool
+ScanJob = namedtuple('ScanJob', ['key', 'host', 'fn', 'args'])
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host so it never sees more than its configured rate."""
+
+    def __init__(self, rate_limits=None, default_rate=DEFAULT_HOST_RATE):
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(rate_limits or {})
+        self.default_rate = default_rate
+        self._next_slot = {}
+
+    async def acquire(self, host):
+        rate = self.rate_limits.get(host, self.default_rate)
+        if not rate:
+            return
+        # Runs on the event loop thread only, so the slot bookkeeping needs no lock
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + 1.0 / rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class ScanEngine:
+    """Runs blocking fetch jobs concurrently and hands each result back as soon as it lands.
+
+    The event loop only schedules work; the fetches themselves run on a thread pool so
+    the existing ``requests`` based helpers can be used unchanged.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate_limits=None, max_workers=None):
+        self.concurrency = max(1, int(concurrency))
+        self.rate_limiter = HostRateLimiter(rate_limits)
+        self.max_workers = max_workers or self.concurrency
+
+    def run(self, jobs, on_result):
+        """Run ``jobs`` to completion.
+
+        ``on_result(job, result)`` is called on the loop thread for every finished job and
+        may return an iterable of follow-up jobs to schedule. Failed jobs report ``None``.
+        Returns the number of jobs executed.
+        """
+        return asyncio.run(self._run(jobs, on_result))
+
+    async def _run(self, jobs, on_result):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            async def execute(job):
+                async with semaphore:
+                    await self.rate_limiter.acquire(job.host)
+                    try:
+                        return await loop.run_in_executor(executor, job.fn, *job.args)
+                    except Exception as e:
+                        print(f"Scan job {job.key} failed: {str(e)}")
+                        return None
+
+            tasks = {asyncio.ensure_future(execute(job)): job for job in jobs}
+            executed = 0
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    job = tasks.pop(task)
+                    executed += 1
+                    for follow_up in on_result(job, task.result()) or ():
+                        tasks[asyncio.ensure_future(execute(follow_up))] = follow_up
+            return executed
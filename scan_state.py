@@ -0,0 +1,154 @@
+import json
+import numbers
+import threading
+import time
+
+from signal_channel import write_json_atomic
+from timeframes import MTF_TREND_COLUMNS
+
+SCAN_STATE_FILE = 'scan_state.json'
+PRICE_TOLERANCE = 5e-4  # Relative move of a price level below which it counts as unchanged
+OSCILLATOR_TOLERANCE = 1e-2
+# Only what the strategy reads decides whether a symbol is re-scored. Price levels are
+# compared tightly since entry, stop and take profit move with them; anything not listed
+# here (open, ADX, depth features, ...) is ignored.
+CHANGE_TOLERANCES = {
+    'close': PRICE_TOLERANCE, 'VWAP|60': PRICE_TOLERANCE, 'ATR|60': 10 * PRICE_TOLERANCE,
+    'EMA5': PRICE_TOLERANCE, 'EMA10': PRICE_TOLERANCE, 'EMA20': PRICE_TOLERANCE,
+    'EMA50': PRICE_TOLERANCE, 'EMA200': PRICE_TOLERANCE,
+    'Pivot.M.Classic.R1': PRICE_TOLERANCE, 'Pivot.M.Classic.S1': PRICE_TOLERANCE,
+    'RSI|60': OSCILLATOR_TOLERANCE, 'Stoch.K': OSCILLATOR_TOLERANCE, 'Stoch.D': OSCILLATOR_TOLERANCE,
+    'MACD.macd': OSCILLATOR_TOLERANCE, 'MACD.signal': OSCILLATOR_TOLERANCE,
+}
+REFRESH_BASE = 45 * 60  # Seconds between fetches for a symbol at the reference volatility
+VOLATILITY_REFERENCE = 0.01  # ATR|60 / close that gets REFRESH_BASE
+REFRESH_MAX = 3 * 3600  # Even the quietest symbol is re-fetched at least this often
+
+
+class ScanState:
+    """What the last scans saw per symbol: the indicator vector, its signal and when to look again.
+
+    Lets an incremental scan skip the fetch for quiet symbols until their volatility-based
+    refresh interval has passed, and skip scoring when the indicators the strategy reads are
+    within ``tolerances`` of the ones already scored. Symbols that produced a signal are always
+    re-fetched, so a cached signal is never older than the tolerance allows.
+    """
+
+    def __init__(self, path=SCAN_STATE_FILE, tolerances=CHANGE_TOLERANCES, refresh_base=REFRESH_BASE,
+                 volatility_reference=VOLATILITY_REFERENCE, refresh_max=REFRESH_MAX):
+        self.path = path
+        self.tolerances = tolerances
+        self.refresh_base = refresh_base
+        self.volatility_reference = volatility_reference
+        self.refresh_max = refresh_max
+        self._symbols = {}  # {symbol: {'indicators', 'signal', 'fetched_at', 'refresh_at'}}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Pick up the state of the last run; returns True if a usable file was found."""
+        try:
+            with open(self.path, 'r') as file:
+                state = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        with self._lock:
+            self._symbols = state.get('symbols', {})
+        return bool(self._symbols)
+
+    def save(self):
+        with self._lock:
+            state = {'saved_at': time.time(), 'symbols': dict(self._symbols)}
+        write_json_atomic(state, self.path, indent=None)
+
+    def refresh_interval(self, indicators):
+        """Seconds until a symbol with these indicators needs fetching again."""
+        try:
+            volatility = float(indicators.get('ATR|60') or 0) / float(indicators.get('close') or 0)
+        except (TypeError, ValueError, ZeroDivisionError):
+            return 0.0
+        if volatility <= 0:
+            return 0.0
+        return min(self.refresh_max, self.refresh_base * self.volatility_reference / volatility)
+
+    def due(self, symbols, now=None):
+        """Split ``symbols`` into (to fetch, to skip) for this cycle."""
+        now = time.time() if now is None else now
+        fetch, skip = [], []
+        with self._lock:
+            for symbol in symbols:
+                entry = self._symbols.get(symbol)
+                if entry is None or entry.get('signal') is not None or now >= entry.get('refresh_at', 0):
+                    fetch.append(symbol)
+                else:
+                    skip.append(symbol)
+        return fetch, skip
+
+    def unchanged(self, symbol, indicators):
+        """True if the indicators that decide a signal match the last scored ones within the tolerances."""
+        with self._lock:
+            entry = self._symbols.get(symbol)
+        if entry is None:
+            return False
+        previous = entry['indicators']
+        if previous.keys() != indicators.keys():
+            return False
+        for name, tolerance in self.tolerances.items():
+            if name in indicators and not _within(previous[name], indicators[name], tolerance):
+                return False
+        # Volume only counts through these comparisons, and it moves far too much to compare itself
+        if _volume_state(previous) != _volume_state(indicators):
+            return False
+        # Higher-timeframe trends are categories: any change can flip the veto
+        return all(previous.get(name) == indicators.get(name) for name in MTF_TREND_COLUMNS)
+
+    def signal(self, symbol):
+        with self._lock:
+            entry = self._symbols.get(symbol)
+        return entry and entry.get('signal')
+
+    def touch(self, symbol, indicators, now=None):
+        """Record a fetch whose indicators were unchanged: only the refresh time moves."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._symbols[symbol]
+            entry['fetched_at'] = now
+            entry['refresh_at'] = now + self.refresh_interval(indicators)
+
+    def update(self, symbol, indicators, signal, now=None):
+        """Record freshly scored indicators and their signal (None if the symbol did not qualify)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._symbols[symbol] = {
+                # Depth features can be NumPy scalars, which json cannot write
+                'indicators': {name: float(value) if isinstance(value, numbers.Number) else value
+                               for name, value in indicators.items()},
+                'signal': signal,
+                'fetched_at': now,
+                'refresh_at': now + self.refresh_interval(indicators),
+            }
+
+
+def _within(old, value, tolerance):
+    try:
+        return abs(float(value) - float(old)) <= tolerance * max(abs(float(old)), 1e-12)
+    except (TypeError, ValueError):
+        return value == old
+
+
+def _volume_state(indicators):
+    try:
+        volume = float(indicators.get('volume') or 0)
+        return volume > float(indicators.get('volume_ma') or 0), volume > 0
+    except (TypeError, ValueError):
+        return None
+
+
+_state = None
+
+def get_scan_state():
+    """Return the process-wide state kept between scanner cycles."""
+    global _state
+    if _state is None:
+        _state = ScanState()
+    return _state
@@ -0,0 +1,305 @@
+import numpy as np
+
+from metrics import timed
+from timeframes import MTF_TREND_COLUMNS
+
+# Every indicator column the scoring functions read; missing values are stored as NaN
+SCORING_COLUMNS = [
+    "close", "volume", "volume_ma", "VWAP|60", "RSI|60", "ATR|60",
+    "MACD.macd", "MACD.signal", "Stoch.K", "Stoch.D",
+    "EMA5", "EMA10", "EMA20", "EMA50", "EMA200",
+    "Pivot.M.Classic.R1", "Pivot.M.Classic.S1",
+]
+
+MIN_SUCCESS_CHANCE = 70  # Signals need a success chance strictly above this
+MAX_RISK_PERCENTAGE = 2  # ...and a stop distance strictly below this (in %)
+MAX_SIGNAL_LEVERAGE = 5
+
+# The strategy's tunable constants; the defaults reproduce 1.py exactly
+DEFAULT_PARAMS = {
+    # advanced_trading_strategy trend score weights
+    'weight_short_trend': 20,
+    'weight_medium_trend': 15,
+    'weight_long_trend': 10,
+    'weight_volume_trend': 15,
+    'weight_macd_trend': 15,
+    'weight_vwap_trend': 15,
+    'weight_pivot': 10,
+    # calculate_enhanced_success_chance pulls the raw score this far towards 50
+    'success_shrinkage': 0.9,
+    # Strong signals: take profit at ATR * (base + trend), stop at that times stop_atr_fraction
+    'atr_multiplier_base': 2,
+    'atr_multiplier_trend': 1,
+    'stop_atr_fraction': 0.5,
+    # calculate_optimized_leverage caps above success chances of 85 / 75 / 65 / otherwise
+    'leverage_cap_85': 5,
+    'leverage_cap_75': 4,
+    'leverage_cap_65': 3,
+    'leverage_cap_base': 2,
+    'min_success_chance': MIN_SUCCESS_CHANCE,
+    'max_risk_percentage': MAX_RISK_PERCENTAGE,
+}
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def build_indicator_columns(indicators_by_symbol, columns=SCORING_COLUMNS):
+    """Load {symbol: indicators} into one float64 array per column.
+
+    Returns (symbols, {column: array}). Missing or non-numeric values become NaN so each
+    scoring step can substitute the same default the scalar code would use.
+    """
+    symbols = list(indicators_by_symbol)
+    rows = [indicators_by_symbol[symbol] for symbol in symbols]
+    data = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        try:
+            # numpy maps None to NaN on its own, which covers the common case in one call
+            data[column] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            data[column] = np.fromiter((_to_float(value) for value in values), dtype=np.float64, count=len(values))
+    return symbols, data
+
+
+def resolve_params(params=None):
+    """DEFAULT_PARAMS with ``params`` overriding; unknown names raise KeyError."""
+    unknown = set(params or {}) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise KeyError(f"Unknown strategy parameters: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_PARAMS, **(params or {})}
+
+
+def _fill(values, default):
+    return np.where(np.isnan(values), default, values)
+
+
+def _round_decimals(values, digits):
+    """Bit-identical vector form of the builtin round(value, digits).
+
+    rint(x * 10**digits) / 10**digits matches the builtin except when the scaled product
+    sits within rounding error of a .5 tie; those few values are handed to round() itself.
+    """
+    scale = 10.0 ** digits
+    with np.errstate(invalid='ignore'):
+        scaled = values * scale
+        rounded = np.rint(scaled) / scale
+        near_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) <= 4 * np.spacing(np.abs(scaled))
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+
+def round_up_array(values):
+    """Vector form of 1.py:round_up."""
+    return np.where(values < 1, _round_decimals(values, 8), _round_decimals(values, 2))
+
+
+def trend_scores(data):
+    """Vector form of 1.py:calculate_trend_score."""
+    last_price = _fill(data['close'], 0.0)
+    score = np.zeros(len(last_price))
+    score += np.where(_fill(data['EMA5'], 0.0) > _fill(data['EMA10'], 0.0), 15, 0)
+    score += np.where(_fill(data['EMA20'], 0.0) > _fill(data['EMA50'], 0.0), 10, 0)
+    score += np.where(_fill(data['EMA50'], 0.0) > _fill(data['EMA200'], 0.0), 10, 0)
+    score += np.where(_fill(data['MACD.macd'], 0.0) > _fill(data['MACD.signal'], 0.0), 20, 0)
+    score += np.where(last_price > _fill(data['VWAP|60'], last_price), 25, 0)
+
+    rsi = _fill(data['RSI|60'], 50.0)
+    score += np.select(
+        [(rsi >= 40) & (rsi <= 60), (rsi > 60) & (rsi <= 70), (rsi >= 30) & (rsi < 40)],
+        [10, 20, 15], default=0
+    )
+    return score
+
+
+def success_chances(trend_score, macd_strength, position_size_factor, stoch_k, stoch_d, vwap_trend, volume_trend,
+                    params=None):
+    """Vector form of 1.py:calculate_enhanced_success_chance."""
+    params = resolve_params(params)
+    base_chance = trend_score * 0.6
+    base_chance = base_chance + np.where(macd_strength > 0.0008, 12, 0)
+    base_chance = base_chance + np.where(np.abs(stoch_k - stoch_d) < 15, 12, 0)
+    base_chance = base_chance + np.where(vwap_trend, 12, 0)
+    base_chance = base_chance + np.where(volume_trend, 12, 0)
+    base_chance = base_chance + 12 * position_size_factor
+    final_chance = 50 + (base_chance - 50) * params['success_shrinkage']
+    return np.maximum(0, np.minimum(100, final_chance))
+
+
+def optimized_leverage(success_chance, volatility, trend_score, params=None):
+    """Vector form of 1.py:calculate_optimized_leverage (returns int64)."""
+    params = resolve_params(params)
+    leverage = success_chance / 20
+    leverage = leverage * (1 - (volatility * 10))
+    leverage = leverage * (0.8 + (0.4 * (trend_score / 100)))
+    max_leverage = np.select(
+        [success_chance > 85, success_chance > 75, success_chance > 65],
+        [params['leverage_cap_85'], params['leverage_cap_75'], params['leverage_cap_65']],
+        default=params['leverage_cap_base']
+    )
+    return np.minimum(np.ceil(leverage), max_leverage).astype(np.int64)
+
+
+def strategy(data, last_price, params=None):
+    """Vector form of 1.py:advanced_trading_strategy.
+
+    Returns a dict with entry_price, take_profit, stop_loss and leverage arrays plus the
+    intermediate trend score and success chance. ``params`` overrides DEFAULT_PARAMS.
+    """
+    params = resolve_params(params)
+    atr = _fill(data['ATR|60'], 0.01 * last_price)
+    macd = _fill(data['MACD.macd'], 0.0)
+    macd_signal = _fill(data['MACD.signal'], 0.0)
+    stoch_k = _fill(data['Stoch.K'], 50.0)
+    stoch_d = _fill(data['Stoch.D'], 50.0)
+    vwap = _fill(data['VWAP|60'], last_price)
+    ema5 = _fill(data['EMA5'], last_price)
+    ema10 = _fill(data['EMA10'], last_price)
+    ema20 = _fill(data['EMA20'], last_price)
+    ema50 = _fill(data['EMA50'], last_price)
+    ema200 = _fill(data['EMA200'], last_price)
+    pivot_r1 = _fill(data['Pivot.M.Classic.R1'], last_price)
+    pivot_s1 = _fill(data['Pivot.M.Classic.S1'], last_price)
+
+    short_trend = (ema5 > ema10) & (ema10 > ema20)
+    medium_trend = ema20 > ema50
+    long_trend = ema50 > ema200
+    volume_trend = _fill(data['volume'], 0.0) > _fill(data['volume_ma'], 0.0)
+    macd_trend = macd > macd_signal
+    macd_strength = np.abs(macd - macd_signal) / last_price
+    stoch_oversold = (stoch_k < 20) & (stoch_d < 20)
+    stoch_overbought = (stoch_k > 80) & (stoch_d > 80)
+    vwap_trend = last_price > vwap
+    pivot_resistance = last_price < pivot_r1
+    pivot_support = last_price > pivot_s1
+
+    trend_score = np.zeros(len(last_price))
+    trend_score += np.where(short_trend, params['weight_short_trend'], 0)
+    trend_score += np.where(medium_trend, params['weight_medium_trend'], 0)
+    trend_score += np.where(long_trend, params['weight_long_trend'], 0)
+    trend_score += np.where(volume_trend, params['weight_volume_trend'], 0)
+    trend_score += np.where(macd_trend, params['weight_macd_trend'], 0)
+    trend_score += np.where(vwap_trend, params['weight_vwap_trend'], 0)
+    trend_score += np.select(
+        [pivot_support & ~pivot_resistance, pivot_resistance & ~pivot_support],
+        [params['weight_pivot'], -params['weight_pivot']], default=0
+    )
+
+    # Higher timeframes (timeframes.py) veto a signal against their trend; missing ones never do
+    higher_trends = [_fill(data[column], 0.0) for column in MTF_TREND_COLUMNS if column in data]
+    higher_bull = np.all([trend >= 0 for trend in higher_trends], axis=0) if higher_trends else True
+    higher_bear = np.all([trend <= 0 for trend in higher_trends], axis=0) if higher_trends else True
+
+    position_size_factor = trend_score / 100
+    strong_buy = (trend_score > 75) & ~stoch_overbought & macd_trend & vwap_trend & pivot_support & higher_bull
+    strong_sell = (trend_score < 25) & ~stoch_oversold & ~macd_trend & ~vwap_trend & pivot_resistance & higher_bear
+    atr_multiplier = params['atr_multiplier_base'] + (trend_score / 100) * params['atr_multiplier_trend']
+
+    # Each branch is evaluated for every row, then the matching one is picked and rounded
+    entry_price = round_up_array(np.select(
+        [strong_buy, strong_sell],
+        [last_price * (1 + 0.001 * position_size_factor), last_price * (1 - 0.001 * position_size_factor)],
+        default=last_price
+    ))
+    take_profit = round_up_array(np.select(
+        [strong_buy, strong_sell],
+        [entry_price + atr * atr_multiplier, entry_price - atr * atr_multiplier],
+        default=entry_price + atr
+    ))
+    stop_distance = atr * (atr_multiplier * params['stop_atr_fraction'])
+    stop_loss = round_up_array(np.select(
+        [strong_buy, strong_sell],
+        [entry_price - stop_distance, entry_price + stop_distance],
+        default=entry_price - atr
+    ))
+
+    success_chance = success_chances(
+        trend_score, macd_strength, position_size_factor,
+        stoch_k, stoch_d, vwap_trend, volume_trend, params
+    )
+    leverage = optimized_leverage(success_chance, atr / last_price, trend_score, params)
+
+    return {
+        'entry_price': entry_price,
+        'take_profit': take_profit,
+        'stop_loss': stop_loss,
+        'leverage': leverage,
+        'trend_score': trend_score,
+        'success_chance': success_chance,
+        'higher_aligned': np.where(take_profit < entry_price, higher_bear, higher_bull),
+    }
+
+
+def score_columns(data, params=None):
+    """Score pre-built indicator columns (rows with a positive close) in one pass.
+
+    Works on any 1-D layout of rows, e.g. symbols x time flattened by the backtester.
+    ``params`` overrides DEFAULT_PARAMS (see sweep.py).
+    """
+    params = resolve_params(params)
+    last_price = data['close']
+    result = strategy(data, last_price, params)
+
+    trend_score = trend_scores(data)
+    macd_strength = np.abs(_fill(data['MACD.macd'], 0.0) - _fill(data['MACD.signal'], 0.0)) / last_price
+    success_chance = success_chances(
+        trend_score, macd_strength, trend_score / 100,
+        _fill(data['Stoch.K'], 50.0), _fill(data['Stoch.D'], 50.0),
+        last_price > _fill(data['VWAP|60'], last_price),
+        _fill(data['volume'], 0.0) > 0, params
+    )
+    risk_percentage = (np.abs(result['entry_price'] - result['stop_loss']) / result['entry_price']) * 100
+
+    result['signal_trend_score'] = trend_score
+    result['signal_success_chance'] = success_chance
+    result['risk_percentage'] = risk_percentage
+    result['qualifies'] = ((success_chance > params['min_success_chance']) & (risk_percentage < params['max_risk_percentage'])
+                           & result['higher_aligned'])
+    return result
+
+
+def score_universe(indicators_by_symbol, feature_columns=()):
+    """Vector form of 1.py:score_symbol for every symbol at once.
+
+    Symbols without a positive close are dropped. Returns (symbols, {name: array}) where
+    the arrays include the strategy outputs, the signal success chance, the risk in
+    percent and a boolean ``qualifies`` mask. Any ``feature_columns`` (e.g. the order-book
+    features from order_book.DEPTH_FEATURE_COLUMNS) are loaded alongside under 'features'.
+    """
+    valid = {
+        symbol: indicators for symbol, indicators in indicators_by_symbol.items()
+        if indicators and _to_float(indicators.get('close')) > 0
+    }
+    columns = SCORING_COLUMNS + MTF_TREND_COLUMNS
+    symbols, data = build_indicator_columns(valid, columns + [c for c in feature_columns if c not in columns])
+    if not symbols:
+        return symbols, {}
+
+    result = score_columns(data)
+    result['features'] = {column: data[column] for column in feature_columns}
+    return symbols, result
+
+
+@timed('scan.scoring')
+def score_signals(indicators_by_symbol):
+    """Score every symbol and return the qualifying signal dicts, same as 1.py:score_symbol."""
+    symbols, result = score_universe(indicators_by_symbol)
+    signals = []
+    for i in np.flatnonzero(result['qualifies']) if symbols else ():
+        signals.append({
+            "Symbol": symbols[i],
+            "Entry Price": float(result['entry_price'][i]),
+            "Take Profit": float(result['take_profit'][i]),
+            "Stop Loss": float(result['stop_loss'][i]),
+            "Position Risk": f"{result['risk_percentage'][i]:.2f}%",
+            "Leverage": min(int(result['leverage'][i]), MAX_SIGNAL_LEVERAGE),
+            "Trailing Stop": 2,
+            "Chances of Success": float(result['signal_success_chance'][i])
+        })
+    return signals
@@ -0,0 +1,188 @@
+import heapq
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SIGNALS_FILE = 'signals.json'
+POLL_INTERVAL = 0.05  # Seconds between stat() calls when watching the file from another process
+STREAM_RELEASE_CHANCE = 85  # Success chance at which a signal goes to the executor before the scan ends
+STREAM_MAX_EARLY = 2  # Signals that may be released early per scan
+
+
+def write_json_atomic(data, filename, indent=4):
+    """Write JSON to a temp file in the same directory and rename it over ``filename``.
+
+    Readers see either the previous file or the complete new one, never a partial write.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    prefix = '.' + os.path.basename(filename) + '-'
+    fd, tmp_path = tempfile.mkstemp(prefix=prefix, suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(data, file, indent=indent)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, filename)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_signals_atomic(signals, filename=SIGNALS_FILE):
+    write_json_atomic(signals, filename)
+
+
+def file_version(filename=SIGNALS_FILE):
+    """Identify the committed file; a rename always produces a new inode/mtime pair."""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def wait_for_signals_file(filename=SIGNALS_FILE, since=None, timeout=None, poll_interval=POLL_INTERVAL):
+    """Block until ``filename`` is committed with a version other than ``since``.
+
+    Used when the scanner and executor run as separate processes. Returns True once a new
+    version is visible, False on timeout.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        version = file_version(filename)
+        if version is not None and version != since:
+            return True
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+class SignalChannel:
+    """Scanner -> executor handoff: commit signals to disk atomically, then wake the executor."""
+
+    def __init__(self, filename=SIGNALS_FILE):
+        self.filename = filename
+        self._queue = queue.Queue()
+
+    def publish(self, signals, committed=None):
+        """Commit ``committed`` (default: ``signals``) to disk, then hand ``signals`` to the executor."""
+        signals = list(signals)
+        write_signals_atomic(signals if committed is None else list(committed), self.filename)
+        self._queue.put(signals)
+
+    def wait(self, timeout=None):
+        """Return the next committed batch of signals, or None if nothing arrived in time."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def task_done(self):
+        self._queue.task_done()
+
+    def join(self):
+        """Block until every published batch has been handled by the executor."""
+        self._queue.join()
+
+
+class SignalStream:
+    """Collects signals while a scan is still running and lets the strongest ones go early.
+
+    A signal whose success chance reaches ``release_chance`` is published at once (at most
+    ``max_early`` per scan, and only if ``compatible(signal, released)`` agrees). Since
+    ``compatible`` may block on the network, it runs on the stream's own worker thread,
+    one check at a time, so the scan that calls ``offer`` never waits for it. The rest
+    wait in a bounded heap that keeps the ``capacity`` lowest-risk signals; ``finish``
+    picks the remaining slots from them and publishes those. The file on disk always holds
+    every signal released so far in the scan.
+    """
+
+    def __init__(self, publish, limit=5, capacity=20, release_chance=STREAM_RELEASE_CHANCE,
+                 max_early=STREAM_MAX_EARLY, compatible=None):
+        self.publish = publish
+        self.limit = limit
+        self.capacity = capacity
+        self.release_chance = release_chance
+        self.max_early = max_early
+        self.compatible = compatible
+        self.released = []
+        self.started = time.time()
+        self.first_release = None
+        self._heap = []  # (-risk, sequence, signal): the riskiest kept signal is at the top
+        self._sequence = 0
+        self._pending = 0  # Early releases waiting for their compatible() check
+        self._checks = ThreadPoolExecutor(max_workers=1, thread_name_prefix='signal-check') if compatible else None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def risk(signal):
+        return float(signal["Position Risk"].rstrip('%'))
+
+    def offer(self, signal):
+        """Take one scored signal; returns True if it goes (or is checked to go) out early."""
+        with self._lock:
+            if (signal["Chances of Success"] < self.release_chance
+                    or len(self.released) + self._pending >= self.max_early):
+                self._keep(signal)
+                return False
+            if self._checks is None:
+                self._release([signal])
+                return True
+            self._pending += 1
+        self._checks.submit(self._check, signal)
+        return True
+
+    def _check(self, signal):
+        # Checks run one at a time, so every earlier early release is already in self.released
+        with self._lock:
+            held = list(self.released)
+        try:
+            compatible = self.compatible(signal, held)
+        except Exception as e:
+            print(f"Early release check failed for {signal['Symbol']}: {str(e)}")
+            compatible = False
+        with self._lock:
+            self._pending -= 1
+            if compatible:
+                self._release([signal])
+            else:
+                self._keep(signal)
+
+    def _keep(self, signal):
+        self._sequence += 1
+        item = (-self.risk(signal), self._sequence, signal)
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+
+    def _release(self, signals):
+        self.released.extend(signals)
+        if signals and self.first_release is None:
+            self.first_release = time.time()
+        self.publish(signals, committed=list(self.released))
+
+    def finish(self, select=None):
+        """Fill the remaining slots when the scan is done and return every signal of this scan.
+
+        ``select(candidates, held, limit)`` picks from the lowest-risk candidates first
+        (default: the first ``limit``); ``held`` are the signals already released. The
+        final batch is published even when empty so the executor and the file see the end.
+        """
+        if self._checks is not None:
+            self._checks.shutdown(wait=True)
+        with self._lock:
+            candidates = [signal for _, _, signal in sorted(self._heap, key=lambda item: (-item[0], item[1]))]
+            self._heap = []
+            slots = max(0, self.limit - len(self.released))
+            held = list(self.released)
+            chosen = select(candidates, held, slots) if select else candidates[:slots]
+            self._release(chosen[:slots])
+            return list(self.released)
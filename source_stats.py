@@ -0,0 +1,83 @@
+import json
+import threading
+
+from signal_channel import write_json_atomic
+
+SOURCE_STATS_FILE = 'indicator_sources.json'
+SOURCE_STATS_WINDOW = 20  # Counts are halved past this many samples so a source that starts listing a pair can win it back
+
+
+class SourceStats:
+    """Per-symbol hit counts for the TradingView exchange prefixes (BYBIT:, BINANCE:, ...).
+
+    A hit is a response with a usable close price. ``rank`` orders the sources so the
+    one that usually answers for a symbol is asked first; symbols without history keep
+    the caller's default order. Counts are kept in memory and saved to disk between runs.
+    """
+
+    def __init__(self, path=SOURCE_STATS_FILE, window=SOURCE_STATS_WINDOW):
+        self.path = path
+        self.window = window
+        self._counts = {}  # {symbol: {source: [hits, misses]}}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as file:
+                counts = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        with self._lock:
+            self._counts = counts if isinstance(counts, dict) else {}
+        return bool(self._counts)
+
+    def save(self):
+        with self._lock:
+            counts = {symbol: {source: list(pair) for source, pair in sources.items()}
+                      for symbol, sources in self._counts.items()}
+        write_json_atomic(counts, self.path, indent=None)
+
+    def record(self, symbol, source, hit):
+        with self._lock:
+            pair = self._counts.setdefault(symbol, {}).setdefault(source, [0, 0])
+            pair[0 if hit else 1] += 1
+            if pair[0] + pair[1] > self.window:
+                pair[0] /= 2
+                pair[1] /= 2
+
+    def known(self, symbol):
+        """Whether any source has answered for this symbol yet."""
+        with self._lock:
+            return bool(self._counts.get(symbol))
+
+    def hit_rate(self, symbol, source):
+        """Smoothed hit rate; 0.5 for a source never tried on this symbol."""
+        hits, misses = self._counts.get(symbol, {}).get(source, (0, 0))
+        return (hits + 1) / (hits + misses + 2)
+
+    def rank(self, symbol, sources):
+        """``sources`` ordered best first (a stable sort, so ties keep the given order)."""
+        with self._lock:
+            return sorted(sources, key=lambda source: -self.hit_rate(symbol, source))
+
+    def totals(self):
+        """{source: (hits, misses)} summed over all symbols."""
+        totals = {}
+        with self._lock:
+            for sources in self._counts.values():
+                for source, (hits, misses) in sources.items():
+                    total = totals.setdefault(source, [0, 0])
+                    total[0] += hits
+                    total[1] += misses
+        return {source: tuple(total) for source, total in totals.items()}
+
+
+_stats = None
+
+def get_source_stats():
+    """Return the process-wide stats shared by every indicator fetch."""
+    global _stats
+    if _stats is None:
+        _stats = SourceStats()
+    return _stats
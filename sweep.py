@@ -0,0 +1,215 @@
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from tabulate import tabulate
+
+import backtest
+import scoring
+from signal_channel import write_json_atomic
+
+SWEEP_RESULTS_FILE = 'sweep_results.json'
+DEFAULT_SAMPLES = 200
+DEFAULT_METRIC = 'total_pnl'
+MIN_TRADES = 30  # Configurations with fewer trades are ranked below all others
+MAX_GRID_SIZE = 20000  # --grid refuses larger spaces; restrict them with --grid-params
+LEVERAGE_CAPS = ('leverage_cap_85', 'leverage_cap_75', 'leverage_cap_65', 'leverage_cap_base')
+
+# Candidate values per parameter: a list is sampled from, a (low, high) tuple sampled uniformly
+SWEEP_SPACE = {
+    'weight_short_trend': [10, 15, 20, 25, 30],
+    'weight_medium_trend': [5, 10, 15, 20],
+    'weight_long_trend': [5, 10, 15, 20],
+    'weight_volume_trend': [5, 10, 15, 20],
+    'weight_macd_trend': [5, 10, 15, 20],
+    'weight_vwap_trend': [5, 10, 15, 20],
+    'weight_pivot': [0, 5, 10, 15],
+    'success_shrinkage': (0.6, 1.0),
+    'atr_multiplier_base': [1, 1.5, 2, 2.5, 3],
+    'atr_multiplier_trend': [0, 0.5, 1, 1.5],
+    'stop_atr_fraction': [0.25, 0.5, 0.75, 1],
+    'leverage_cap_85': [3, 4, 5],
+    'leverage_cap_75': [2, 3, 4],
+    'min_success_chance': [60, 65, 70, 75, 80],
+    'max_risk_percentage': [1, 1.5, 2, 3],
+}
+
+
+def valid_config(config):
+    """False if the leverage caps would rise as the success chance falls."""
+    caps = [scoring.resolve_params(config)[name] for name in LEVERAGE_CAPS]
+    return all(higher >= lower for higher, lower in zip(caps, caps[1:]))
+
+
+def grid_space(space, names=None):
+    """The list-valued entries of ``space``, limited to ``names`` (the rest stay at their defaults)."""
+    return {name: values for name, values in space.items()
+            if isinstance(values, list) and (names is None or name in names)}
+
+
+def grid_size(space):
+    """Number of combinations parameter_grid would try before dropping invalid ones."""
+    size = 1
+    for values in grid_space(space).values():
+        size *= len(values)
+    return size
+
+
+def parameter_grid(space):
+    """Every valid combination of the list-valued entries in ``space``, generated lazily."""
+    names = list(grid_space(space))
+    for values in itertools.product(*(space[name] for name in names)):
+        config = dict(zip(names, values))
+        if valid_config(config):
+            yield config
+
+
+def random_configs(space, count, seed=None):
+    """``count`` random valid configurations, preceded by the defaults as a baseline."""
+    rng = random.Random(seed)
+    configs = [{}]
+    while len(configs) < count:
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                config[name] = round(rng.uniform(*values), 3)
+            else:
+                config[name] = rng.choice(values)
+        if valid_config(config):
+            configs.append(config)
+    return configs
+
+
+class SharedColumns:
+    """Dataset columns copied once into named shared-memory blocks.
+
+    Workers attach to the blocks by name and wrap them in arrays, so the market data
+    exists once in RAM instead of being pickled into every process.
+    """
+
+    def __init__(self, columns):
+        self.blocks = {}
+        self.specs = {}
+        for name, values in columns.items():
+            values = np.asarray(values)
+            block = SharedMemory(create=True, size=max(1, values.nbytes))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            self.blocks[name] = block
+            self.specs[name] = (block.name, values.shape, values.dtype.str)
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+def attach_columns(specs):
+    """Map SharedColumns.specs back to read-only arrays; returns (blocks, columns)."""
+    blocks, columns = {}, {}
+    for name, (block_name, shape, dtype) in specs.items():
+        blocks[name] = SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=blocks[name].buf)
+        array.flags.writeable = False
+        columns[name] = array
+    return blocks, columns
+
+
+_worker = {}
+
+def _init_worker(specs, options):
+    # Blocks are kept referenced for the worker's lifetime so the mappings stay valid
+    _worker['blocks'], _worker['columns'] = attach_columns(specs)
+    _worker['options'] = options
+
+
+def _evaluate(params):
+    _, summary = backtest.run_backtest(_worker['columns'], params=params, **_worker['options'])
+    return params, summary
+
+
+def rank_results(results, metric=DEFAULT_METRIC, min_trades=MIN_TRADES):
+    """Best first by ``metric``; configurations below ``min_trades`` go last."""
+    def key(result):
+        enough = result.get('trades', 0) >= min_trades
+        return (enough, result.get(metric, float('-inf')))
+    return sorted(results, key=key, reverse=True)
+
+
+def run_sweep(columns, configs, workers=None, metric=DEFAULT_METRIC, scan_every=backtest.SCAN_EVERY,
+              horizon=backtest.MAX_HOLD_BARS):
+    """Backtest every configuration across ``workers`` processes (default: all cores)."""
+    needed = set(backtest.OHLCV_COLUMNS) | set(scoring.SCORING_COLUMNS)
+    shared = SharedColumns({name: values for name, values in columns.items() if name in needed})
+    options = {'scan_every': scan_every, 'horizon': horizon}
+    results = []
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                 initargs=(shared.specs, options)) as pool:
+            chunksize = max(1, len(configs) // ((workers or os.cpu_count()) * 8))
+            for params, summary in pool.map(_evaluate, configs, chunksize=chunksize):
+                results.append({'params': params, **summary})
+                if len(results) % 10 == 0:
+                    print(f"Evaluated {len(results)}/{len(configs)} configurations ({time.perf_counter() - started:.0f}s)")
+    finally:
+        shared.close()
+    return rank_results(results, metric)
+
+
+def describe(params):
+    """Only the parameters that differ from the defaults."""
+    changes = [f"{name}={value}" for name, value in params.items() if scoring.DEFAULT_PARAMS[name] != value]
+    return ', '.join(changes) or 'defaults'
+
+
+def main(argv):
+    """python sweep.py DATASET_DIR [--samples N] [--grid] [--grid-params NAME,NAME] [--workers N] [--metric NAME] [--top N] [--seed N] [--every BARS] [--horizon BARS]"""
+    if not argv:
+        print(main.__doc__)
+        return
+    options = {argv[i][2:]: argv[i + 1] for i in range(1, len(argv) - 1) if argv[i].startswith('--')}
+    metric = options.get('metric', DEFAULT_METRIC)
+    if '--grid' in argv or 'grid-params' in options:
+        names = options['grid-params'].split(',') if 'grid-params' in options else None
+        unknown = [name for name in names or () if name not in grid_space(SWEEP_SPACE)]
+        if unknown:
+            print(f"Not a grid parameter: {', '.join(unknown)} (choose from {', '.join(grid_space(SWEEP_SPACE))})")
+            return
+        space = grid_space(SWEEP_SPACE, names)
+        if grid_size(space) > MAX_GRID_SIZE:
+            print(f"A grid over {', '.join(space)} has {grid_size(space):,} combinations (limit {MAX_GRID_SIZE:,}); "
+                  f"pick fewer parameters with --grid-params or use --samples")
+            return
+        configs = list(parameter_grid(space))
+    else:
+        seed = int(options['seed']) if 'seed' in options else None
+        configs = random_configs(SWEEP_SPACE, int(options.get('samples', DEFAULT_SAMPLES)), seed)
+
+    symbols, _, columns = backtest.load_dataset(argv[0])
+    print(f"Sweeping {len(configs)} configurations over {len(symbols)} symbols x {columns['close'].shape[0]} bars")
+    results = run_sweep(
+        columns, configs,
+        workers=int(options['workers']) if 'workers' in options else None,
+        metric=metric,
+        scan_every=int(options.get('every', backtest.SCAN_EVERY)),
+        horizon=int(options.get('horizon', backtest.MAX_HOLD_BARS)),
+    )
+
+    table = [
+        [rank + 1, result.get('trades', 0), result.get('win_rate'), result.get('total_pnl'),
+         result.get('profit_factor'), result.get('max_drawdown_pct'), describe(result['params'])]
+        for rank, result in enumerate(results[:int(options.get('top', 10))])
+    ]
+    print(tabulate(table, headers=['Rank', 'Trades', 'Win Rate', 'Total PnL', 'Profit Factor', 'Max DD %', 'Parameters']))
+    write_json_atomic(results, SWEEP_RESULTS_FILE)
+    print(f"Wrote {len(results)} ranked configurations to {SWEEP_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,36 @@
+import importlib.util
+import os
+
+import pytest
+
+from scoring import score_signals
+from timeframes import MTF_TREND_COLUMNS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_scanner():
+    spec = importlib.util.spec_from_file_location('scanner', os.path.join(ROOT, '1.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def strong_buy(close=100.0):
+    """Indicators that make a strong buy on their own."""
+    return {
+        'close': close, 'ATR|60': 0.3, 'RSI|60': 60, 'MACD.macd': 0.5, 'MACD.signal': 0.1,
+        'Stoch.K': 60, 'Stoch.D': 55, 'VWAP|60': 99.0, 'EMA5': 99.8, 'EMA10': 99.5, 'EMA20': 99.0,
+        'EMA50': 98.0, 'EMA200': 95.0, 'Pivot.M.Classic.Middle': 99.0, 'Pivot.M.Classic.R1': 103.0,
+        'Pivot.M.Classic.S1': 97.0, 'volume': 2000.0, 'volume_ma': 1000.0,
+    }
+
+
+@pytest.mark.parametrize('trend, qualifies', [(None, True), (1, True), (-1, False)])
+def test_long_against_bearish_higher_timeframes_does_not_qualify(trend, qualifies):
+    indicators = strong_buy()
+    if trend is not None:
+        indicators.update({column: trend for column in MTF_TREND_COLUMNS})
+
+    assert bool(score_signals({'XBTUSDTM': indicators})) is qualifies
+    assert (load_scanner().score_symbol('XBTUSDTM', indicators) is not None) is qualifies
@@ -0,0 +1,108 @@
+import numpy as np
+
+from indicators import IncrementalIndicators
+
+BASE_GRANULARITY = 5  # Minutes per candle of the one stream fetched per symbol
+MTF_TIMEFRAMES = (15, 60, 240)  # Minutes per candle of the timeframes resampled from it
+MTF_HISTORY = 3000  # Base candles synced the first time (~10 days, enough for EMA50 on 4h)
+MTF_MIN_BARS = 50  # Closed bars a timeframe needs before its trend counts
+MTF_TREND_COLUMNS = [f"MTF.trend|{minutes}" for minutes in MTF_TIMEFRAMES]
+MTF_COLUMNS = MTF_TREND_COLUMNS + [f"MTF.RSI|{minutes}" for minutes in MTF_TIMEFRAMES]
+
+
+def resample(timestamps, columns, minutes):
+    """Aggregate base candles into ``minutes`` candles along axis 0.
+
+    ``columns`` holds 'open', 'high', 'low', 'close' and 'volume' (1-D or T x N). Returns
+    (open times of the new candles, {column: array}); the last one may still be forming.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if not len(timestamps):
+        return timestamps, {name: np.asarray(values)[:0] for name, values in columns.items()}
+    period_ms = minutes * 60 * 1000
+    bucket = timestamps // period_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    bars = {
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.fmax.reduceat(np.asarray(columns['high'], dtype=np.float64), starts, axis=0),
+        'low': np.fmin.reduceat(np.asarray(columns['low'], dtype=np.float64), starts, axis=0),
+        'close': np.asarray(columns['close'])[ends],
+        'volume': np.add.reduceat(np.nan_to_num(np.asarray(columns['volume'], dtype=np.float64)), starts, axis=0),
+    }
+    return bucket[starts] * period_ms, bars
+
+
+class TimeframeCache:
+    """Higher-timeframe state for one symbol, built from its base candle stream.
+
+    Closed higher-timeframe bars go through IncrementalIndicators once, in O(1) each; the
+    bar still forming is cached on its own and only evaluated on a copy of that state,
+    so a refresh costs a re-aggregation of the base candles since the last closed bar.
+    """
+
+    def __init__(self, base=BASE_GRANULARITY, timeframes=MTF_TIMEFRAMES):
+        self.base_ms = base * 60 * 1000
+        self.frames = {
+            minutes: {'state': IncrementalIndicators([0]), 'values': None, 'closed': 0,
+                      'next_start': None, 'partial': None}
+            for minutes in timeframes
+        }
+
+    def update(self, timestamps, columns):
+        """Feed base candles, oldest first; candles before the forming bar are ignored."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if not len(timestamps):
+            return
+        for minutes, frame in self.frames.items():
+            period_ms = minutes * 60 * 1000
+            # A first bar that starts before the data would be missing candles, so skip it
+            start = frame['next_start']
+            if start is None:
+                start = -(-int(timestamps[0]) // period_ms) * period_ms
+            new = timestamps >= start
+            if not new.any():
+                continue
+            bar_times, bars = resample(timestamps[new], {name: np.asarray(values)[new] for name, values in columns.items()},
+                                       minutes)
+            # A bar is closed once the base candle that ends it is in
+            closed = bar_times + period_ms <= timestamps[-1] + self.base_ms
+            for i in np.flatnonzero(closed):
+                frame['values'] = frame['state'].update(bars['high'][i:i + 1], bars['low'][i:i + 1], bars['close'][i:i + 1])
+                frame['closed'] += 1
+            if closed.any():
+                frame['next_start'] = int(bar_times[closed][-1]) + period_ms
+            elif frame['next_start'] is None:
+                frame['next_start'] = start
+            frame['partial'] = None if closed[-1] else {name: values[-1:] for name, values in bars.items()}
+
+    def features(self):
+        """{'MTF.trend|<minutes>': 1 / 0 / -1, 'MTF.RSI|<minutes>': value}, None until a timeframe has history."""
+        features = {}
+        for minutes, frame in self.frames.items():
+            values = frame['values']
+            if frame['partial'] is not None:
+                partial = frame['partial']
+                values = frame['state'].copy().update(partial['high'], partial['low'], partial['close'])
+                close = float(partial['close'][0])
+            else:
+                close = float(frame['state'].prev_close[0])
+            if values is None or frame['closed'] < MTF_MIN_BARS:
+                features[f"MTF.trend|{minutes}"] = None
+                features[f"MTF.RSI|{minutes}"] = None
+                continue
+            ema20, ema50 = float(values['EMA20'][0]), float(values['EMA50'][0])
+            trend = 1 if close > ema20 > ema50 else (-1 if close < ema20 < ema50 else 0)
+            rsi = float(values['RSI|60'][0])
+            features[f"MTF.trend|{minutes}"] = trend
+            features[f"MTF.RSI|{minutes}"] = None if np.isnan(rsi) else rsi
+        return features
+
+
+_caches = {}
+
+def get_timeframe_cache(symbol):
+    """The process-wide cache for ``symbol``, kept between scans so closed bars are processed once."""
+    if symbol not in _caches:
+        _caches[symbol] = TimeframeCache()
+    return _caches[symbol]